@@ -0,0 +1,201 @@
+"""
+Synthetic model library generators used by the benchmark suite.
+
+Everything here is offline: model files are sparse ``.safetensors`` files with
+a valid header and no real tensor data, and the database mirrors the column
+layout ``helpers.tuple_to_dict`` expects from ``SELECT * FROM models``.
+"""
+
+import os
+import json
+import random
+import struct
+import sqlite3
+import hashlib
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import List, Dict, Any
+
+MODEL_GROUPS = {
+    "checkpoints": ["sdxl", "sd15", "flux", "pony"],
+    "loras": ["sdxl", "sd15", "flux", "styles", "characters"],
+}
+
+BASE_BY_GROUP = {
+    "sdxl": "sdxl",
+    "sd15": "sd-1",
+    "flux": "flux",
+    "pony": "sdxl",
+    "styles": "sdxl",
+    "characters": "sd-1",
+}
+
+MODELS_TABLE = """
+CREATE TABLE IF NOT EXISTS models (
+    key TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    base TEXT,
+    type TEXT NOT NULL,
+    path TEXT NOT NULL,
+    format TEXT NOT NULL,
+    name TEXT NOT NULL,
+    description TEXT,
+    source TEXT,
+    source_type TEXT,
+    source_api_response TEXT,
+    cover_image TEXT,
+    config TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def safetensors_header(tensor_bytes: int, metadata: Dict[str, str]) -> bytes:
+    """
+    Build a valid safetensors prefix (length + JSON header) describing a single
+    F16 tensor of ``tensor_bytes`` bytes.
+    """
+    header = {
+        "__metadata__": metadata,
+        "weight": {
+            "dtype": "F16",
+            "shape": [tensor_bytes // 2],
+            "data_offsets": [0, tensor_bytes],
+        },
+    }
+    encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    # Header length is padded to a multiple of 8 like the reference writer
+    encoded += b" " * (-len(encoded) % 8)
+    return struct.pack("<Q", len(encoded)) + encoded
+
+
+def write_sparse_safetensors(path: Path, size: int, metadata: Dict[str, str]) -> None:
+    header = safetensors_header(max(size, 2) // 2 * 2, metadata)
+    with open(path, "wb") as f:
+        f.write(header)
+        f.truncate(len(header) + max(size, 2) // 2 * 2)
+
+
+def generate_model_tree(
+    root: Path, count: int, file_size: int = 1024 * 1024, seed: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Create ``count`` sparse model files under ``root/checkpoints`` and
+    ``root/loras``, spread over a handful of type folders.
+
+    Returns a description of every generated file.
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    generated = []
+
+    for index in range(count):
+        subdir = "checkpoints" if index % 4 == 0 else "loras"
+        group = rng.choice(MODEL_GROUPS[subdir])
+        directory = root / subdir / group
+        directory.mkdir(parents=True, exist_ok=True)
+
+        name = f"{subdir[:-1]}_{group}_{index:07d}"
+        path = directory / f"{name}.safetensors"
+        base = BASE_BY_GROUP[group]
+        write_sparse_safetensors(
+            path,
+            file_size,
+            {"format": "pt", "modelspec.architecture": f"{base}/{subdir[:-1]}"},
+        )
+        generated.append(
+            {
+                "name": name,
+                "path": str(path),
+                "base": base,
+                "format": "checkpoint" if subdir == "checkpoints" else "lora",
+                "type": "main" if subdir == "checkpoints" else "lora",
+            }
+        )
+
+    return generated
+
+
+def _model_row(model: Dict[str, Any], created: datetime) -> tuple:
+    key = hashlib.sha1(model["path"].encode("utf-8")).hexdigest()
+    model_hash = "blake3:" + hashlib.sha256(model["path"].encode("utf-8")).hexdigest()
+    config = {
+        "key": key,
+        "hash": model_hash,
+        "base": model["base"],
+        "type": model["type"],
+        "path": model["path"],
+        "format": model["format"],
+        "name": model["name"],
+        "description": f"Synthetic {model['format']} model",
+        "source": model["path"],
+        "source_type": "path",
+    }
+    timestamp = created.strftime("%Y-%m-%d %H:%M:%S")
+    return (
+        key,
+        model_hash,
+        model["base"],
+        model["type"],
+        model["path"],
+        model["format"],
+        model["name"],
+        config["description"],
+        model["path"],
+        "path",
+        None,
+        None,
+        json.dumps(config),
+        timestamp,
+        timestamp,
+    )
+
+
+def generate_database(
+    db_path: Path,
+    local_models: List[Dict[str, Any]],
+    rows: int,
+    orphan_ratio: float = 0.1,
+    seed: int = 0,
+) -> Dict[str, int]:
+    """
+    Create an ``invokeai.db`` with ``rows`` models. ``orphan_ratio`` of them
+    point at files that do not exist, the rest reference ``local_models``.
+    """
+    rng = random.Random(seed)
+    orphans = int(rows * orphan_ratio)
+    registered = min(rows - orphans, len(local_models))
+    orphans = rows - registered
+    started = datetime(2024, 1, 1)
+
+    records = []
+    for model in rng.sample(local_models, registered):
+        created = started + timedelta(minutes=rng.randrange(600_000))
+        records.append(_model_row(model, created))
+
+    missing_root = Path(db_path).parent / "missing-models"
+    for index in range(orphans):
+        created = started + timedelta(minutes=rng.randrange(600_000))
+        subdir = "checkpoints" if index % 4 == 0 else "loras"
+        name = f"orphan_{subdir[:-1]}_{index:07d}"
+        model = {
+            "name": name,
+            "path": str(missing_root / subdir / f"{name}.safetensors"),
+            "base": "sdxl",
+            "format": "checkpoint" if subdir == "checkpoints" else "lora",
+            "type": "main" if subdir == "checkpoints" else "lora",
+        }
+        records.append(_model_row(model, created))
+
+    os.makedirs(Path(db_path).parent, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute(MODELS_TABLE)
+        conn.executemany(
+            "INSERT INTO models VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            records,
+        )
+    conn.close()
+
+    return {"rows": len(records), "registered": registered, "orphans": orphans}
@@ -0,0 +1,243 @@
+"""
+Benchmark suite for the scan, compare, sync and snapshot paths.
+
+Builds a synthetic model library per scale (sparse safetensors files and a
+matching invokeai.db), times the core functions against it and writes the
+results as JSON. Runs fully offline and never touches the configured install.
+
+Usage:
+$ python benchmarks/run_benchmarks.py --scales 1000,10000
+$ python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json
+$ python benchmarks/run_benchmarks.py --scales 1000 --save-baseline
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import statistics
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, List, Callable
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from generators import generate_model_tree, generate_database
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+BASELINE_JSON = BENCHMARK_DIR / "baseline.json"
+
+# The package loads its configuration at import time, point it somewhere
+# harmless before the first import. Every scale patches the real paths below.
+_PLACEHOLDER = tempfile.mkdtemp(prefix="invokeai-models-bench-")
+os.environ["INVOKE_AI_DIR"] = _PLACEHOLDER
+os.environ["MODELS_DIR"] = _PLACEHOLDER
+os.environ["SNAPSHOTS"] = "3"
+sys.path.insert(0, str(BENCHMARK_DIR.parent))
+
+from invokeai_models_cli import functions, helpers  # noqa: E402
+
+console = Console()
+
+BENCHMARKS = [
+    "collect_model_info",
+    "get_database_models",
+    "load_models_concurrently",
+    "filter_and_compare_models",
+    "perform_sync",
+    "create_snapshot",
+]
+
+
+def configure_workspace(workspace: Path) -> Dict[str, Path]:
+    paths = {
+        "models": workspace / "models",
+        "invoke": workspace / "invoke",
+        "database": workspace / "invoke" / "databases" / "invokeai.db",
+        "pristine": workspace / "pristine.db",
+        "snapshots": workspace / "snapshots",
+    }
+    paths["snapshots"].mkdir(parents=True, exist_ok=True)
+
+    functions.MODELS_DIR = str(paths["models"])
+    functions.DATABASE_PATH = str(paths["database"])
+    functions.SNAPSHOTS_DIR = paths["snapshots"]
+    functions.SNAPSHOTS_JSON = paths["snapshots"] / "snapshots.json"
+    functions.SNAPSHOTS = "3"
+
+    # Rich rendering is part of what users wait for, but not of what we measure
+    quiet = Console(file=open(os.devnull, "w"))
+    functions.console = quiet
+    helpers.console = quiet
+    return paths
+
+
+def clear_caches(snapshots_dir: Path) -> None:
+    for cache_file in snapshots_dir.glob("*_cache.json"):
+        cache_file.unlink()
+
+
+def timed(fn: Callable, *args) -> tuple:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def run_scale(
+    scale: int, orphan_ratio: float, repeat: int, keep: bool
+) -> Dict[str, Any]:
+    workspace = Path(tempfile.mkdtemp(prefix=f"invokeai-models-{scale}-"))
+    try:
+        paths = configure_workspace(workspace)
+
+        console.print(f"[cyan]Generating {scale:,} models...[/cyan]")
+        generated = generate_model_tree(paths["models"], scale)
+        summary = generate_database(
+            paths["pristine"], generated, scale, orphan_ratio=orphan_ratio
+        )
+        paths["database"].parent.mkdir(parents=True, exist_ok=True)
+
+        samples: Dict[str, List[float]] = {name: [] for name in BENCHMARKS}
+        for _ in range(repeat):
+            shutil.copy2(paths["pristine"], paths["database"])
+            clear_caches(paths["snapshots"])
+
+            elapsed, local_models = timed(
+                functions.collect_model_info, str(paths["models"])
+            )
+            samples["collect_model_info"].append(elapsed)
+
+            elapsed, db_models = timed(functions.get_database_models)
+            samples["get_database_models"].append(elapsed)
+
+            elapsed, _ = timed(
+                functions.load_models_concurrently,
+                str(paths["models"]),
+                functions.load_database_models,
+            )
+            samples["load_models_concurrently"].append(elapsed)
+
+            elapsed, missing = timed(
+                functions.filter_and_compare_models, local_models, db_models
+            )
+            samples["filter_and_compare_models"].append(elapsed)
+
+            elapsed, _ = timed(functions.perform_sync, missing, local_models)
+            samples["perform_sync"].append(elapsed)
+
+            elapsed, _ = timed(functions.create_snapshot)
+            samples["create_snapshot"].append(elapsed)
+
+        return {
+            "dataset": summary,
+            "timings": {
+                name: {
+                    "min": min(values),
+                    "median": statistics.median(values),
+                    "samples": values,
+                }
+                for name, values in samples.items()
+            },
+        }
+    finally:
+        if keep:
+            console.print(f"[yellow]Workspace kept at {workspace}[/yellow]")
+        else:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+
+def compare_with_baseline(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    table = Table(title="Benchmark vs Baseline", title_justify="left")
+    for col_name, style in [
+        ("Scale", "white"),
+        ("Benchmark", "cyan"),
+        ("Baseline (s)", "yellow dim"),
+        ("Current (s)", "yellow"),
+        ("Ratio", "white"),
+    ]:
+        table.add_column(col_name, style=style)
+
+    regressions = []
+    for scale, current in results["scales"].items():
+        previous = baseline.get("scales", {}).get(scale)
+        if not previous:
+            continue
+        for name in BENCHMARKS:
+            if name not in previous["timings"] or name not in current["timings"]:
+                continue
+            before = previous["timings"][name]["min"]
+            after = current["timings"][name]["min"]
+            ratio = after / before if before else float("inf")
+            regressed = ratio > 1 + tolerance
+            if regressed:
+                regressions.append(f"{name}@{scale}")
+            table.add_row(
+                scale,
+                name,
+                f"{before:.4f}",
+                f"{after:.4f}",
+                f"[{'red' if regressed else 'green'}]{ratio:.2f}x[/]",
+            )
+
+    console.print(table)
+    return regressions
+
+
+def main(
+    scales: str = typer.Option("1000,10000", help="Comma separated library sizes"),
+    orphan_ratio: float = typer.Option(0.1, help="Fraction of rows missing on disk"),
+    repeat: int = typer.Option(3, help="Repetitions per benchmark"),
+    output: Path = typer.Option(None, help="Write the JSON results to this file"),
+    baseline: Path = typer.Option(None, help="Compare against a stored baseline"),
+    tolerance: float = typer.Option(0.25, help="Allowed slowdown before failing"),
+    save_baseline: bool = typer.Option(
+        False, "--save-baseline", help="Store the results as the new baseline"
+    ),
+    keep: bool = typer.Option(False, "--keep", help="Keep generated workspaces"),
+):
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "orphan_ratio": orphan_ratio,
+            "repeat": repeat,
+        },
+        "scales": {},
+    }
+
+    for scale in [int(s) for s in scales.split(",") if s.strip()]:
+        results["scales"][str(scale)] = run_scale(scale, orphan_ratio, repeat, keep)
+
+    report = json.dumps(results, indent=2)
+    if output:
+        output.write_text(report)
+        console.print(f"[green]Results written to {output}[/green]")
+    else:
+        console.print_json(report)
+
+    if save_baseline:
+        BASELINE_JSON.write_text(report)
+        console.print(f"[green]Baseline saved to {BASELINE_JSON}[/green]")
+
+    if baseline:
+        regressions = compare_with_baseline(
+            results, json.loads(baseline.read_text()), tolerance
+        )
+        if regressions:
+            console.print(f"[bold red]Regressions:[/bold red] {', '.join(regressions)}")
+            raise typer.Exit(code=1)
+
+    shutil.rmtree(_PLACEHOLDER, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -88,6 +88,11 @@ def get_default_env_locations():
 
 
 def load_environment_variables() -> None:
+    # Already configured by the caller (docker, cron, benchmarks), no .env needed
+    if os.getenv("INVOKE_AI_DIR") and os.getenv("MODELS_DIR"):
+        os.environ.setdefault("SNAPSHOTS", "")
+        return
+
     env_locations = get_default_env_locations()
 
     env_path = None
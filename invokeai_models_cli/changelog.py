@@ -0,0 +1,132 @@
+"""
+Append-only journal of what changed in the models folder between scans.
+
+Every scan through the local index is diffed against the one before it, keyed
+by file identity (device and inode) rather than by path, so a rename or a move
+to another folder is one "moved" event instead of a removal and an addition.
+Events are appended to a JSON Lines file, one per line stamped with the time
+of the scan, so other tools can read or tail it as a feed of library changes
+instead of walking the tree themselves.
+"""
+
+import os
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+__all__ = ["EVENTS", "diff_scans", "append_changes", "read_changes"]
+
+EVENTS = ("added", "removed", "moved", "modified")
+
+
+def _identity(model: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    if model.get("inode") is None:
+        return None
+    return model.get("device"), model["inode"]
+
+
+def _event(
+    kind: str, model: Dict[str, Any], old: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    event = {
+        "event": kind,
+        "path": model["file_path"],
+        "relative_path": model["relative_path"],
+        "model_type": model.get("model_type"),
+        "size": model.get("size"),
+    }
+    if old is not None and old["file_path"] != model["file_path"]:
+        event["old_path"] = old["file_path"]
+    if old is not None and old.get("size") != model.get("size"):
+        event["old_size"] = old.get("size")
+    return event
+
+
+def _changed(old: Dict[str, Any], model: Dict[str, Any]) -> bool:
+    return old.get("size") != model.get("size") or old.get("updated") != model.get(
+        "updated"
+    )
+
+
+def diff_scans(
+    previous: List[Dict[str, Any]], current: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Events that turn the ``previous`` scan into the ``current`` one.
+
+    Models are paired by path and identity first, then by identity alone with
+    the same size and mtime (moved), then by path alone (the file was
+    replaced, e.g. by a new download), and whatever is left was added or
+    removed.
+    """
+    old_models = {model["file_path"]: model for model in previous}
+    events: List[Dict[str, Any]] = []
+    unmatched: List[Dict[str, Any]] = []
+    for model in current:
+        old = old_models.get(model["file_path"])
+        if old is not None and _identity(old) == _identity(model):
+            del old_models[model["file_path"]]
+            if _changed(old, model):
+                events.append(_event("modified", model, old))
+        else:
+            unmatched.append(model)
+
+    by_identity: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    for old in old_models.values():
+        identity = _identity(old)
+        if identity is not None:
+            by_identity.setdefault(identity, old)
+
+    remaining: List[Dict[str, Any]] = []
+    for model in unmatched:
+        old = by_identity.get(_identity(model)) if _identity(model) else None
+        # A rename keeps size and mtime, anything else is a freed inode reused
+        if old is not None and not _changed(old, model):
+            del by_identity[_identity(model)]
+            del old_models[old["file_path"]]
+            events.append(_event("moved", model, old))
+        else:
+            remaining.append(model)
+
+    for model in remaining:
+        old = old_models.pop(model["file_path"], None)
+        events.append(_event("modified" if old else "added", model, old))
+    events.extend(_event("removed", old) for old in old_models.values())
+
+    events.sort(key=lambda event: (event["relative_path"], event["event"]))
+    return events
+
+
+def append_changes(
+    journal_path: str, events: List[Dict[str, Any]], time: datetime = None
+) -> None:
+    if not events:
+        return
+    stamp = (time or datetime.now()).isoformat(timespec="seconds")
+    lines = "".join(json.dumps({"time": stamp, **event}) + "\n" for event in events)
+    with open(journal_path, "a", encoding="utf-8") as f:
+        f.write(lines)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_changes(
+    journal_path: str, since: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """
+    Events oldest first, only those recorded at or after ``since`` if given.
+    """
+    events = []
+    try:
+        with open(journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-append leaves at most one torn line
+                    continue
+                if since is None or datetime.fromisoformat(event["time"]) >= since:
+                    events.append(event)
+    except FileNotFoundError:
+        return []
+    return events
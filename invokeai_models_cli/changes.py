@@ -0,0 +1,72 @@
+import json
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+from .helpers import feedback_message, create_table, format_size
+from .functions import console, change_journal_path
+from .changelog import EVENTS, read_changes
+from .timings import span
+
+__all__ = ["show_changes"]
+
+EVENT_STYLES = {
+    "added": "green",
+    "removed": "red",
+    "moved": "cyan",
+    "modified": "yellow",
+}
+
+
+def show_changes(since: Optional[datetime] = None, as_json: bool = False) -> None:
+    """
+    Print what the recorded scans saw change, from the change journal only.
+    """
+    events = read_changes(change_journal_path(), since)
+
+    if as_json:
+        # One event per line, the same as the journal, for other tools
+        for event in events:
+            print(json.dumps(event))
+        return
+
+    if not events:
+        feedback_message(
+            "No changes recorded"
+            + (f" since {since:%Y-%m-%d %H:%M}." if since else "."),
+            "info",
+        )
+        return
+
+    changes_table = create_table(
+        "Model Library Changes",
+        [
+            ("Time", "yellow dim"),
+            ("Event", "white"),
+            ("Path", "white"),
+            ("Type", "magenta"),
+            ("Size", "white"),
+        ],
+    )
+    for event in events:
+        style = EVENT_STYLES[event["event"]]
+        path = event["relative_path"]
+        if event.get("old_path"):
+            path = f"{path} [dim](was {event['old_path']})[/dim]"
+        size = format_size(event["size"]) if event.get("size") is not None else ""
+        if event.get("old_size") is not None:
+            size = f"{format_size(event['old_size'])} -> {size}"
+        changes_table.add_row(
+            event["time"],
+            f"[{style}]{event['event']}[/{style}]",
+            path,
+            event.get("model_type") or "",
+            size,
+        )
+
+    counts = Counter(event["event"] for event in events)
+    with span("render"):
+        console.print(changes_table)
+        console.print(
+            ", ".join(f"{counts[kind]} {kind}" for kind in EVENTS if counts[kind])
+        )
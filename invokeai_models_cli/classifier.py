@@ -0,0 +1,193 @@
+"""
+Model type classification for the models directory scan.
+
+Each model type registers a rule: the folder names that hold it, the file
+extensions it uses, optional include/exclude patterns and the marker files
+that make a folder a directory-format model (diffusers and friends). The
+scanner asks the registry once per directory listing, so a directory-format
+model is reported as a single unit and nothing below it is walked.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Iterable, Pattern
+
+__all__ = [
+    "ModelTypeRule",
+    "register_model_type",
+    "model_types",
+    "rule_by_name",
+    "rule_for_directory",
+    "is_excluded",
+    "classify_file",
+    "classify_directory",
+]
+
+# Never descend into or report these (hidden folders, caches, partial downloads)
+EXCLUDE_PATTERN = re.compile(
+    r"^\.|^__pycache__$|^\.?cache$|\.(tmp|part|partial|crdownload|lock|incomplete)$",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class ModelTypeRule:
+    name: str
+    directories: Tuple[str, ...]
+    extensions: Tuple[str, ...]
+    directory_markers: Tuple[str, ...] = ()
+    include: Optional[str] = None
+    exclude: Optional[str] = None
+    _include: Optional[Pattern] = field(default=None, init=False, repr=False)
+    _exclude: Optional[Pattern] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self.directories = tuple(d.lower() for d in self.directories)
+        self.extensions = tuple(e.lower() for e in self.extensions)
+        self._include = (
+            re.compile(self.include, re.IGNORECASE) if self.include else None
+        )
+        self._exclude = (
+            re.compile(self.exclude, re.IGNORECASE) if self.exclude else None
+        )
+
+    def matches_file(self, filename: str) -> bool:
+        lowered = filename.lower()
+        if not lowered.endswith(self.extensions):
+            return False
+        if self._include and not self._include.search(filename):
+            return False
+        if self._exclude and self._exclude.search(filename):
+            return False
+        return True
+
+    def matches_directory(self, names: Iterable[str]) -> bool:
+        return any(marker in names for marker in self.directory_markers)
+
+
+_REGISTRY: Dict[str, ModelTypeRule] = {}
+_DIRECTORY_INDEX: Dict[str, ModelTypeRule] = {}
+
+
+def register_model_type(rule: ModelTypeRule) -> ModelTypeRule:
+    """
+    Add or replace a model type. Later registrations win for shared folder names.
+    """
+    _REGISTRY[rule.name] = rule
+    _DIRECTORY_INDEX.clear()
+    for registered in _REGISTRY.values():
+        for directory in registered.directories:
+            _DIRECTORY_INDEX[directory] = registered
+    return rule
+
+
+def model_types() -> List[ModelTypeRule]:
+    return list(_REGISTRY.values())
+
+
+def rule_by_name(name: Optional[str]) -> Optional[ModelTypeRule]:
+    return _REGISTRY.get(name) if name else None
+
+
+def rule_for_directory(
+    name: str, inherited: Optional[ModelTypeRule] = None
+) -> Optional[ModelTypeRule]:
+    """
+    The rule that applies inside a folder: its own if the folder name is a
+    known type folder, otherwise the one inherited from its parent.
+    """
+    return _DIRECTORY_INDEX.get(name.lower(), inherited)
+
+
+def is_excluded(name: str) -> bool:
+    return bool(EXCLUDE_PATTERN.search(name))
+
+
+def classify_file(
+    filename: str, rule: Optional[ModelTypeRule]
+) -> Optional[ModelTypeRule]:
+    if rule is None or not rule.matches_file(filename) or is_excluded(filename):
+        return None
+    return rule
+
+
+def classify_directory(
+    name: str, names: Iterable[str], rule: Optional[ModelTypeRule]
+) -> Optional[ModelTypeRule]:
+    """
+    Return the rule if the folder is a directory-format model.
+
+    Type folders themselves ("loras", "main") are never model units, even if
+    someone left a config.json in them.
+    """
+    if rule is None or name.lower() in _DIRECTORY_INDEX:
+        return None
+    names = set(names)
+    return rule if rule.matches_directory(names) else None
+
+
+WEIGHTS = (".safetensors", ".ckpt", ".pt", ".pth", ".bin")
+
+for _rule in [
+    ModelTypeRule(
+        "main",
+        ("checkpoints", "checkpoint", "main", "stable-diffusion"),
+        WEIGHTS + (".gguf",),
+        directory_markers=("model_index.json",),
+        exclude=r"\.vae\.",
+    ),
+    ModelTypeRule(
+        "lora",
+        ("loras", "lora", "lycoris", "locon"),
+        (".safetensors", ".ckpt", ".pt", ".bin"),
+        directory_markers=("pytorch_lora_weights.safetensors", "adapter_config.json"),
+    ),
+    ModelTypeRule(
+        "embedding",
+        ("embeddings", "embedding", "textual_inversion", "textual_inversions"),
+        (".safetensors", ".pt", ".bin"),
+        directory_markers=("learned_embeds.bin", "learned_embeds.safetensors"),
+    ),
+    ModelTypeRule(
+        "vae",
+        ("vae", "vaes"),
+        (".safetensors", ".ckpt", ".pt", ".bin"),
+        directory_markers=("config.json",),
+    ),
+    ModelTypeRule(
+        "controlnet",
+        ("controlnet", "controlnets", "control_lora"),
+        (".safetensors", ".pth", ".bin"),
+        directory_markers=("config.json",),
+    ),
+    ModelTypeRule(
+        "t2i_adapter",
+        ("t2i_adapter", "t2i_adapters"),
+        (".safetensors", ".pth", ".bin"),
+        directory_markers=("config.json",),
+    ),
+    ModelTypeRule(
+        "ip_adapter",
+        ("ip_adapter", "ip_adapters", "ipadapter"),
+        (".safetensors", ".bin"),
+        directory_markers=("image_encoder.txt", "ip_adapter.bin"),
+    ),
+    ModelTypeRule(
+        "clip_vision",
+        ("clip_vision",),
+        (".safetensors", ".bin"),
+        directory_markers=("config.json",),
+    ),
+    ModelTypeRule(
+        "t5_encoder",
+        ("t5_encoder", "clip_embed"),
+        (".safetensors", ".bin", ".gguf"),
+        directory_markers=("config.json", "model_index.json"),
+    ),
+    ModelTypeRule(
+        "spandrel_image_to_image",
+        ("spandrel_image_to_image", "upscalers", "upscale_models", "esrgan"),
+        (".safetensors", ".pth", ".pt"),
+    ),
+]:
+    register_model_type(_rule)
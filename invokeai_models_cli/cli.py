@@ -1,7 +1,12 @@
 from .__version__ import __version__
 import typer
+from pathlib import Path
+from typing import List
 from typing_extensions import Annotated
 
+from . import functions, timings, throttle
+from .helpers import console, feedback_message, parse_size, parse_since
+
 from .functions import (
     list_snapshots,
     delete_snapshot,
@@ -15,6 +20,29 @@ from .functions import (
     about_cli,
     delete_models,
 )
+from .verify import verify_hashes
+from .locate import locate_missing_models
+from .duplicates import find_duplicates
+from .stats import library_stats
+from .undo import list_operations, undo_operation
+from .plans import write_sync_plan, apply_sync_plan_file
+from .relocate import relocate_models
+from .register import unregistered_models
+from .jobs import hash_job, job_status, cancel_job
+from .changes import show_changes
+from .query import query_models
+from .covers import cover_images
+from .metrics import export_metrics
+from .search import SORTS
+from .installs import (
+    add_install,
+    remove_install,
+    list_installs,
+    compare_installs,
+    sync_installs,
+    snapshot_installs,
+    installs_report,
+)
 
 """
 ==============================================================================
@@ -47,6 +75,19 @@ invokeai-models local-models
 invokeai-models compare-models
 invokeai-models sync-models
 invokeai-models database-models
+invokeai-models verify-hashes
+invokeai-models locate-missing
+invokeai-models find-duplicates
+invokeai-models stats
+invokeai-models undo
+invokeai-models relocate OLD_PREFIX NEW_PREFIX
+invokeai-models unregistered-models
+invokeai-models changes
+invokeai-models query [TEXT]
+invokeai-models cover-images
+invokeai-models metrics [--textfile PATH]
+invokeai-models installs add|remove|list|compare|sync|snapshot|report
+invokeai-models jobs hash|status|cancel
 invokeai-models about
 """
 
@@ -55,6 +96,81 @@ __all__ = ["invoke_models_cli"]
 
 invoke_models_cli = typer.Typer()
 database_cli = typer.Typer()
+installs_cli = typer.Typer()
+jobs_cli = typer.Typer()
+
+
+@invoke_models_cli.callback()
+def invoke_models_callback(
+    ctx: typer.Context,
+    show_timings: bool = typer.Option(
+        False, "--timings", help="Print per-phase timings and counters when done"
+    ),
+    timings_json: Path = typer.Option(
+        None, "--timings-json", help="Write the timings as a JSON trace to this file"
+    ),
+    profile: Path = typer.Option(
+        None, "--profile", help="Write a cProfile dump of the command to this file"
+    ),
+    io_rate: str = typer.Option(
+        None,
+        "--io-rate",
+        envvar="IO_RATE",
+        help="Limit scan and hash reads to this many bytes per second (e.g. 50M)",
+    ),
+    io_ops: int = typer.Option(
+        None,
+        "--io-ops",
+        envvar="IO_OPS",
+        help="Limit listings, stats and opens to this many per second",
+    ),
+    io_per_device: int = typer.Option(
+        None,
+        "--io-per-device",
+        envvar="IO_PER_DEVICE",
+        help="Files read at the same time on one disk",
+    ),
+    pause_when_busy: bool = typer.Option(
+        False,
+        "--pause-when-busy",
+        envvar="IO_PAUSE_WHEN_BUSY",
+        help="Pause scans and hashing while Invoke AI is writing to its database",
+    ),
+):
+    if io_rate or io_ops or io_per_device or pause_when_busy:
+        try:
+            bytes_per_second = parse_size(io_rate) if io_rate else None
+        except ValueError as e:
+            raise typer.BadParameter(str(e), param_hint="--io-rate")
+        database_path = functions.DATABASE_PATH
+        throttle.configure(
+            bytes_per_second,
+            io_ops,
+            io_per_device,
+            busy_paths=(
+                [database_path, f"{database_path}-wal"] if pause_when_busy else ()
+            ),
+        )
+
+    if not (show_timings or timings_json or profile):
+        return
+
+    timings.enable()
+    if profile:
+        timings.start_profile()
+
+    def report() -> None:
+        if profile:
+            timings.stop_profile(profile)
+            typer.echo(f"Profile written to {profile}")
+        if timings_json:
+            timings.write_trace(timings_json)
+            typer.echo(f"Timings written to {timings_json}")
+        if show_timings:
+            console.print(timings.timings_table())
+
+    ctx.call_on_close(report)
+
 
 invoke_models_cli.add_typer(
     database_cli,
@@ -62,6 +178,18 @@ invoke_models_cli.add_typer(
     help="Manage the snapshots of the Invoke AI database.",
     no_args_is_help=True,
 )
+invoke_models_cli.add_typer(
+    installs_cli,
+    name="installs",
+    help="Work across several Invoke AI installs sharing the models folder.",
+    no_args_is_help=True,
+)
+invoke_models_cli.add_typer(
+    jobs_cli,
+    name="jobs",
+    help="Run long hashing jobs that survive interruptions.",
+    no_args_is_help=True,
+)
 # invoke_models_cli.add_typer(
 #     utils_cli, name="tools", help="Utilities.", no_args_is_help=True
 # )
@@ -93,6 +221,63 @@ def database_restore_command():
     restore_snapshot()
 
 
+INSTALL_OPTION = typer.Option(
+    None, "--install", "-i", help="Only these installs (repeatable), default all"
+)
+
+
+@installs_cli.command("add", help="Register another Invoke AI install.")
+def installs_add_command(
+    name: str = typer.Argument(..., help="Name for the install"),
+    invoke_ai_dir: str = typer.Argument(..., help="The Invoke AI install directory"),
+):
+    add_install(name, invoke_ai_dir)
+
+
+@installs_cli.command("remove", help="Forget a registered install.")
+def installs_remove_command(name: str = typer.Argument(..., help="Install name")):
+    remove_install(name)
+
+
+@installs_cli.command("list", help="List the registered installs.")
+def installs_list_command():
+    list_installs()
+
+
+@installs_cli.command(
+    "compare", help="Compare every install database with the shared models folder."
+)
+def installs_compare_command(install: List[str] = INSTALL_OPTION):
+    compare_installs(install)
+
+
+@installs_cli.command("sync", help="Sync missing models in every install database.")
+def installs_sync_command(
+    install: List[str] = INSTALL_OPTION,
+    dry_run: bool = typer.Option(
+        False, "--dry-run", "-d", help="Perform a dry run without making changes"
+    ),
+):
+    sync_installs(install, dry_run=dry_run)
+
+
+@installs_cli.command("snapshot", help="Snapshot every install database.")
+def installs_snapshot_command(install: List[str] = INSTALL_OPTION):
+    snapshot_installs(install)
+
+
+@installs_cli.command(
+    "report", help="Show which install references which local model file."
+)
+def installs_report_command(
+    install: List[str] = INSTALL_OPTION,
+    unreferenced: bool = typer.Option(
+        False, "--unreferenced", "-u", help="Only list files no install references"
+    ),
+):
+    installs_report(install, unreferenced_only=unreferenced)
+
+
 @invoke_models_cli.command("update-cache")
 def update_cache_command():
     """
@@ -128,9 +313,26 @@ def compare_models_command():
 def sync_models_command(
     dry_run: bool = typer.Option(
         False, "--dry-run", "-d", help="Perform a dry run without making changes"
-    )
+    ),
+    plan: Path = typer.Option(
+        None, "--plan", help="Write the changes to a plan file instead of applying"
+    ),
+    apply: Path = typer.Option(
+        None, "--apply", help="Apply a plan file written with --plan"
+    ),
+    force: bool = typer.Option(
+        False, "--force", "-f", help="Apply a plan even if it looks stale"
+    ),
 ):
-    sync_models_commands(dry_run=dry_run)
+    if plan and apply:
+        feedback_message("Use either --plan or --apply, not both.", "error")
+        raise typer.Exit(code=1)
+    if plan:
+        write_sync_plan(str(plan))
+    elif apply:
+        apply_sync_plan_file(str(apply), force=force)
+    else:
+        sync_models_commands(dry_run=dry_run)
 
 
 @invoke_models_cli.command(
@@ -144,6 +346,250 @@ def delete_models_command(
     delete_models(dry_run=dry_run)
 
 
+@invoke_models_cli.command(
+    "verify-hashes", help="Verify database hashes against the model files on disk."
+)
+def verify_hashes_command(
+    algorithm: str = typer.Option(
+        None,
+        "--algorithm",
+        "-a",
+        help="Force a hashing algorithm instead of reading it from the stored hash",
+    ),
+    workers: int = typer.Option(
+        None, "--workers", "-w", help="Number of files hashed in parallel"
+    ),
+    only_problems: bool = typer.Option(
+        False, "--problems", "-p", help="Only show models that don't match"
+    ),
+):
+    verify_hashes(algorithm=algorithm, workers=workers, only_problems=only_problems)
+
+
+@invoke_models_cli.command(
+    "locate-missing", help="Find where missing database models were moved or renamed."
+)
+def locate_missing_command(
+    dry_run: bool = typer.Option(
+        False, "--dry-run", "-d", help="Perform a dry run without making changes"
+    ),
+    no_verify: bool = typer.Option(
+        False,
+        "--no-verify",
+        help="Accept a unique fingerprint match without confirming the full hash",
+    ),
+):
+    locate_missing_models(dry_run=dry_run, verify=not no_verify)
+
+
+@invoke_models_cli.command(
+    "find-duplicates", help="Find identical model files and the space they waste."
+)
+def find_duplicates_command(
+    hardlink: bool = typer.Option(
+        False, "--hardlink", help="Replace extra copies with hard links"
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", "-d", help="Perform a dry run without making changes"
+    ),
+    workers: int = typer.Option(
+        None, "--workers", "-w", help="Number of files hashed in parallel"
+    ),
+):
+    find_duplicates(hardlink=hardlink, dry_run=dry_run, workers=workers)
+
+
+@invoke_models_cli.command(
+    "stats", help="Show where the disk space of the model library goes."
+)
+def stats_command(
+    depth: int = typer.Option(2, "--depth", help="Directory levels to group sizes by"),
+    top: int = typer.Option(10, "--top", "-n", help="Rows shown per breakdown"),
+    refresh: bool = typer.Option(
+        False, "--refresh", "-r", help="Rescan and reload the caches first"
+    ),
+):
+    library_stats(depth=depth, top=top, refresh=refresh)
+
+
+@invoke_models_cli.command(
+    "undo", help="Revert a recorded sync, delete or relocation of database rows."
+)
+def undo_command(
+    operation: str = typer.Argument(
+        None, help="Operation id to undo, prompts when omitted"
+    ),
+    list_operations_: bool = typer.Option(
+        False, "--list", "-l", help="List the recorded operations"
+    ),
+    force: bool = typer.Option(
+        False, "--force", "-f", help="Undo even if the rows changed again since"
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", "-d", help="Perform a dry run without making changes"
+    ),
+):
+    if list_operations_:
+        list_operations()
+        return
+    undo_operation(operation, force=force, dry_run=dry_run)
+
+
+@invoke_models_cli.command(
+    "relocate", help="Rewrite model paths after a model folder was moved."
+)
+def relocate_command(
+    old_prefix: str = typer.Argument(..., help="Folder the models were moved from"),
+    new_prefix: str = typer.Argument(..., help="Folder the models are now in"),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", "-d", help="Perform a dry run without making changes"
+    ),
+    force: bool = typer.Option(
+        False, "--force", "-f", help="Relocate even if some targets don't exist"
+    ),
+):
+    relocate_models(old_prefix, new_prefix, dry_run=dry_run, force=force)
+
+
+@invoke_models_cli.command(
+    "unregistered-models", help="List local models the database doesn't know about."
+)
+def unregistered_models_command(
+    register: bool = typer.Option(
+        False, "--register", "-r", help="Register them all in the database"
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", "-d", help="Perform a dry run without making changes"
+    ),
+    model_type: List[str] = typer.Option(
+        None, "--type", "-t", help="Only these model types (lora, main, vae...)"
+    ),
+):
+    unregistered_models(register=register, dry_run=dry_run, model_types=model_type)
+
+
+@invoke_models_cli.command(
+    "changes", help="Show models added, removed, moved or modified between scans."
+)
+def changes_command(
+    since: str = typer.Option(
+        None, "--since", "-s", help="Only changes since then (2h, 3d, 2024-05-01...)"
+    ),
+    as_json: bool = typer.Option(
+        False, "--json", help="Print the events as JSON lines"
+    ),
+):
+    try:
+        since_time = parse_since(since) if since else None
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--since")
+    show_changes(since_time, as_json=as_json)
+
+
+@invoke_models_cli.command(
+    "query", help="Search the database models by text, base, type, format and date."
+)
+def query_command(
+    text: str = typer.Argument(
+        None, help="Words to find in names, descriptions, trigger words and tags"
+    ),
+    base: List[str] = typer.Option(
+        None, "--base", "-b", help="Only these bases (sdxl, sd-1, flux...)"
+    ),
+    model_type: List[str] = typer.Option(
+        None, "--type", "-t", help="Only these model types (lora, main, vae...)"
+    ),
+    model_format: List[str] = typer.Option(
+        None, "--format", "-f", help="Only these formats (lora, checkpoint...)"
+    ),
+    since: str = typer.Option(
+        None, "--since", "-s", help="Added since then (2h, 3d, 2024-05-01...)"
+    ),
+    until: str = typer.Option(None, "--until", help="Added before then"),
+    sort: str = typer.Option(
+        None, "--sort", help=f"Order by {', '.join(SORTS)} (relevance with TEXT)"
+    ),
+    descending: bool = typer.Option(False, "--desc", help="Reverse the order"),
+    limit: int = typer.Option(50, "--limit", "-n", help="Models shown at most"),
+    refresh: bool = typer.Option(
+        False, "--refresh", "-r", help="Check every row of the search index again"
+    ),
+):
+    if sort and sort not in SORTS:
+        raise typer.BadParameter(f"Use one of {', '.join(SORTS)}", param_hint="--sort")
+    times = {}
+    for name, value in (("--since", since), ("--until", until)):
+        try:
+            times[name] = parse_since(value) if value else None
+        except ValueError as e:
+            raise typer.BadParameter(str(e), param_hint=name)
+    query_models(
+        text,
+        bases=base,
+        types=model_type,
+        formats=model_format,
+        since=times["--since"],
+        until=times["--until"],
+        sort=sort,
+        descending=descending,
+        limit=limit,
+        refresh=refresh,
+    )
+
+
+@invoke_models_cli.command(
+    "cover-images", help="Find cover images and references without a match."
+)
+def cover_images_command(
+    clean: bool = typer.Option(
+        False, "--clean", "-c", help="Delete the images and clear the references"
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", "-d", help="Perform a dry run without making changes"
+    ),
+):
+    cover_images(clean=clean, dry_run=dry_run)
+
+
+@invoke_models_cli.command(
+    "metrics", help="Print library health gauges in the Prometheus text format."
+)
+def metrics_command(
+    textfile: Path = typer.Option(
+        None,
+        "--textfile",
+        help="Write them atomically to this .prom file for node_exporter",
+    ),
+):
+    if not export_metrics(str(textfile) if textfile else None):
+        raise typer.Exit(code=1)
+
+
+@jobs_cli.command("hash", help="Hash every local model, resuming an interrupted job.")
+def jobs_hash_command(
+    algorithm: str = typer.Option(
+        None, "--algorithm", "-a", help="Hashing algorithm for a new job"
+    ),
+    workers: int = typer.Option(
+        None, "--workers", "-w", help="Number of files hashed in parallel"
+    ),
+    restart: bool = typer.Option(
+        False, "--restart", help="Throw away the current job and start over"
+    ),
+):
+    hash_job(algorithm=algorithm, workers=workers, restart=restart)
+
+
+@jobs_cli.command("status", help="Show the progress of the hashing job.")
+def jobs_status_command():
+    job_status()
+
+
+@jobs_cli.command("cancel", help="Throw away the hashing job.")
+def jobs_cancel_command():
+    cancel_job()
+
+
 @invoke_models_cli.command("about", help="Functions for information on this tool.")
 def about_command(
     readme: bool = typer.Option(
@@ -0,0 +1,242 @@
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Sequence, Set, Tuple
+
+import inquirer
+
+from . import functions
+from .helpers import feedback_message, create_table, format_size
+from .functions import console, journaled_writes, report_write
+from .writes import connect
+from .timings import span, count
+
+__all__ = ["cover_images", "find_cover_orphans", "present_covers"]
+
+# Where InvokeAI keeps model cover images, one "<model key>.webp" per model
+COVERS_FOLDER = "model_images"
+IMAGE_EXTENSIONS = {".webp", ".png", ".jpg", ".jpeg"}
+
+# Files removed per executor call
+UNLINK_BATCH_SIZE = 256
+
+
+def covers_dir(invoke_ai_dir: str = None) -> str:
+    return os.path.join(invoke_ai_dir or functions.INVOKE_AI_DIR, COVERS_FOLDER)
+
+
+def present_covers(images_dir: str) -> Dict[str, int]:
+    """
+    Every image in the covers folder with its size, from one listing.
+    """
+    covers = {}
+    try:
+        with span("scan covers"), os.scandir(images_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if os.path.splitext(entry.name)[1].lower() not in IMAGE_EXTENSIONS:
+                    continue
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        covers[entry.path] = entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
+    except FileNotFoundError:
+        pass
+    count("cover images", len(covers))
+    return covers
+
+
+def cover_path(
+    key: str, value: Optional[str], images_dir: str, invoke_ai_dir: str
+) -> Optional[str]:
+    """
+    The file a ``cover_image`` value points at. InvokeAI may store the API
+    URL of the image (served from "<key>.webp"), a path relative to the
+    install or a bare file name in the covers folder.
+    """
+    if not value:
+        return None
+    if "://" in value or value.startswith("/api/"):
+        return os.path.join(images_dir, f"{key}.webp")
+    if os.path.isabs(value):
+        return os.path.normpath(value)
+    if os.path.dirname(value):
+        return os.path.normpath(os.path.join(invoke_ai_dir, value))
+    return os.path.join(images_dir, value)
+
+
+def find_cover_orphans(
+    rows: Sequence[Tuple[str, Optional[str]]],
+    present: Dict[str, int],
+    images_dir: str,
+    invoke_ai_dir: str,
+) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Orphans in both directions, from the (key, cover_image) rows and the
+    present images: images no model references, and references to images
+    that don't exist.
+
+    An image named after a model key is in use even when the row has no
+    ``cover_image``, since InvokeAI finds covers by key.
+    """
+    keys = set()
+    referenced: Set[str] = set()
+    stale = []
+    for key, value in rows:
+        keys.add(key)
+        path = cover_path(key, value, images_dir, invoke_ai_dir)
+        if path is None:
+            continue
+        referenced.add(path)
+        if path not in present and not os.path.exists(path):
+            stale.append({"key": key, "cover_image": value, "path": path})
+
+    orphans = sorted(
+        path
+        for path in present
+        if path not in referenced
+        and os.path.splitext(os.path.basename(path))[0] not in keys
+    )
+    return orphans, stale
+
+
+def cover_rows(database_path: str) -> List[Tuple[str, Optional[str]]]:
+    connection = connect(database_path)
+    try:
+        with span("db load"):
+            return connection.execute("SELECT key, cover_image FROM models").fetchall()
+    finally:
+        connection.close()
+
+
+def _unlink(paths: List[str]) -> List[Tuple[str, str]]:
+    failures = []
+    for path in paths:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            failures.append((path, str(e)))
+    return failures
+
+
+def remove_files(paths: List[str], max_workers: int = None) -> List[Tuple[str, str]]:
+    """
+    Unlink ``paths`` in batches on a thread pool, returning the failures.
+    """
+    batches = [
+        paths[start : start + UNLINK_BATCH_SIZE]
+        for start in range(0, len(paths), UNLINK_BATCH_SIZE)
+    ]
+    with span("unlink"), ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return [
+            failure for batch in executor.map(_unlink, batches) for failure in batch
+        ]
+
+
+def display_cover_orphans(
+    orphans: List[str], stale: List[Dict[str, Any]], present: Dict[str, int]
+) -> None:
+    if orphans:
+        orphans_table = create_table(
+            f"{len(orphans)} unreferenced cover image(s)",
+            [("Image", "yellow"), ("Size", "white")],
+        )
+        for path in orphans[:20]:
+            orphans_table.add_row(path, format_size(present[path]))
+        if len(orphans) > 20:
+            orphans_table.add_row(f"... {len(orphans) - 20} more", "")
+        with span("render"):
+            console.print(orphans_table)
+
+    if stale:
+        stale_table = create_table(
+            f"{len(stale)} reference(s) to missing cover images",
+            [("Model Key", "cyan"), ("Cover Image", "red")],
+        )
+        for reference in stale[:20]:
+            stale_table.add_row(reference["key"], reference["cover_image"])
+        if len(stale) > 20:
+            stale_table.add_row(f"... {len(stale) - 20} more", "")
+        with span("render"):
+            console.print(stale_table)
+
+
+def cover_images(clean: bool = False, dry_run: bool = False) -> None:
+    database_path = functions.DATABASE_PATH
+    invoke_ai_dir = functions.INVOKE_AI_DIR
+    images_dir = covers_dir(invoke_ai_dir)
+
+    present = present_covers(images_dir)
+    orphans, stale = find_cover_orphans(
+        cover_rows(database_path), present, images_dir, invoke_ai_dir
+    )
+    if not orphans and not stale:
+        feedback_message("Every cover image is referenced and present.", "success")
+        return
+
+    display_cover_orphans(orphans, stale, present)
+    wasted = format_size(sum(present[path] for path in orphans))
+    if not clean:
+        feedback_message(
+            f"{len(orphans)} unreferenced image(s) ({wasted}) and {len(stale)} "
+            "stale reference(s). Use --clean to remove them.",
+            "warning",
+        )
+        return
+
+    if dry_run:
+        console.print(
+            f"[bold green]Dry run: {len(orphans)} image(s) ({wasted}) would be "
+            f"deleted and {len(stale)} reference(s) cleared. No changes were "
+            "made.[/bold green]"
+        )
+        return
+
+    confirm = inquirer.confirm(
+        f"Delete {len(orphans)} image(s) and clear {len(stale)} reference(s)?"
+    )
+    if not confirm:
+        feedback_message("Cleanup cancelled.", "info")
+        return
+
+    if stale:
+        try:
+            # Only rows still pointing at the missing image are cleared
+            stats, entry_id = journaled_writes(
+                "clean-covers",
+                [
+                    (
+                        "UPDATE models SET cover_image = NULL "
+                        "WHERE key = ? AND cover_image = ?",
+                        [(ref["key"], ref["cover_image"]) for ref in stale],
+                    )
+                ],
+                [ref["key"] for ref in stale],
+                database_path,
+                columns=["key", "cover_image"],
+            )
+        except sqlite3.Error as e:
+            feedback_message(
+                f"Error clearing cover images: {str(e)}. Changes rolled back.",
+                "error",
+            )
+            return
+        feedback_message(f"Cleared {stats.rows} stale reference(s).", "success")
+        report_write(stats, entry_id)
+
+    if orphans:
+        # Models may have been added while the prompt was open, recheck the
+        # references (one query) before deleting anything
+        current, _ = find_cover_orphans(
+            cover_rows(database_path), present, images_dir, invoke_ai_dir
+        )
+        still_orphaned = sorted(set(orphans) & set(current))
+        failures = remove_files(still_orphaned)
+        for path, error in failures:
+            feedback_message(f"Error deleting {path}: {error}", "error")
+        removed = len(still_orphaned) - len(failures)
+        feedback_message(f"Deleted {removed} unreferenced image(s).", "success")
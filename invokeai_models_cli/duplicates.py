@@ -0,0 +1,254 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+import inquirer
+
+from .helpers import feedback_message, create_table, format_size
+from .hashing import DEFAULT_ALGORITHM, algorithm_from_hash, model_hash
+from .functions import (
+    console,
+    load_local_and_database_models,
+    database_paths,
+    database_model_for,
+    update_fingerprint_index,
+    save_fingerprint_index,
+)
+from .timings import span
+
+__all__ = ["find_duplicates"]
+
+
+def group_by_size(local_models: List[Dict[str, Any]]) -> Dict[int, List[str]]:
+    """
+    Group local model paths by size, keeping only sizes shared by two or more.
+    """
+    sizes: Dict[int, List[str]] = {}
+    for model in local_models:
+        if model.get("size"):
+            sizes.setdefault(model["size"], []).append(model["file_path"])
+    return {size: paths for size, paths in sizes.items() if len(paths) > 1}
+
+
+def _identity(path: str) -> Any:
+    # Hard links of one file share an inode and take no extra space
+    if os.path.isdir(path):
+        return path
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return path
+    return (stat.st_dev, stat.st_ino)
+
+
+def find_duplicate_groups(
+    local_models: List[Dict[str, Any]],
+    index: Dict[str, Any],
+    referenced: Optional[set] = None,
+    workers: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Find local models with identical content.
+
+    Candidates are narrowed in three stages, each more expensive than the one
+    before: same size, same sampled fingerprint (read from the index, which
+    must already be refreshed for the same-size files), then same full hash.
+    Full hashes are cached in the index. Returns the duplicate groups and how
+    many files were left after each stage.
+    """
+    files = index.get("files", {})
+    referenced = referenced or set()
+
+    sizes = group_by_size(local_models)
+    stages = {"files": len(local_models)}
+    stages["same size"] = sum(len(paths) for paths in sizes.values())
+
+    fingerprints: Dict[str, List[str]] = {}
+    for paths in sizes.values():
+        for path in paths:
+            fingerprint = files.get(path, {}).get("fingerprint")
+            if fingerprint:
+                fingerprints.setdefault(fingerprint, []).append(path)
+    candidates = [paths for paths in fingerprints.values() if len(paths) > 1]
+    stages["same fingerprint"] = sum(len(paths) for paths in candidates)
+
+    to_hash = [
+        path
+        for paths in candidates
+        for path in paths
+        if algorithm_from_hash(files[path].get("hash")) != DEFAULT_ALGORITHM
+    ]
+    if to_hash:
+
+        def full_hash(path: str) -> Tuple[Optional[str], Optional[str]]:
+            # One file per call, an unreadable copy only drops that copy
+            try:
+                return model_hash(path, DEFAULT_ALGORITHM, max_workers=1), None
+            except OSError as e:
+                return None, str(e)
+
+        with (
+            console.status(f"[green]Hashing {len(to_hash)} candidate(s)...[/green]"),
+            ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor,
+        ):
+            for path, (value, error) in zip(to_hash, executor.map(full_hash, to_hash)):
+                if value is None:
+                    feedback_message(f"Error hashing {path}: {error}", "error")
+                else:
+                    files[path]["hash"] = value
+
+    groups = []
+    for paths in candidates:
+        by_hash: Dict[str, List[str]] = {}
+        for path in paths:
+            if files[path].get("hash"):
+                by_hash.setdefault(files[path]["hash"], []).append(path)
+        for value, same in by_hash.items():
+            if len(same) < 2:
+                continue
+            same.sort(key=lambda path: (path not in referenced, path))
+            size = files[same[0]]["size"]
+            copies = len({_identity(path) for path in same})
+            groups.append(
+                {
+                    "hash": value,
+                    "size": size,
+                    "paths": same,
+                    "referenced": [path for path in same if path in referenced],
+                    "reclaimable": size * (copies - 1),
+                }
+            )
+
+    stages["duplicates"] = sum(len(group["paths"]) for group in groups)
+    groups.sort(key=lambda group: group["reclaimable"], reverse=True)
+    return groups, stages
+
+
+def hardlink_duplicates(groups: List[Dict[str, Any]]) -> Tuple[int, int, List[str]]:
+    """
+    Replace every extra copy with a hard link to the first path of its group
+    (a copy the database references when there is one).
+
+    The link is made next to the copy and renamed over it, so a copy is never
+    missing even if the process dies halfway. Directory models and copies on
+    another device are skipped. Returns (linked, bytes freed, failures).
+    """
+    linked, freed, failures = 0, 0, []
+    for group in groups:
+        keep = group["paths"][0]
+        if os.path.isdir(keep):
+            continue
+        keep_stat = os.stat(keep)
+        for path in group["paths"][1:]:
+            try:
+                stat = os.stat(path)
+                if (stat.st_dev, stat.st_ino) == (keep_stat.st_dev, keep_stat.st_ino):
+                    continue
+                if stat.st_dev != keep_stat.st_dev:
+                    failures.append(f"{path}: on another device than {keep}")
+                    continue
+                # Other hard links keep the replaced copy's data on the disk
+                frees = stat.st_nlink == 1
+                temp_path = f"{path}.{os.getpid()}.tmp"
+                os.link(keep, temp_path)
+                try:
+                    os.replace(temp_path, path)
+                except OSError:
+                    os.unlink(temp_path)
+                    raise
+            except OSError as e:
+                failures.append(f"{path}: {str(e)}")
+                continue
+            linked += 1
+            if frees:
+                freed += group["size"]
+    return linked, freed, failures
+
+
+def display_duplicate_groups(groups: List[Dict[str, Any]]) -> None:
+    duplicates_table = create_table(
+        "Duplicate Models",
+        [
+            ("Group", "cyan"),
+            ("Path", "green"),
+            ("Size", "white"),
+            ("In Database", "yellow"),
+            ("Reclaimable", "magenta"),
+        ],
+    )
+    for number, group in enumerate(groups, start=1):
+        for position, path in enumerate(group["paths"]):
+            first = position == 0
+            duplicates_table.add_row(
+                str(number) if first else "",
+                path,
+                format_size(group["size"]) if first else "",
+                "yes" if path in group["referenced"] else "",
+                format_size(group["reclaimable"]) if first else "",
+            )
+    with span("render"):
+        console.print(duplicates_table)
+
+
+def find_duplicates(
+    hardlink: bool = False, dry_run: bool = False, workers: Optional[int] = None
+) -> None:
+    local_models, db_models = load_local_and_database_models()
+    if not local_models:
+        feedback_message("No local models found.", "info")
+        return
+
+    sizes = group_by_size(local_models)
+    same_size = {path for paths in sizes.values() for path in paths}
+    index = update_fingerprint_index(
+        local_models, db_models, select=lambda model: model["file_path"] in same_size
+    )
+    db_by_path = database_paths(db_models)
+    referenced = {
+        model["file_path"]
+        for model in local_models
+        if database_model_for(model, db_by_path) is not None
+    }
+    groups, stages = find_duplicate_groups(local_models, index, referenced, workers)
+    save_fingerprint_index(index)
+
+    console.print(
+        "[dim]"
+        + " -> ".join(f"{value} {stage}" for stage, value in stages.items())
+        + "[/dim]"
+    )
+    if not groups:
+        feedback_message("No duplicate models found.", "success")
+        return
+
+    display_duplicate_groups(groups)
+    reclaimable = sum(group["reclaimable"] for group in groups)
+    feedback_message(
+        f"Found {len(groups)} duplicate group(s), "
+        f"{format_size(reclaimable)} reclaimable.",
+        "warning",
+    )
+
+    if not hardlink or not reclaimable:
+        return
+    if dry_run:
+        console.print(
+            "[bold green]Dry run: extra copies would be replaced with hard links "
+            "to the first path of each group. No files were changed.[/bold green]"
+        )
+        return
+
+    confirm = inquirer.confirm(
+        f"Replace the extra copies in {len(groups)} group(s) with hard links?"
+    )
+    if not confirm:
+        feedback_message("Hard linking cancelled.", "info")
+        return
+
+    linked, freed, failures = hardlink_duplicates(groups)
+    for failure in failures:
+        feedback_message(f"Skipped {failure}", "warning")
+    feedback_message(
+        f"Replaced {linked} copies with hard links, {format_size(freed)} freed.",
+        "success",
+    )
@@ -0,0 +1,195 @@
+"""
+Sampled fingerprints: a cheap identity for model files.
+
+A fingerprint is the file size plus a BLAKE2b digest of the first, middle and
+last few MiB, so it costs three short reads no matter how large the model is.
+Two files with different fingerprints are certainly different; equal
+fingerprints are candidates that a full hash can confirm.
+
+The fingerprint index keeps one entry per local model, reused while its size
+and modification time don't change, plus what it learned about database
+models while their files were present (fingerprint and stored hash). Both are
+plain dictionaries, so every lookup is O(1).
+"""
+
+import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Callable
+
+from . import throttle
+from .timings import span, count
+
+__all__ = [
+    "SAMPLE_SIZE",
+    "sampled_fingerprint",
+    "model_fingerprint",
+    "refresh_index",
+    "learn_database_models",
+    "merge_index",
+    "index_by",
+]
+
+SAMPLE_SIZE = 4 * 1024 * 1024
+
+
+def sampled_fingerprint(
+    path: str, size: Optional[int] = None, sample_size: int = SAMPLE_SIZE
+) -> str:
+    if size is None:
+        size = os.path.getsize(path)
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(size.to_bytes(8, "little"))
+    with span("fingerprint"), throttle.operation(path), open(path, "rb") as f:
+        if size <= 3 * sample_size:
+            throttle.charge(size)
+            digest.update(f.read())
+            read = size
+        else:
+            for offset in (0, (size - sample_size) // 2, size - sample_size):
+                throttle.charge(sample_size)
+                f.seek(offset)
+                digest.update(f.read(sample_size))
+            read = 3 * sample_size
+    count("bytes sampled", read)
+    return f"{size}:{digest.hexdigest()}"
+
+
+def model_fingerprint(path: str, sample_size: int = SAMPLE_SIZE) -> str:
+    """
+    Fingerprint a model file, or a directory model from its component files.
+    """
+    if not os.path.isdir(path):
+        return sampled_fingerprint(path, sample_size=sample_size)
+
+    digest = hashlib.blake2b(digest_size=16)
+    total = 0
+    for root, _dirs, files in sorted(os.walk(path)):
+        for filename in sorted(files):
+            file_path = os.path.join(root, filename)
+            component = sampled_fingerprint(file_path, sample_size=sample_size)
+            total += int(component.split(":", 1)[0])
+            digest.update(os.path.relpath(file_path, path).encode("utf-8"))
+            digest.update(component.encode("utf-8"))
+    return f"{total}:{digest.hexdigest()}"
+
+
+def refresh_index(
+    index: Dict[str, Any],
+    local_models: List[Dict[str, Any]],
+    sample_size: int = SAMPLE_SIZE,
+    max_workers: Optional[int] = None,
+    select: Optional[Callable[[Dict[str, Any]], bool]] = None,
+) -> Dict[str, Any]:
+    """
+    Bring the index in line with the local models.
+
+    Entries whose size and modification time are unchanged are kept as they
+    are (including any cached full hash); new or changed files are
+    fingerprinted in parallel; files that disappeared are dropped. With
+    ``select`` only the models it accepts are fingerprinted, the others just
+    keep a still valid entry.
+    """
+    # Fingerprints taken with another sample size can't be compared
+    previous = index.get("files", {}) if index.get("sample_size") == sample_size else {}
+    files: Dict[str, Dict[str, Any]] = {}
+    stale = []
+
+    for model in local_models:
+        path = model["file_path"]
+        entry = previous.get(path)
+        if (
+            entry
+            and entry.get("size") == model.get("size")
+            and entry.get("updated") == model.get("updated")
+        ):
+            files[path] = entry
+        elif select is None or select(model):
+            stale.append(model)
+
+    def fingerprint(model: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        try:
+            value = model_fingerprint(model["file_path"], sample_size)
+        except OSError:
+            return None
+        return {
+            "size": model.get("size"),
+            "updated": model.get("updated"),
+            "name": model["name"],
+            "fingerprint": value,
+        }
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        for model, entry in zip(stale, executor.map(fingerprint, stale)):
+            if entry is not None:
+                files[model["file_path"]] = entry
+
+    return {
+        "sample_size": sample_size,
+        "files": files,
+        "known": index.get("known", {}),
+    }
+
+
+def learn_database_models(
+    index: Dict[str, Any], db_models: List[Dict[str, Any]], resolve=lambda p: p
+) -> int:
+    """
+    Remember the fingerprint of every database model whose file is present, and
+    attach the stored hash to that file's entry as ``db_hash`` (a claim, unlike
+    ``hash`` which is only ever set from a hash we computed). Fingerprints of
+    models that are no longer in the database are dropped. Returns how many
+    were learned.
+    """
+    files = index.get("files", {})
+    db_keys = {model["key"] for model in db_models}
+    # Keep what we know about models that went missing, forget deleted ones
+    known = {
+        key: value for key, value in index.get("known", {}).items() if key in db_keys
+    }
+    index["known"] = known
+    learned = 0
+    for model in db_models:
+        entry = files.get(resolve(model.get("path") or ""))
+        if entry is None:
+            continue
+        known[model["key"]] = entry["fingerprint"]
+        if model.get("hash"):
+            entry["db_hash"] = model["hash"]
+        learned += 1
+    return learned
+
+
+def merge_index(index: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fold into ``index`` what another run saved to ``current`` since ``index``
+    was read: fields (like a full hash) of entries that still describe the
+    same file, and fingerprints learned about database models. Files that
+    ``index`` dropped stay dropped.
+    """
+    if current.get("sample_size") == index.get("sample_size"):
+        saved = current.get("files", {})
+        for path, entry in index.get("files", {}).items():
+            other = saved.get(path)
+            if other is None or any(
+                other.get(field) != entry.get(field)
+                for field in ("size", "updated", "fingerprint")
+            ):
+                continue
+            for field, value in other.items():
+                entry.setdefault(field, value)
+    index["known"] = {**current.get("known", {}), **index.get("known", {})}
+    return index
+
+
+def index_by(index: Dict[str, Any], field: str) -> Dict[str, List[str]]:
+    """
+    Group the indexed paths by one of their fields (fingerprint, hash, name...).
+    """
+    grouped: Dict[str, List[str]] = {}
+    for path, entry in index.get("files", {}).items():
+        value = entry.get(field)
+        if value:
+            grouped.setdefault(value, []).append(path)
+    return grouped
@@ -2,19 +2,34 @@ import typer
 import shutil
 import os
 import json
+import time
 import inquirer
 import importlib.resources
 import tempfile
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Tuple, Union
+from typing import List, Dict, Any, Tuple, Union, Callable
 import sqlite3
 from .helpers import (
     feedback_message,
     create_table,
     random_name,
     process_tuples,
+    read_json,
+    write_json,
+    write_atomic,
+    file_lock,
+    format_size,
 )
+from .timings import span, count
+from .scanner import walk_models, stat_model, merge_aliases, model_real_paths, real_path
+from .pipeline import load_models_concurrently
+from .prefetch import Prefetch
+from .shards import ShardIndex
+from .changelog import diff_scans, append_changes
+from .fingerprint import refresh_index, learn_database_models, merge_index
+from .writes import WriteStats, Write, apply_writes
+from .journal import append_entry, new_entry
 from operator import itemgetter
 from rich.markdown import Markdown
 from rich.progress import Progress
@@ -47,23 +62,78 @@ __all__ = [
 # TODO - Need to break this file in to multiple files
 
 
-def get_db(connection: bool = False) -> Union[sqlite3.Connection, sqlite3.Cursor]:
+def get_db(
+    connection: bool = False, database_path: str = None
+) -> Union[sqlite3.Connection, sqlite3.Cursor]:
     # TODO - Move this to a helper file
-    database = sqlite3.connect(DATABASE_PATH)
+    database = sqlite3.connect(database_path or DATABASE_PATH)
     if connection:
         return database
     return database.cursor()
 
 
+def resolve_model_path(path: str, invoke_ai_dir: str = None) -> str:
+    """
+    Database paths are either absolute or relative to the InvokeAI models folder.
+    """
+    if not path or os.path.isabs(path):
+        return path
+    return os.path.join(invoke_ai_dir or INVOKE_AI_DIR, "models", path)
+
+
+def canonical_model_path(path: str, invoke_ai_dir: str = None) -> str:
+    """
+    A database path made absolute with its symlinks resolved, comparable with
+    the real paths of local models.
+    """
+    return real_path(resolve_model_path(path, invoke_ai_dir)) if path else path
+
+
+def database_paths(
+    db_models: List[Dict[str, Any]], invoke_ai_dir: str = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Database models by canonical path, normalized once for a whole comparison.
+    """
+    return {
+        canonical_model_path(model["path"], invoke_ai_dir): model
+        for model in db_models
+        if model.get("path")
+    }
+
+
+def database_model_for(
+    model: Dict[str, Any], db_by_path: Dict[str, Dict[str, Any]]
+) -> Union[Dict[str, Any], None]:
+    """
+    The database row pointing at a local model under any of its names.
+    """
+    for path in model_real_paths(model):
+        if path in db_by_path:
+            return db_by_path[path]
+    return None
+
+
+def load_database_models(database_path: str = None) -> List[Dict[str, Any]]:
+    with span("db load"):
+        db_conn = get_db(connection=True, database_path=database_path)
+        try:
+            rows = db_conn.execute("SELECT * FROM models").fetchall()
+        finally:
+            db_conn.close()
+    count("rows read", len(rows))
+
+    with span("decode"):
+        return process_tuples(rows)
+
+
 def get_database_models() -> List[Dict[str, Any]]:
     # TODO - Move this to a helper file
     cached_data = manage_cache("database_models")
     if cached_data is not None:
         return cached_data
 
-    db_models = process_tuples(
-        get_db(connection=True).execute("SELECT * FROM models").fetchall()
-    )
+    db_models = load_database_models()
     return manage_cache("database_models", db_models)
 
 
@@ -71,27 +141,17 @@ def get_database_models() -> List[Dict[str, Any]]:
 def update_cache(display: bool = True) -> None:
     """
     Manually update both local and database model caches.
-    Deletes existing cache files before creating new ones.
+    The new caches replace the old ones atomically, so commands running at
+    the same time keep reading the previous ones until then.
     """
-    # TODO - Cache was not updating correctly, need to figure out why, deleting and recreating works fine
-
-    # Delete existing cache files
-    for cache_type in ["local_models", "database_models"]:
-        cache_file = os.path.join(SNAPSHOTS_DIR, f"{cache_type}_cache.json")
-        if os.path.exists(cache_file):
-            os.remove(cache_file)
-            # if display:
-            #     feedback_message("Deleted existing cache file.", "success")
-
-    # Update local models cache
-    local_models = collect_model_info(MODELS_DIR)
-    manage_cache("local_models", local_models)
-
-    # Update database models cache
-    db_models = process_tuples(
-        get_db(connection=True).execute("SELECT * FROM models").fetchall()
-    )
-    manage_cache("database_models", db_models)
+    # Two rebuilds at once would only do the work twice
+    with file_lock(os.path.join(SNAPSHOTS_DIR, "update-cache")):
+        # Update local models cache, every directory is listed again
+        scan_local_models(rescan=True)
+
+        # Update database models cache
+        db_models = load_database_models()
+        manage_cache("database_models", db_models)
 
     if display:
         feedback_message("Successfully updated cache.", "success")
@@ -105,12 +165,14 @@ def manage_cache(
 
     if data is not None:
         cache = {"last_updated": current_time.isoformat(), "data": data}
-        with open(cache_file, "w") as f:
-            json.dump(cache, f, indent=2)
+        # Compact output keeps json on its C encoder, indent=2 is several times
+        # slower. The cache is rebuilt if lost, no need to fsync it
+        with span("cache write"):
+            write_json(cache_file, cache, sync=False)
         return data
 
     if os.path.exists(cache_file):
-        with open(cache_file, "r") as f:
+        with span("cache read"), open(cache_file, "r") as f:
             cache = json.load(f)
 
         last_updated = datetime.fromisoformat(cache["last_updated"])
@@ -121,11 +183,161 @@ def manage_cache(
     return None
 
 
+def local_index_path() -> str:
+    return os.path.join(SNAPSHOTS_DIR, "local-index")
+
+
+def local_index() -> ShardIndex:
+    return ShardIndex.load(local_index_path(), MODELS_DIR)
+
+
+def change_journal_path() -> str:
+    return os.path.join(SNAPSHOTS_DIR, "changes.jsonl")
+
+
+def scan_local_models(
+    load_db: Callable[[], List[Dict[str, Any]]] = None,
+    rescan: bool = False,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Scan the models directory through the sharded local index, so only
+    directories that changed since the last scan are listed again (all of
+    them with ``rescan``), and run ``load_db`` alongside. What changed since
+    the previous scan is appended to the change journal.
+
+    Returns (local_models, db_models).
+    """
+    started = time.perf_counter()
+    index = local_index()
+    if rescan:
+        index.clear()
+    local_models, db_models = load_models_concurrently(
+        MODELS_DIR, load_db or (lambda: []), index=index
+    )
+    # The walk runs unlocked, readers never wait on a long rescan. Only the
+    # diff against the last saved index and the writes are serialized, so two
+    # scans can't journal the same change twice
+    with span("cache write"), file_lock(local_index_path()):
+        saved = local_index()
+        # Nothing to compare against the first time, everything would be "added"
+        previous = saved.models() if saved.shards else None
+        index.save()
+        if previous is not None:
+            append_changes(change_journal_path(), diff_scans(previous, local_models))
+        record_run("scan", time.perf_counter() - started)
+    return local_models, db_models
+
+
+def last_runs_path() -> str:
+    return os.path.join(SNAPSHOTS_DIR, "last-runs.json")
+
+
+def record_run(name: str, seconds: float) -> None:
+    """
+    Remember when the last scan or sync finished and how long it took, for
+    the metrics exporter.
+    """
+    with file_lock(last_runs_path()):
+        runs = read_json(last_runs_path(), {})
+        runs[name] = {"finished": datetime.now().isoformat(), "seconds": seconds}
+        write_json(last_runs_path(), runs)
+
+
+def fingerprints_path() -> str:
+    return os.path.join(SNAPSHOTS_DIR, "fingerprints.json")
+
+
+def update_fingerprint_index(
+    local_models: List[Dict[str, Any]],
+    db_models: List[Dict[str, Any]],
+    select: Callable[[Dict[str, Any]], bool] = None,
+) -> Dict[str, Any]:
+    """
+    Refresh the sampled fingerprint index (only new or changed files are read,
+    and with ``select`` only the models it accepts) and remember which file
+    each present database model points at.
+    """
+    index = read_json(fingerprints_path(), {})
+
+    with console.status("[green]Updating fingerprint index...[/green]"):
+        index = refresh_index(index, local_models, select=select)
+    learn_database_models(index, db_models, resolve_model_path)
+
+    save_fingerprint_index(index)
+    return index
+
+
+def save_fingerprint_index(index: Dict[str, Any]) -> None:
+    """
+    Save ``index``, merged under the lock with what other runs (``jobs hash``
+    storing hashes, another refresh) saved since it was read.
+    """
+    with file_lock(fingerprints_path()):
+        merge_index(index, read_json(fingerprints_path(), {}))
+        write_json(fingerprints_path(), index)
+
+
 # ANCHOR - CACHE FUNCTIONS END
 
 
 # ANCHOR: DATABASE FUNCTIONS START
-def create_snapshot() -> None:
+def undo_journal_path() -> str:
+    return os.path.join(SNAPSHOTS_DIR, "undo-journal.jsonl")
+
+
+def journaled_writes(
+    command: str,
+    writes: List[Write],
+    keys: Union[List[str], Callable[[sqlite3.Connection], List[str]]],
+    database_path: str = None,
+    undoes: str = None,
+    guard: Callable[[List[Dict[str, Any]]], None] = None,
+    columns: List[str] = None,
+) -> Tuple[WriteStats, Union[str, None]]:
+    """
+    Apply ``writes`` in one short transaction and record the prior and new
+    state of the touched rows in the undo journal.
+
+    Returns the write stats and the journal entry id (None if nothing changed
+    or the journal couldn't be written).
+    """
+    database_path = database_path or DATABASE_PATH
+    stats = apply_writes(
+        database_path, writes, capture=keys, guard=guard, capture_columns=columns
+    )
+    if not stats.before and not stats.after:
+        return stats, None
+
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    entry = new_entry(
+        command,
+        database_path,
+        stats.before,
+        stats.after,
+        f"{random_name()}_{timestamp}",
+        undoes=undoes,
+        columns=columns,
+    )
+    try:
+        append_entry(undo_journal_path(), entry)
+    except OSError as e:
+        feedback_message(
+            f"Changes were applied but could not be recorded for undo: {str(e)}",
+            "warning",
+        )
+        return stats, None
+    return stats, entry["id"]
+
+
+def report_write(stats: WriteStats, entry_id: Union[str, None]) -> None:
+    # A long hold means InvokeAI may have waited on the lock, make it visible
+    style = "yellow" if stats.over_target else "dim"
+    console.print(f"[{style}]{stats.describe()}[/{style}]")
+    if entry_id:
+        console.print(f"[dim]Revert with: invokeai-models undo {entry_id}[/dim]")
+
+
+def create_snapshot(database_path: str = None, label: str = None) -> None:
     if not os.access(SNAPSHOTS_DIR, os.W_OK):
         console.print(
             "[bold red]Error:[/bold red] No write permission for the snapshots directory."
@@ -133,25 +345,37 @@ def create_snapshot() -> None:
         return
 
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    snapshot_name = f"{random_name()}_{timestamp.replace(':', '-')}.db"
+    snapshot_name = f"{label or random_name()}_{timestamp.replace(':', '-')}.db"
     snapshot_path = os.path.join(SNAPSHOTS_DIR, snapshot_name)
 
     try:
         console.print("[green]Creating snapshot...[/green]")
 
         with (
-            get_db(connection=True) as source_conn,
+            span("snapshot"),
+            get_db(connection=True, database_path=database_path) as source_conn,
             sqlite3.connect(snapshot_path) as dest_conn,
         ):
             source_conn.backup(dest_conn)
 
-        snapshots = load_snapshots()
-        snapshots.append(
-            {"name": snapshot_name, "timestamp": timestamp, "path": snapshot_path}
-        )
+        removed = []
 
-        if len(snapshots) > int(SNAPSHOTS):
-            oldest_snapshot = snapshots.pop(0)
+        def add_snapshot(snapshots: List[Dict[str, str]]) -> List[Dict[str, str]]:
+            snapshots.append(
+                {
+                    "name": snapshot_name,
+                    "timestamp": timestamp,
+                    "path": snapshot_path,
+                    "database": database_path or DATABASE_PATH,
+                }
+            )
+            if len(snapshots) > int(SNAPSHOTS):
+                removed.append(snapshots.pop(0))
+            return snapshots
+
+        update_snapshots(add_snapshot)
+
+        for oldest_snapshot in removed:
             old_snapshot_path = os.path.join(SNAPSHOTS_DIR, oldest_snapshot["name"])
             if os.path.exists(old_snapshot_path):
                 os.remove(old_snapshot_path)
@@ -159,7 +383,6 @@ def create_snapshot() -> None:
                     f"Removed oldest snapshot: {oldest_snapshot['name']}", "info"
                 )
 
-        save_snapshots(snapshots)
         feedback_message(f"Created snapshot: {snapshot_name}", "success")
     except sqlite3.Error as e:
         feedback_message(f"Error creating snapshot: {str(e)}", "error")
@@ -169,9 +392,7 @@ def create_snapshot() -> None:
 
 def load_snapshots():
     try:
-        with importlib.resources.open_text(
-            "invokeai_models_cli.snapshots", "snapshots.json"
-        ) as f:
+        with open(SNAPSHOTS_JSON, "r") as f:
             return json.load(f)
     except FileNotFoundError:
         console.print(
@@ -182,12 +403,25 @@ def load_snapshots():
 
 def save_snapshots(snapshots: List[Dict[str, str]]) -> None:
     try:
-        with open(SNAPSHOTS_JSON, "w") as f:
-            json.dump(snapshots, f, indent=2)
+        write_atomic(SNAPSHOTS_JSON, json.dumps(snapshots, indent=2))
     except Exception as e:
         console.print(f"[bold red]Error saving snapshots metadata:[/bold red] {str(e)}")
 
 
+def update_snapshots(
+    change: Callable[[List[Dict[str, str]]], List[Dict[str, str]]],
+) -> List[Dict[str, str]]:
+    """
+    Apply ``change`` to the snapshot list and save it, holding the snapshots
+    lock from the read to the write so concurrent invocations don't drop
+    each other's entries.
+    """
+    with file_lock(SNAPSHOTS_JSON):
+        snapshots = change(load_snapshots())
+        save_snapshots(snapshots)
+    return snapshots
+
+
 def list_snapshots() -> None:
     snapshots = load_snapshots()
     if not snapshots:
@@ -236,9 +470,10 @@ def delete_snapshot() -> None:
         console.print("Deletion cancelled.")
         return
 
+    deleted = set()
     for selected in answers["snapshots"]:
         snapshot_name = selected.split(" (")[0]  # Extract the name from the selection
-        snapshots = [s for s in snapshots if s["name"] != snapshot_name]
+        deleted.add(snapshot_name)
         snapshot_path = os.path.join(SNAPSHOTS_DIR, snapshot_name)
         if os.path.exists(snapshot_path):
             try:
@@ -255,7 +490,8 @@ def delete_snapshot() -> None:
                 f"[yellow]Warning: Snapshot file '{snapshot_name}' not found on disk.[/yellow]"
             )
 
-    save_snapshots(snapshots)
+    # Read the list again, snapshots may have been created since it was shown
+    update_snapshots(lambda current: [s for s in current if s["name"] not in deleted])
     console.print("[green]Snapshot deletion process completed.[/green]")
 
 
@@ -308,9 +544,11 @@ def restore_snapshot():
         )
         return
 
-    backup_path = DATABASE_PATH + ".backup"
+    # Snapshots taken before multi-install support only know the default database
+    database_path = snapshot_to_restore.get("database", DATABASE_PATH)
+    backup_path = database_path + ".backup"
     try:
-        shutil.copy2(DATABASE_PATH, backup_path)
+        shutil.copy2(database_path, backup_path)
         console.print(f"[green]Current database backed up to {backup_path}[/green]")
     except Exception as e:
         console.print(
@@ -319,14 +557,14 @@ def restore_snapshot():
         return
 
     try:
-        shutil.copy2(snapshot_path, DATABASE_PATH)
+        shutil.copy2(snapshot_path, database_path)
         console.print(
             f"[green]Snapshot '{snapshot_name}' successfully restored.[/green]"
         )
     except Exception as e:
         console.print(f"[bold red]Error restoring snapshot:[/bold red] {str(e)}")
         try:
-            shutil.copy2(backup_path, DATABASE_PATH)
+            shutil.copy2(backup_path, database_path)
             console.print(
                 "[yellow]Restoration failed. Original database has been restored.[/yellow]"
             )
@@ -347,7 +585,9 @@ def restore_snapshot():
 
 # ANCHOR: FILTER FUNCTIONS START
 def filter_and_compare_models(
-    local_models: List[Dict[str, Any]], db_models: List[Dict[str, Any]]
+    local_models: List[Dict[str, Any]],
+    db_models: List[Dict[str, Any]],
+    invoke_ai_dir: str = None,
 ) -> List[Dict[str, Any]]:
     """
     Filter database models and compare with local model files.
@@ -355,30 +595,59 @@ def filter_and_compare_models(
     Args:
     local_models (List[Dict[str, Any]]): Information about local model files.
     db_models (List[Dict[str, Any]]): Information about models in the database.
+    invoke_ai_dir (str): The install relative database paths belong to.
 
     Returns:
     List[Dict[str, Any]]: List of models in the database but not on disk.
     """
-    update_cache(display=False)
-    filtered_db_models = [
-        model
-        for model in db_models
-        if model.get("metadata", {}).get("source_type") == "path"
-        and model.get("metadata", {}).get("format", "").lower()
-        in ["lora", "checkpoint"]
-    ]
+    with span("compare"):
+        filtered_db_models = [
+            model
+            for model in db_models
+            if model.get("metadata", {}).get("source_type") == "path"
+            and model.get("metadata", {}).get("format", "").lower()
+            in ["lora", "checkpoint"]
+        ]
 
-    local_filenames = {model["name"] for model in local_models}
-    db_filenames = {model["name"] for model in filtered_db_models}
+        # Matched by canonical path like find_unregistered_models, a file of
+        # the same name elsewhere doesn't count. Rows without a path can only
+        # be matched by name
+        local_paths = {
+            path for model in local_models for path in model_real_paths(model)
+        }
+        local_filenames = {model["name"] for model in local_models}
+
+        missing_models = sorted(
+            [
+                model
+                for model in filtered_db_models
+                if (
+                    canonical_model_path(model["path"], invoke_ai_dir)
+                    not in local_paths
+                    if model.get("path")
+                    else model["name"] not in local_filenames
+                )
+            ],
+            key=itemgetter("name"),
+        )
 
-    missing_on_disk = db_filenames - local_filenames
+    return missing_models
 
-    missing_models = sorted(
-        [model for model in filtered_db_models if model["name"] in missing_on_disk],
-        key=itemgetter("name"),
-    )
 
-    return missing_models
+def find_unregistered_models(
+    local_models: List[Dict[str, Any]], db_models: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    The opposite of filter_and_compare_models: local models no database row
+    points at, matched by real path under any of their names.
+    """
+    with span("compare"):
+        db_by_path = database_paths(db_models)
+        return [
+            model
+            for model in local_models
+            if database_model_for(model, db_by_path) is None
+        ]
 
 
 def display_missing_models(missing_models: List[Dict[str, Any]]) -> None:
@@ -410,12 +679,16 @@ def display_missing_models(missing_models: List[Dict[str, Any]]) -> None:
         )
 
     if missing_models:
-        console.print(models_table)
+        with span("render"):
+            console.print(models_table)
     else:
         feedback_message("No missing models found.", "success")
 
 
 def delete_models(dry_run: bool = False) -> None:
+    # The local index is refreshed after deleting, bring the rest of it up to
+    # date while the menu is open so only the touched directories are left
+    scan = Prefetch(scan_local_models)
     db_models = get_database_models()
 
     if not db_models:
@@ -472,36 +745,47 @@ def delete_models(dry_run: bool = False) -> None:
         feedback_message("Deletion cancelled.", "info")
         return
 
-    db_conn = get_db(connection=True)
-    cursor = db_conn.cursor()
-
+    keys = [model["key"] for model in selected_models]
     try:
-        for model in selected_models:
-
-            cursor.execute("DELETE FROM models WHERE name = ?", (model["name"],))
+        stats, entry_id = journaled_writes(
+            "delete-models",
+            [("DELETE FROM models WHERE key = ?", [(k,) for k in keys])],
+            keys,
+        )
+    except sqlite3.Error as e:
+        feedback_message(
+            f"Error during deletion: {str(e)}. Changes rolled back.", "error"
+        )
+        return
 
-            file_path = model["metadata"].get("path")
-            if file_path and os.path.exists(file_path):
+    # Files are only removed once the rows are gone, outside the transaction
+    not_removed = 0
+    for model in selected_models:
+        file_path = model["metadata"].get("path")
+        if file_path and os.path.exists(file_path):
+            try:
                 os.remove(file_path)
                 feedback_message(f"Deleted model file: {file_path}", "success")
-            else:
-                feedback_message(
-                    f"Model file not found on disk: {file_path}", "warning"
-                )
+            except OSError as e:
+                not_removed += 1
+                feedback_message(f"Error deleting model file: {str(e)}", "error")
+        else:
+            not_removed += 1
+            feedback_message(f"Model file not found on disk: {file_path}", "warning")
 
-        db_conn.commit()
-        feedback_message("Selected models deleted from database and disk.", "success")
-    except sqlite3.Error as e:
-        db_conn.rollback()
+    if not_removed:
         feedback_message(
-            f"Error during deletion: {str(e)}. Changes rolled back.", "error"
+            f"Selected models deleted from the database, {not_removed} file(s) "
+            "could not be removed.",
+            "warning",
         )
-    except Exception as e:
-        feedback_message(f"Error deleting model files: {str(e)}", "error")
-    finally:
-        db_conn.close()
+    else:
+        feedback_message("Selected models deleted from database and disk.", "success")
+    report_write(stats, entry_id)
 
-    update_cache()
+    scan.result()
+    scan_local_models()
+    manage_cache("database_models", load_database_models())
 
 
 def sync_models(
@@ -517,10 +801,9 @@ def sync_models(
 
     if not dry_run:
         feedback_message(
-            "Warning: This operation will modify the database, a snapshot will be created before any changes are made.",
+            "Warning: This operation will modify the database. The changed rows are recorded and can be reverted with `invokeai-models undo`.",
             "warning",
         )
-        create_snapshot()
 
     questions = [
         inquirer.List(
@@ -545,30 +828,53 @@ def sync_models(
     else:
         perform_sync(models_to_sync, local_models)
 
-    manage_cache("local_models", collect_model_info(MODELS_DIR))
+    scan_local_models()
     manage_cache("database_models", get_database_models())
 
 
+def plan_sync(
+    models_to_sync: List[Dict[str, Any]], local_models: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Work out what a sync changes without touching the database.
+
+    Each missing model becomes an "update" (a local file with the same name
+    exists, its path is repointed) or a "delete" operation.
+    """
+    local_by_name = {}
+    for model in local_models:
+        local_by_name.setdefault(model["name"], model)
+
+    plan = []
+    for model in models_to_sync:
+        local_model = local_by_name.get(model["name"])
+        plan.append(
+            {
+                "action": "update" if local_model else "delete",
+                "key": model["key"],
+                "name": model["name"],
+                "old_path": (model.get("metadata") or {}).get("path"),
+                "path": local_model["file_path"] if local_model else None,
+            }
+        )
+    return plan
+
+
 def perform_dry_run(
     models_to_sync: List[Dict[str, Any]], local_models: List[Dict[str, Any]]
 ) -> None:
     console.print("\n[bold]Dry Run: Changes that would be made:[/bold]")
 
-    for model in models_to_sync:
-        local_model = next(
-            (m for m in local_models if m["name"] == model["name"]), None
-        )
-        if local_model:
+    for operation in plan_sync(models_to_sync, local_models):
+        if operation["action"] == "update":
             console.print(
-                f"[yellow]Would update path for model:[/yellow] {model['name']}"
+                f"[yellow]Would update path for model:[/yellow] {operation['name']}"
             )
-            console.print(
-                f"  [dim]Old path:[/dim] {model['metadata'].get('path', 'N/A')}"
-            )
-            console.print(f"  [dim]New path:[/dim] {local_model['file_path']}\n")
+            console.print(f"  [dim]Old path:[/dim] {operation['old_path'] or 'N/A'}")
+            console.print(f"  [dim]New path:[/dim] {operation['path']}\n")
         else:
             console.print(
-                f"[red]Would delete model from database:[/red] {model['name']}\n"
+                f"[red]Would delete model from database:[/red] {operation['name']}\n"
             )
 
     console.print("[bold green]No changes were made to the database.[/bold green]")
@@ -598,46 +904,66 @@ def select_models_to_sync(missing_models: List[Dict[str, Any]]) -> List[Dict[str
     return [model for model in missing_models if model["name"] in selected_names]
 
 
-def perform_sync(
-    models_to_sync: List[Dict[str, Any]], local_models: List[Dict[str, Any]]
-) -> None:
+def apply_sync_plan(
+    plan: List[Dict[str, Any]],
+    database_path: str = None,
+    guard: Callable[[List[Dict[str, Any]]], None] = None,
+) -> Union[WriteStats, None]:
     """
-    Perform the actual sync operation on the database.
+    Apply a sync plan in a single short write transaction, then report it.
 
-    Args:
-    models_to_sync (List[Dict[str, Any]]): List of models to sync.
-    local_models (List[Dict[str, Any]]): Information about local model files.
+    ``guard`` sees the current rows inside the transaction and can veto the
+    whole plan by raising.
     """
-    db_conn = get_db(connection=True)
-    cursor = db_conn.cursor()
+    updates = [(op["path"], op["key"]) for op in plan if op["action"] == "update"]
+    deletes = [(op["key"],) for op in plan if op["action"] == "delete"]
 
+    started = time.perf_counter()
     try:
-        for model in models_to_sync:
-            local_model = next(
-                (m for m in local_models if m["name"] == model["name"]), None
-            )
-            if local_model:
-                new_path = local_model["file_path"]
-                cursor.execute(
-                    "UPDATE models SET path = ? WHERE name = ?",
-                    (new_path, model["name"]),
-                )
-                feedback_message(f"Updated path for model: {model['name']}", "success")
-            else:
-                cursor.execute("DELETE FROM models WHERE name = ?", (model["name"],))
-                feedback_message(
-                    f"Deleted model from database: {model['name']}", "warning"
-                )
-
-        db_conn.commit()
-        feedback_message("Sync operation completed successfully.", "success")
+        stats, entry_id = journaled_writes(
+            "sync-models",
+            [
+                ("UPDATE models SET path = ? WHERE key = ?", updates),
+                ("DELETE FROM models WHERE key = ?", deletes),
+            ],
+            [op["key"] for op in plan],
+            database_path,
+            guard=guard,
+        )
     except sqlite3.Error as e:
-        db_conn.rollback()
         feedback_message(
             f"Error during sync operation: {str(e)}. Changes rolled back.", "error"
         )
-    finally:
-        db_conn.close()
+        return None
+    record_run("sync", time.perf_counter() - started)
+
+    # Output only after the commit, so the lock is never held while printing
+    for operation in plan:
+        if operation["action"] == "update":
+            feedback_message(f"Updated path for model: {operation['name']}", "success")
+        else:
+            feedback_message(
+                f"Deleted model from database: {operation['name']}", "warning"
+            )
+    feedback_message("Sync operation completed successfully.", "success")
+    report_write(stats, entry_id)
+    return stats
+
+
+def perform_sync(
+    models_to_sync: List[Dict[str, Any]],
+    local_models: List[Dict[str, Any]],
+    database_path: str = None,
+) -> None:
+    """
+    Perform the actual sync operation on the database.
+
+    Args:
+    models_to_sync (List[Dict[str, Any]]): List of models to sync.
+    local_models (List[Dict[str, Any]]): Information about local model files.
+    database_path (str): Database to sync, the configured install by default.
+    """
+    apply_sync_plan(plan_sync(models_to_sync, local_models), database_path)
 
 
 def compare_models_display() -> None:
@@ -684,54 +1010,26 @@ def collect_model_info(models_dir: str) -> List[Dict[str, Any]]:
     Collect information about model files in the specified directories.
 
     Args:
-    models_dir (str): Path to the directory containing 'checkpoints' and 'lora' folders.
+    models_dir (str): Path to the models directory, walked through the model type classifier.
 
     Returns:
     List[Dict[str, Any]]: List of dictionaries containing information about each model file
-    with .safetensor extension.
+    or directory-format model.
     """
-    cached_data = manage_cache("local_models")
-    if cached_data is not None:
-        return cached_data
-
-    model_info = []
-    subdirs = ["checkpoints", "loras"]
-
-    for subdir in subdirs:
-        dir_path = os.path.join(models_dir, subdir)
-        if not os.path.isdir(dir_path):
-            continue
-
-        for root, _, files in os.walk(dir_path):
-            for file in files:
-                if not file.endswith(".safetensors"):
-                    continue
-
-                file_path = os.path.join(root, file)
-                relative_path = os.path.relpath(file_path, models_dir)
-
-                stats = os.stat(file_path)
-                created = datetime.fromtimestamp(stats.st_ctime)
-                modified = datetime.fromtimestamp(stats.st_mtime)
-
-                type_parts = relative_path.split(os.path.sep)[1:-1]
-                type_str = " ".join(
-                    part.replace("_", " ") for part in type_parts
-                ).lower()
-
-                model_info.append(
-                    {
-                        "filename": file,
-                        "name": os.path.splitext(file)[0],
-                        "file_path": file_path,
-                        "relative_path": relative_path,
-                        "type": (type_str if type_str else subdir.rstrip("s")),
-                        "created": created.isoformat(),
-                        "updated": modified.isoformat(),
-                    }
-                )
+    models, files_visited = walk_models(models_dir)
+    model_info = merge_aliases(
+        [
+            record
+            for record in (
+                stat_model(path, models_dir, rule, is_dir)
+                for path, rule, is_dir in models
+            )
+            if record is not None
+        ]
+    )
 
-    return manage_cache("local_models", model_info)
+    count("files visited", files_visited)
+    return model_info
 
 
 def display_database_models(data: List[Union[Dict[str, Any], Tuple]]) -> None:
@@ -821,6 +1119,7 @@ def display_local_models(model_info: List[Dict[str, Any]], display_tree: bool):
         table = Table(show_header=True, header_style="bold magenta")
         table.add_column("Filename", style="cyan", no_wrap=True)
         table.add_column("Relative Path", style="white")
+        table.add_column("Size", style="green", justify="right")
         table.add_column("Created", style="yellow")
         table.add_column("Updated", style="yellow")
 
@@ -828,6 +1127,7 @@ def display_local_models(model_info: List[Dict[str, Any]], display_tree: bool):
             table.add_row(
                 model["filename"],
                 model["relative_path"],
+                format_size(model.get("size") or 0),
                 model["created"],
                 model["updated"],
             )
@@ -840,6 +1140,9 @@ def display_local_models(model_info: List[Dict[str, Any]], display_tree: bool):
                 tree.add(f"[yellow]Full Path:[/yellow] {model['file_path']}")
                 tree.add(f"[yellow]Relative Path:[/yellow] {model['relative_path']}")
                 tree.add(f"[yellow]Type:[/yellow] {model['type']}")
+                tree.add(
+                    f"[yellow]Size:[/yellow] {format_size(model.get('size') or 0)}"
+                )
                 tree.add(f"[yellow]Created:[/yellow] {model['created']}")
                 tree.add(f"[yellow]Updated:[/yellow] {model['updated']}")
 
@@ -848,12 +1151,17 @@ def display_local_models(model_info: List[Dict[str, Any]], display_tree: bool):
 
 
 def local_models_display(display_tree: bool = False) -> None:
-    local_models = collect_model_info(MODELS_DIR)
-    display_local_models(local_models, display_tree)
+    local_models, _ = scan_local_models()
+    with span("render"):
+        display_local_models(local_models, display_tree)
 
 
 def database_models_display():
-    db_models = get_database_models()
+    # Show the cached counts now and read the database while the user chooses
+    fresh = Prefetch(load_database_models)
+    db_models = manage_cache("database_models")
+    if db_models is None:
+        db_models = fresh.result()
 
     if not db_models:
         feedback_message("No models found in the database.", "info")
@@ -887,6 +1195,9 @@ def database_models_display():
             default="D",
         )
 
+    if display_choice.upper() != "C":
+        db_models = manage_cache("database_models", fresh.result())
+
     if display_choice.upper() == "D":
         display_detailed_table(db_models)
     elif display_choice.upper() == "T":
@@ -922,7 +1233,8 @@ def display_detailed_table(db_models):
             model.get("updated_at", "N/A"),
         )
 
-    console.print(models_table)
+    with span("render"):
+        console.print(models_table)
 
 
 def display_tree_view(db_models):
@@ -930,7 +1242,8 @@ def display_tree_view(db_models):
     for model in db_models:
         model_node = tree.add(f"[yellow]{model['name']}[/yellow]")
         add_model_details_to_tree(model_node, model)
-    console.print(tree)
+    with span("render"):
+        console.print(tree)
 
 
 def add_model_details_to_tree(node, model):
@@ -965,7 +1278,8 @@ def display_tree_view(db_models):
     for model in db_models:
         model_node = tree.add(f"[yellow]{model['name']}[/yellow]")
         add_model_details_to_tree(model_node, model)
-    console.print(tree)
+    with span("render"):
+        console.print(tree)
 
 
 def add_model_details_to_tree(node, model):
@@ -1001,7 +1315,8 @@ def display_tree_view(db_models):
     for model in db_models:
         model_node = tree.add(f"[yellow]{model['name']}[/yellow]")
         add_model_details_to_tree(model_node, model)
-    console.print(tree)
+    with span("render"):
+        console.print(tree)
 
 
 def add_model_details_to_tree(node, model):
@@ -1037,20 +1352,26 @@ def display_model_details(db_models):
         feedback_message("Model not found.", "error")
 
 
+def load_local_and_database_models() -> (
+    Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]
+):
+    """
+    Scan the models directory and read the database at the same time, then
+    refresh both caches with the result.
+    """
+    local_models, db_models = scan_local_models(load_database_models)
+    manage_cache("database_models", db_models)
+    return local_models, db_models
+
+
 def compare_models_display() -> None:
-    db = get_db(connection=True)
-    invokeai_models = db.execute("SELECT * FROM models").fetchall()
-    local_models = collect_model_info(MODELS_DIR)
-    database_models = process_tuples(invokeai_models)
+    local_models, database_models = load_local_and_database_models()
     compare_models(local_models, database_models)
 
 
 def sync_models_commands(dry_run: bool = False) -> None:
-    local_models = collect_model_info(MODELS_DIR)
-    db_models = process_tuples(
-        get_db(connection=True).execute("SELECT * FROM models").fetchall()
-    )
-    sync_models(local_models, db_models)
+    local_models, db_models = load_local_and_database_models()
+    sync_models(local_models, db_models, dry_run=dry_run)
 
 
 # ANCHOR: ABOUT FUNCTIONS START
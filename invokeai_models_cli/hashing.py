@@ -0,0 +1,187 @@
+"""
+Model hashing compatible with InvokeAI's ``ModelHash``.
+
+Single files are hashed with the configured algorithm and prefixed with its
+name (``blake3:`` for both BLAKE3 variants). Directory models (diffusers) hash
+every weight file, then merge the component digests in sorted path order with
+BLAKE3, which is what ends up in the ``hash`` column of ``invokeai.db``.
+
+Component files are hashed in parallel on a thread pool; hashlib and blake3
+release the GIL while hashing, so a multi-file model uses every core while the
+merge order stays deterministic.
+"""
+
+import os
+import hashlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Iterable, Union
+
+from blake3 import blake3
+
+from . import throttle
+from .timings import span, count
+
+__all__ = [
+    "HASHING_ALGORITHMS",
+    "MODEL_FILE_EXTENSIONS",
+    "algorithm_from_hash",
+    "hash_file",
+    "model_components",
+    "merge_component_hashes",
+    "file_algorithm",
+    "finish_model_hash",
+    "model_hash",
+    "hash_models",
+]
+
+HASHING_ALGORITHMS = ["blake3_single", "blake3_multi"] + sorted(
+    hashlib.algorithms_guaranteed - {"shake_128", "shake_256"}
+)
+# Files InvokeAI includes when hashing a directory model
+MODEL_FILE_EXTENSIONS = (".ckpt", ".safetensors", ".bin", ".pt", ".pth")
+DEFAULT_ALGORITHM = "blake3_single"
+CHUNK_SIZE = 1024 * 1024
+
+
+def _prefix(algorithm: str) -> str:
+    return "blake3:" if algorithm.startswith("blake3") else f"{algorithm}:"
+
+
+def algorithm_from_hash(value: Optional[str]) -> Optional[str]:
+    """
+    Work out which algorithm produced a hash stored in the database.
+
+    Returns None for hashes that can't be reproduced (no prefix, random).
+    """
+    if not value or ":" not in value:
+        return None
+    prefix = value.split(":", 1)[0]
+    if prefix == "blake3":
+        return DEFAULT_ALGORITHM
+    return prefix if prefix in HASHING_ALGORITHMS else None
+
+
+def hash_file(path: Union[str, Path], algorithm: str = DEFAULT_ALGORITHM) -> str:
+    """
+    Hash a single file and return the bare hex digest.
+    """
+    size = os.path.getsize(path)
+    with span("hash"), throttle.operation(str(path)):
+        # A throttled read goes chunk by chunk, mmap can't be charged as it reads
+        if algorithm.startswith("blake3") and not throttle.is_enabled():
+            if algorithm == "blake3_multi":
+                hasher = blake3(max_threads=blake3.AUTO)
+            else:
+                hasher = blake3()
+            hasher.update_mmap(path)
+        else:
+            if algorithm.startswith("blake3"):
+                hasher = blake3()
+            else:
+                hasher = hashlib.new(algorithm)
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    throttle.charge(len(chunk))
+                    hasher.update(chunk)
+    count("bytes hashed", size)
+    return hasher.hexdigest()
+
+
+def model_components(path: Union[str, Path]) -> List[Path]:
+    """
+    Weight files InvokeAI hashes for a directory model, in merge order.
+    """
+    files = []
+    for root, _dirs, filenames in os.walk(path):
+        for filename in filenames:
+            if filename.endswith(MODEL_FILE_EXTENSIONS):
+                files.append(Path(root, filename))
+    return sorted(files)
+
+
+def merge_component_hashes(component_hashes: Iterable[str]) -> str:
+    composite_hasher = blake3()
+    for component_hash in component_hashes:
+        composite_hasher.update(component_hash.encode("utf-8"))
+    return composite_hasher.hexdigest()
+
+
+def file_algorithm(algorithm: str, files: int = 2) -> str:
+    """
+    Algorithm for the individual files of a batch: one blake3 thread per file
+    when several files are hashed side by side, every thread for a lone file.
+    """
+    if not algorithm.startswith("blake3"):
+        return algorithm
+    return "blake3_multi" if files == 1 else "blake3_single"
+
+
+def finish_model_hash(
+    algorithm: str, digests: List[str], is_directory: bool = False
+) -> str:
+    """
+    Prefixed InvokeAI hash of a model from the bare digests of its files (the
+    components in model_components order for a directory model).
+    """
+    if not is_directory:
+        return _prefix(algorithm) + digests[0]
+    return _prefix(algorithm) + merge_component_hashes(digests)
+
+
+def hash_models(
+    paths: Iterable[Union[str, Path]],
+    algorithm: str = DEFAULT_ALGORITHM,
+    max_workers: Optional[int] = None,
+) -> Dict[str, str]:
+    """
+    Hash several models (files or directories) at once.
+
+    Every component file of every model goes to the same thread pool, so small
+    files and large diffusers folders all keep the cores busy. Returns a mapping
+    of each input path to its prefixed InvokeAI hash.
+    """
+    if algorithm not in HASHING_ALGORITHMS:
+        raise ValueError(f"Unsupported hashing algorithm: {algorithm}")
+
+    # None marks a single-file model, a list the components of a directory
+    models: Dict[str, Optional[List[Path]]] = {}
+    for path in paths:
+        path = str(path)
+        models[path] = model_components(path) if os.path.isdir(path) else None
+
+    jobs: List[Path] = []
+    for path, files in models.items():
+        jobs.extend(files if files is not None else [Path(path)])
+    jobs = list(dict.fromkeys(jobs))
+
+    per_file_algorithm = file_algorithm(algorithm, len(jobs))
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        digests = dict(
+            zip(
+                jobs,
+                executor.map(lambda job: hash_file(job, per_file_algorithm), jobs),
+            )
+        )
+
+    results = {}
+    for path, files in models.items():
+        if files is None:
+            results[path] = finish_model_hash(algorithm, [digests[Path(path)]])
+        else:
+            results[path] = finish_model_hash(
+                algorithm, [digests[file] for file in files], is_directory=True
+            )
+    return results
+
+
+def model_hash(
+    path: Union[str, Path],
+    algorithm: str = DEFAULT_ALGORITHM,
+    max_workers: Optional[int] = None,
+) -> str:
+    """
+    InvokeAI hash of a single model file or directory.
+    """
+    return hash_models([path], algorithm, max_workers)[str(path)]
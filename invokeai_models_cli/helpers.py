@@ -1,12 +1,21 @@
+import os
 import typer
 import random
 import json
+import threading
 
-from typing import Dict, Any, Tuple, List
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator, Tuple, List, Optional, Union
 from pathlib import Path
 from rich.console import Console
 from rich.table import Table
 
+try:
+    import fcntl
+except ImportError:  # Windows, locking is skipped
+    fcntl = None
+
 console = Console(soft_wrap=True)
 
 __all__ = [
@@ -17,6 +26,13 @@ __all__ = [
     "process_tuples",
     "tuple_to_dict",
     "get_db",
+    "read_json",
+    "write_json",
+    "write_atomic",
+    "file_lock",
+    "format_size",
+    "parse_size",
+    "parse_since",
 ]
 
 # function that creates random names and rturns them
@@ -177,3 +193,115 @@ def ensure_snapshots_dir(directory: Path) -> bool:
             )
             return False
     return True
+
+
+def read_json(path: Union[str, Path], default: Any = None) -> Any:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def write_atomic(
+    path: Union[str, Path], text: str, sync: bool = True, mode: Optional[int] = None
+) -> None:
+    """
+    Write ``text`` to a temporary file next to ``path`` and rename it over
+    ``path``. Readers see the old or the new file, never half of one, so they
+    don't need a lock. ``sync`` flushes the data to disk before the rename,
+    so a crash can't leave an empty file behind either.
+    """
+    path = os.fspath(path)
+    # Unique per thread too, the prefetch thread writes caches as well
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temporary, "x") as f:
+            f.write(text)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(temporary, mode)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def write_json(path: Union[str, Path], data: Any, sync: bool = True) -> None:
+    write_atomic(path, json.dumps(data), sync=sync)
+
+
+@contextmanager
+def file_lock(path: Union[str, Path]) -> Iterator[None]:
+    """
+    Hold an exclusive advisory lock on ``path`` (through ``path.lock``) for a
+    read-modify-write of shared state, so two invocations can't both read the
+    old file and lose each other's change. Only writers lock. Without fcntl
+    (Windows) this does nothing and the writes are still atomic.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(f"{os.fspath(path)}.lock", "a") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if abs(size) < 1024 or unit == "TiB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.2f} {unit}"
+        size /= 1024
+
+
+def parse_size(value: str) -> int:
+    """
+    "50M", "1.5GiB", "800k" or a plain number of bytes, in binary units.
+    """
+    units = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+    text = value.strip().upper().removesuffix("B").removesuffix("I")
+    number, unit = text, ""
+    if text and text[-1] in units:
+        number, unit = text[:-1], text[-1]
+    try:
+        size = float(number) * units[unit]
+    except ValueError:
+        raise ValueError(f"Not a size: {value}") from None
+    if size <= 0:
+        raise ValueError(f"Not a size: {value}")
+    return int(size)
+
+
+def parse_since(value: str, now: datetime = None) -> datetime:
+    """
+    A point in time: "30m", "12h", "3d" or "2w" ago, or an ISO date or
+    date and time ("2024-05-01", "2024-05-01T08:30"). Times with an offset
+    ("2024-05-01T08:30Z") are converted to naive local time, like the
+    timestamps they are compared with.
+    """
+    units = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+    text = value.strip().lower()
+    if text and text[-1] in units:
+        try:
+            amount = float(text[:-1])
+        except ValueError:
+            amount = None
+        if amount is not None and amount >= 0:
+            return (now or datetime.now()) - timedelta(**{units[text[-1]]: amount})
+    text = value.strip()
+    if text[-1:] in ("z", "Z"):
+        # Only understood by fromisoformat from Python 3.11
+        text = text[:-1] + "+00:00"
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"Not a time: {value}") from None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment
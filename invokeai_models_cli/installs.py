@@ -0,0 +1,310 @@
+"""
+Multi-install mode: several InvokeAI installs sharing one models folder.
+
+Installs are registered by name in ``installs.json`` next to the snapshots;
+the install configured in the .env file is always available as "default".
+Every command reads all install databases in parallel while the shared
+models folder is scanned once, then works out per install what is missing
+and which install references which file.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+import inquirer
+
+from . import functions
+from .helpers import (
+    feedback_message,
+    create_table,
+    format_size,
+    read_json,
+    write_json,
+    file_lock,
+)
+from .functions import (
+    console,
+    load_database_models,
+    filter_and_compare_models,
+    database_paths,
+    database_model_for,
+    create_snapshot,
+    perform_sync,
+    perform_dry_run,
+    scan_local_models,
+)
+from .timings import span
+
+__all__ = [
+    "add_install",
+    "remove_install",
+    "list_installs",
+    "compare_installs",
+    "sync_installs",
+    "snapshot_installs",
+    "installs_report",
+]
+
+DEFAULT_INSTALL = "default"
+
+
+def _installs_file() -> str:
+    return os.path.join(functions.SNAPSHOTS_DIR, "installs.json")
+
+
+def _database_path(invoke_ai_dir: str) -> str:
+    return os.path.join(invoke_ai_dir, "databases", "invokeai.db")
+
+
+def load_installs() -> Dict[str, Dict[str, str]]:
+    """
+    Registered installs by name, the configured install first.
+    """
+    installs = {
+        DEFAULT_INSTALL: {
+            "invoke_ai_dir": functions.INVOKE_AI_DIR,
+            "database_path": functions.DATABASE_PATH,
+        }
+    }
+    installs.update(read_json(_installs_file(), {}))
+    return installs
+
+
+def add_install(name: str, invoke_ai_dir: str) -> None:
+    if name == DEFAULT_INSTALL:
+        feedback_message(
+            f"'{DEFAULT_INSTALL}' is the install from the .env file.", "error"
+        )
+        return
+
+    invoke_ai_dir = os.path.abspath(os.path.expanduser(invoke_ai_dir))
+    database_path = _database_path(invoke_ai_dir)
+    if not os.path.isfile(database_path):
+        feedback_message(f"No InvokeAI database found at {database_path}", "error")
+        return
+
+    with file_lock(_installs_file()):
+        registry = read_json(_installs_file(), {})
+        registry[name] = {
+            "invoke_ai_dir": invoke_ai_dir,
+            "database_path": database_path,
+        }
+        write_json(_installs_file(), registry)
+    feedback_message(f"Registered install '{name}': {invoke_ai_dir}", "success")
+
+
+def remove_install(name: str) -> None:
+    with file_lock(_installs_file()):
+        registry = read_json(_installs_file(), {})
+        if registry.pop(name, None) is None:
+            feedback_message(f"No registered install named '{name}'.", "error")
+            return
+        write_json(_installs_file(), registry)
+    feedback_message(f"Removed install '{name}'.", "success")
+
+
+def list_installs() -> None:
+    installs_table = create_table(
+        "InvokeAI Installs",
+        [("Name", "cyan"), ("Install Directory", "white"), ("Database", "green")],
+    )
+    for name, install in load_installs().items():
+        installs_table.add_row(
+            name,
+            install["invoke_ai_dir"],
+            (
+                "found"
+                if os.path.isfile(install["database_path"])
+                else "[red]missing[/red]"
+            ),
+        )
+    console.print(installs_table)
+
+
+def load_install_databases(
+    installs: Dict[str, Dict[str, str]], max_workers: Optional[int] = None
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Read every install database in parallel. An install whose database can't
+    be read is reported and left out.
+    """
+
+    def load(name: str) -> Optional[List[Dict[str, Any]]]:
+        try:
+            return load_database_models(installs[name]["database_path"])
+        except Exception as e:
+            feedback_message(f"Could not read the '{name}' database: {str(e)}", "error")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(installs) or 1) as executor:
+        results = dict(zip(installs, executor.map(load, installs)))
+    return {name: models for name, models in results.items() if models is not None}
+
+
+def load_all_installs(
+    names: Optional[List[str]] = None,
+) -> Tuple[Dict[str, Dict[str, str]], List[Dict[str, Any]], Dict[str, List[Dict]]]:
+    """
+    Scan the shared models folder once while all install databases are read.
+
+    Returns (installs, local_models, db_models by install name).
+    """
+    installs = load_installs()
+    if names:
+        unknown = set(names) - set(installs)
+        if unknown:
+            feedback_message(
+                f"Unknown install(s): {', '.join(sorted(unknown))}", "error"
+            )
+        installs = {name: installs[name] for name in names if name in installs}
+
+    local_models, db_models = scan_local_models(
+        lambda: load_install_databases(installs)
+    )
+    return installs, local_models, db_models
+
+
+def install_references(
+    local_models: List[Dict[str, Any]],
+    installs: Dict[str, Dict[str, str]],
+    db_models: Dict[str, List[Dict[str, Any]]],
+) -> Dict[str, List[str]]:
+    """
+    Map every local model path to the installs whose database references it.
+    """
+    references: Dict[str, List[str]] = {
+        model["file_path"]: [] for model in local_models
+    }
+    for name, models in db_models.items():
+        db_by_path = database_paths(models, installs[name]["invoke_ai_dir"])
+        for model in local_models:
+            if database_model_for(model, db_by_path) is not None:
+                references[model["file_path"]].append(name)
+    return references
+
+
+def compare_installs(names: Optional[List[str]] = None) -> None:
+    installs, local_models, db_models = load_all_installs(names)
+    missing = {
+        name: filter_and_compare_models(
+            local_models, models, installs[name]["invoke_ai_dir"]
+        )
+        for name, models in db_models.items()
+    }
+
+    compare_table = create_table(
+        "Models Missing on Disk per Install",
+        [("Install", "cyan"), ("Model", "yellow"), ("Format", "white")],
+    )
+    for name, models in missing.items():
+        for model in models:
+            compare_table.add_row(
+                name, model["name"], model.get("metadata", {}).get("format", "N/A")
+            )
+    with span("render"):
+        console.print(compare_table)
+
+    summary = ", ".join(f"{name}: {len(models)}" for name, models in missing.items())
+    feedback_message(f"Missing models per install: {summary}", "info")
+
+
+def sync_installs(names: Optional[List[str]] = None, dry_run: bool = False) -> None:
+    installs, local_models, db_models = load_all_installs(names)
+    missing = {
+        name: filter_and_compare_models(
+            local_models, models, installs[name]["invoke_ai_dir"]
+        )
+        for name, models in db_models.items()
+    }
+    missing = {name: models for name, models in missing.items() if models}
+
+    if not missing:
+        feedback_message("All installs are in sync with local files.", "success")
+        return
+
+    if dry_run:
+        for name, models in missing.items():
+            console.print(f"\n[bold cyan]== {name} ==[/bold cyan]")
+            perform_dry_run(models, local_models)
+        return
+
+    total = sum(len(models) for models in missing.values())
+    confirm = inquirer.confirm(
+        f"Sync {total} missing model(s) across {len(missing)} install(s)? "
+        "Changed rows are recorded and can be reverted with `invokeai-models undo`."
+    )
+    if not confirm:
+        feedback_message("Sync cancelled.", "info")
+        return
+
+    for name, models in missing.items():
+        database_path = installs[name]["database_path"]
+        console.print(f"\n[bold cyan]== {name} ==[/bold cyan]")
+        perform_sync(models, local_models, database_path)
+
+
+def snapshot_installs(names: Optional[List[str]] = None) -> None:
+    installs = load_installs()
+    for name in names or list(installs):
+        if name not in installs:
+            feedback_message(f"No registered install named '{name}'.", "error")
+            continue
+        create_snapshot(installs[name]["database_path"], label=name)
+
+
+def installs_report(
+    names: Optional[List[str]] = None, unreferenced_only: bool = False
+) -> None:
+    installs, local_models, db_models = load_all_installs(names)
+    references = install_references(local_models, installs, db_models)
+    sizes = {model["file_path"]: model.get("size") or 0 for model in local_models}
+
+    summary_table = create_table(
+        "Installs",
+        [
+            ("Install", "cyan"),
+            ("Database Models", "white"),
+            ("Local Files Used", "white"),
+            ("Size Used", "green"),
+            ("Missing on Disk", "red"),
+        ],
+    )
+    for name, models in db_models.items():
+        used = [path for path, users in references.items() if name in users]
+        summary_table.add_row(
+            name,
+            str(len(models)),
+            str(len(used)),
+            format_size(sum(sizes[path] for path in used)),
+            str(
+                len(
+                    filter_and_compare_models(
+                        local_models, models, installs[name]["invoke_ai_dir"]
+                    )
+                )
+            ),
+        )
+
+    columns = [("File", "green"), ("Size", "white")]
+    columns += [(name, "cyan") for name in db_models]
+    files_table = create_table("Which Install References Which File", columns)
+    for model in local_models:
+        users = references[model["file_path"]]
+        if unreferenced_only and users:
+            continue
+        files_table.add_row(
+            model["relative_path"],
+            format_size(model.get("size") or 0),
+            *["yes" if name in users else "" for name in db_models],
+        )
+
+    unused = [path for path, users in references.items() if not users]
+    with span("render"):
+        console.print(summary_table)
+        console.print(files_table)
+    feedback_message(
+        f"{len(unused)} local file(s) ({format_size(sum(sizes[p] for p in unused))}) "
+        "are not referenced by any install.",
+        "info",
+    )
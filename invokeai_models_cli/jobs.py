@@ -0,0 +1,465 @@
+"""
+Resumable hashing jobs.
+
+A first full hash of a large library takes hours, so ``jobs hash`` runs it as
+a queue saved in the snapshots folder. Every file is a work item (each
+component of a directory model on its own), smallest first, so most models
+have a hash long before the big checkpoints are done. Finished digests are
+checkpointed every few seconds with an atomic replace, and an interrupted job
+(Ctrl-C, a crash, a reboot) resumes from its last checkpoint after checking
+that the files it already hashed didn't change.
+
+Python's hashers can't be saved halfway through a file, so the files that were
+being read when the job stopped are hashed again from the start.
+
+Finished model hashes go into the fingerprint index, where locate-missing and
+unregistered-models pick them up instead of hashing again.
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional, Callable
+
+from rich.progress import (
+    Progress,
+    BarColumn,
+    DownloadColumn,
+    TransferSpeedColumn,
+    TimeRemainingColumn,
+)
+
+from . import functions
+from .helpers import (
+    feedback_message,
+    create_table,
+    add_rows_to_table,
+    format_size,
+    read_json,
+    write_json,
+    file_lock,
+)
+from .hashing import (
+    DEFAULT_ALGORITHM,
+    HASHING_ALGORITHMS,
+    algorithm_from_hash,
+    model_components,
+    hash_file,
+    file_algorithm,
+    finish_model_hash,
+)
+from .records import format_timestamp
+from .scanner import directory_size
+from .functions import (
+    console,
+    load_local_and_database_models,
+    fingerprints_path,
+    update_fingerprint_index,
+)
+
+__all__ = ["hash_job", "job_status", "cancel_job"]
+
+JOB_VERSION = 1
+CHECKPOINT_SECONDS = 10
+
+
+def job_path() -> str:
+    return os.path.join(functions.SNAPSHOTS_DIR, "hash-job.json")
+
+
+def save_job(job: Dict[str, Any], path: Optional[str] = None) -> None:
+    """
+    Write the job to a temporary file and swap it in, so a crash mid-write
+    leaves the previous checkpoint intact.
+    """
+    write_json(path or job_path(), job)
+
+
+def file_identity(path: str) -> Optional[Dict[str, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def build_job(local_models: List[Dict[str, Any]], algorithm: str) -> Dict[str, Any]:
+    models: Dict[str, Dict[str, Any]] = {}
+    files: Dict[str, Dict[str, Any]] = {}
+    for model in local_models:
+        path = model["file_path"]
+        is_directory = os.path.isdir(path)
+        components = (
+            [str(file) for file in model_components(path)] if is_directory else [path]
+        )
+        identities = [file_identity(component) for component in components]
+        if None in identities:
+            continue
+        models[path] = {
+            "size": model.get("size"),
+            "updated": model.get("updated"),
+            "directory": is_directory,
+            "components": components,
+        }
+        for component, identity in zip(components, identities):
+            files[component] = {**identity, "model": path}
+
+    return {
+        "version": JOB_VERSION,
+        "algorithm": algorithm,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "models": models,
+        "files": files,
+        "done": {},
+        "failed": {},
+        "results": {},
+        "hashed_bytes": 0,
+        "elapsed": 0.0,
+    }
+
+
+def pending_files(job: Dict[str, Any]) -> List[str]:
+    """
+    Files still to hash, smallest first.
+    """
+    done, failed = job["done"], job["failed"]
+    return sorted(
+        (path for path in job["files"] if path not in done and path not in failed),
+        key=lambda path: (job["files"][path]["size"], path),
+    )
+
+
+def revalidate(job: Dict[str, Any]) -> int:
+    """
+    Drop digests of files that changed since they were hashed and forget
+    models whose files are gone. Returns how many files need hashing again.
+    """
+    requeued = 0
+    gone = set()
+    changed = set()
+    for path, item in job["files"].items():
+        identity = file_identity(path)
+        if identity is None:
+            gone.add(item["model"])
+            continue
+        if identity["size"] != item["size"] or identity["mtime_ns"] != item["mtime_ns"]:
+            item.update(identity)
+            if job["done"].pop(path, None) is not None:
+                requeued += 1
+            job["failed"].pop(path, None)
+            job["results"].pop(item["model"], None)
+            changed.add(item["model"])
+
+    # record_results matches the index by the model's size and mtime, which
+    # must describe the file as it is hashed now
+    for model in changed - gone:
+        try:
+            stats = os.stat(model)
+        except OSError:
+            gone.add(model)
+            continue
+        job["models"][model].update(
+            size=(
+                directory_size(model)
+                if job["models"][model]["directory"]
+                else stats.st_size
+            ),
+            updated=format_timestamp(stats.st_mtime_ns),
+        )
+
+    for model in gone:
+        for component in job["models"].pop(model)["components"]:
+            job["files"].pop(component, None)
+            job["done"].pop(component, None)
+            job["failed"].pop(component, None)
+        job["results"].pop(model, None)
+    return requeued
+
+
+def finish_models(job: Dict[str, Any]) -> List[str]:
+    """
+    Merge the digests of every model whose files are all hashed.
+    """
+    finished = []
+    done = job["done"]
+    for path, model in job["models"].items():
+        if path in job["results"]:
+            continue
+        if all(component in done for component in model["components"]):
+            job["results"][path] = finish_model_hash(
+                job["algorithm"],
+                [done[component] for component in model["components"]],
+                is_directory=model["directory"],
+            )
+            finished.append(path)
+    return finished
+
+
+def job_progress(job: Dict[str, Any]) -> Dict[str, Any]:
+    files = job["files"]
+    done_bytes = sum(files[path]["size"] for path in job["done"] if path in files)
+    failed_bytes = sum(files[path]["size"] for path in job["failed"] if path in files)
+    total_bytes = sum(item["size"] for item in files.values())
+    remaining = total_bytes - done_bytes - failed_bytes
+    rate = job["hashed_bytes"] / job["elapsed"] if job["elapsed"] else None
+    return {
+        "models": len(job["models"]),
+        "models_done": len(job["results"]),
+        "files": len(files),
+        "files_done": len(job["done"]),
+        "files_failed": len(job["failed"]),
+        "bytes": total_bytes,
+        "bytes_done": done_bytes,
+        "bytes_remaining": remaining,
+        "rate": rate,
+        "eta": remaining / rate if rate else None,
+    }
+
+
+def run_job(
+    job: Dict[str, Any],
+    workers: Optional[int] = None,
+    checkpoint: Optional[Callable[[Dict[str, Any]], None]] = None,
+    checkpoint_seconds: float = CHECKPOINT_SECONDS,
+    advance: Optional[Callable[[int], None]] = None,
+) -> bool:
+    """
+    Hash the pending files, calling ``checkpoint`` every ``checkpoint_seconds``
+    and once more when stopping for any reason (finished, interrupted, failed).
+
+    Only about two files per worker are queued at a time, so the smallest
+    files always go first and an interruption abandons little work. Returns
+    True when nothing is left to hash.
+    """
+    queue = pending_files(job)
+    workers = workers or os.cpu_count() or 1
+    algorithm = file_algorithm(job["algorithm"], len(queue))
+    last = time.monotonic()
+    last_checkpoint = last
+    hashed = 0
+
+    def account() -> None:
+        nonlocal last, hashed
+        now = time.monotonic()
+        job["elapsed"] += now - last
+        job["hashed_bytes"] += hashed
+        last, hashed = now, 0
+        finish_models(job)
+        if checkpoint is not None:
+            checkpoint(job)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    running: Dict[Any, str] = {}
+    position = 0
+    try:
+        while position < len(queue) or running:
+            while position < len(queue) and len(running) < workers * 2:
+                path = queue[position]
+                position += 1
+                running[executor.submit(hash_file, path, algorithm)] = path
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                path = running.pop(future)
+                size = job["files"][path]["size"]
+                try:
+                    job["done"][path] = future.result()
+                except OSError as e:
+                    job["failed"][path] = str(e)
+                hashed += size
+                if advance is not None:
+                    advance(size)
+
+            if time.monotonic() - last_checkpoint >= checkpoint_seconds:
+                account()
+                last_checkpoint = time.monotonic()
+    finally:
+        # Don't wait for files being read, they are simply hashed again later
+        executor.shutdown(wait=False, cancel_futures=True)
+        account()
+    return not pending_files(job)
+
+
+def record_results(job: Dict[str, Any]) -> int:
+    """
+    Store the finished hashes in the fingerprint index, for the index entries
+    that still describe the file that was hashed. Returns how many were stored.
+    """
+    # Read under the lock, an index saved meanwhile keeps its changes
+    with file_lock(fingerprints_path()):
+        index = read_json(fingerprints_path(), {})
+        files = index.get("files", {})
+        stored = 0
+        for path, value in job["results"].items():
+            entry = files.get(path)
+            model = job["models"].get(path, {})
+            if (
+                entry is not None
+                and entry.get("size") == model.get("size")
+                and entry.get("updated") == model.get("updated")
+            ):
+                entry["hash"] = value
+                stored += 1
+        if stored:
+            write_json(fingerprints_path(), index)
+    return stored
+
+
+def _same_algorithm(first: Optional[str], second: Optional[str]) -> bool:
+    # Both blake3 variants produce the same hash
+    if first and second and first.startswith("blake3"):
+        return second.startswith("blake3")
+    return first == second
+
+
+def new_job(algorithm: str) -> Optional[Dict[str, Any]]:
+    """
+    Queue every local model without a cached hash for ``algorithm``.
+    """
+    local_models, db_models = load_local_and_database_models()
+    index = update_fingerprint_index(local_models, db_models)
+    files = index.get("files", {})
+    todo = [
+        model
+        for model in local_models
+        if not _same_algorithm(
+            algorithm_from_hash(files.get(model["file_path"], {}).get("hash")),
+            algorithm,
+        )
+    ]
+    if not todo:
+        return None
+    return build_job(todo, algorithm)
+
+
+def hash_job(
+    algorithm: Optional[str] = None,
+    workers: Optional[int] = None,
+    restart: bool = False,
+) -> None:
+    if algorithm is not None and algorithm not in HASHING_ALGORITHMS:
+        feedback_message(f"Unsupported hashing algorithm: {algorithm}", "error")
+        return
+
+    job = read_json(job_path())
+    if job is not None and (restart or job.get("version") != JOB_VERSION):
+        os.remove(job_path())
+        job = None
+
+    if job is None:
+        job = new_job(algorithm or DEFAULT_ALGORITHM)
+        if job is None:
+            feedback_message("Every local model already has a cached hash.", "success")
+            return
+        save_job(job)
+        feedback_message(
+            f"Queued {len(job['files'])} file(s) of {len(job['models'])} model(s) "
+            f"for hashing with {job['algorithm']}.",
+            "info",
+        )
+    elif algorithm is not None and not _same_algorithm(job["algorithm"], algorithm):
+        feedback_message(
+            f"A {job['algorithm']} hashing job is in progress. Resume it without "
+            "--algorithm, or start over with --restart.",
+            "error",
+        )
+        return
+    else:
+        requeued = revalidate(job)
+        progress = job_progress(job)
+        feedback_message(
+            f"Resuming: {progress['files_done']} of {progress['files']} file(s) "
+            f"already hashed"
+            + (f", {requeued} changed and will be hashed again." if requeued else "."),
+            "info",
+        )
+
+    def checkpoint(job: Dict[str, Any]) -> None:
+        save_job(job)
+        record_results(job)
+
+    progress = job_progress(job)
+    try:
+        with Progress(
+            "[progress.description]{task.description}",
+            BarColumn(),
+            DownloadColumn(),
+            TransferSpeedColumn(),
+            TimeRemainingColumn(),
+            console=console,
+        ) as bar:
+            task = bar.add_task("Hashing", total=progress["bytes_remaining"])
+            complete = run_job(
+                job,
+                workers,
+                checkpoint=checkpoint,
+                advance=lambda size: bar.advance(task, size),
+            )
+    except KeyboardInterrupt:
+        progress = job_progress(job)
+        feedback_message(
+            f"Hashing paused with {format_size(progress['bytes_remaining'])} left. "
+            "Resume with: invokeai-models jobs hash",
+            "warning",
+        )
+        return
+
+    progress = job_progress(job)
+    if not complete:
+        return
+    os.remove(job_path())
+    failed = (
+        f" {progress['files_failed']} file(s) couldn't be read."
+        if progress["files_failed"]
+        else ""
+    )
+    feedback_message(
+        f"Hashed {progress['models_done']} of {progress['models']} model(s)." + failed,
+        "warning" if failed else "success",
+    )
+
+
+def job_status() -> None:
+    job = read_json(job_path())
+    if job is None:
+        feedback_message("No hashing job in progress.", "info")
+        return
+
+    progress = job_progress(job)
+    status_table = create_table("Hashing Job", [("Field", "cyan"), ("Value", "white")])
+    add_rows_to_table(
+        status_table,
+        {
+            "Algorithm": job["algorithm"],
+            "Created": job["created"],
+            "Models": f"{progress['models_done']} of {progress['models']} hashed",
+            "Files": f"{progress['files_done']} of {progress['files']} hashed"
+            + (
+                f", {progress['files_failed']} unreadable"
+                if progress["files_failed"]
+                else ""
+            ),
+            "Bytes remaining": f"{format_size(progress['bytes_remaining'])} of "
+            f"{format_size(progress['bytes'])}",
+            "Speed": (
+                f"{format_size(progress['rate'])}/s" if progress["rate"] else "N/A"
+            ),
+            "ETA": (
+                str(timedelta(seconds=int(progress["eta"])))
+                if progress["eta"] is not None
+                else "N/A"
+            ),
+            "Next": ", ".join(os.path.basename(path) for path in pending_files(job)[:3])
+            or "N/A",
+        },
+    )
+    console.print(status_table)
+
+
+def cancel_job() -> None:
+    if not os.path.exists(job_path()):
+        feedback_message("No hashing job in progress.", "info")
+        return
+    os.remove(job_path())
+    feedback_message("Hashing job cancelled.", "success")
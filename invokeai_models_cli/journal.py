@@ -0,0 +1,149 @@
+"""
+Row-level undo journal for database changes.
+
+Instead of copying the whole database before a change, every write records
+only the rows it touches: their full state right before and right after the
+change, read inside the write transaction. Entries are appended to a JSON
+Lines file and fsynced, so the cost is proportional to the change and a
+partial write can only ever lose the last line.
+
+Undoing an entry upserts the "before" rows and deletes rows that only exist
+"after", and is itself journaled, so an undo can be undone too. Bulk updates
+that only rewrite some columns capture just those columns, which keeps the
+write lock short; their undo is a plain UPDATE.
+"""
+
+import os
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .writes import Write
+
+__all__ = [
+    "append_entry",
+    "read_entries",
+    "find_entry",
+    "new_entry",
+    "conflicting_rows",
+    "undo_writes",
+]
+
+
+def append_entry(journal_path: str, entry: Dict[str, Any]) -> None:
+    line = json.dumps(entry, default=str) + "\n"
+    with open(journal_path, "a", encoding="utf-8") as f:
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_entries(journal_path: str) -> List[Dict[str, Any]]:
+    """
+    Journal entries oldest first, each marked with ``undone_by`` once undone.
+    """
+    entries: Dict[str, Dict[str, Any]] = {}
+    try:
+        with open(journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-append leaves at most one torn line
+                    continue
+                entries[entry["id"]] = entry
+                if entry.get("undoes") in entries:
+                    entries[entry["undoes"]]["undone_by"] = entry["id"]
+    except FileNotFoundError:
+        return []
+    return list(entries.values())
+
+
+def find_entry(
+    entries: List[Dict[str, Any]], entry_id: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    The entry with ``entry_id``, or the latest one not undone yet.
+    """
+    if entry_id:
+        return next((entry for entry in entries if entry["id"] == entry_id), None)
+    return next(
+        (entry for entry in reversed(entries) if not entry.get("undone_by")), None
+    )
+
+
+def new_entry(
+    command: str,
+    database_path: str,
+    before: List[Dict[str, Any]],
+    after: List[Dict[str, Any]],
+    entry_id: str,
+    undoes: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    entry = {
+        "id": entry_id,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "command": command,
+        "database": database_path,
+        "before": before,
+        "after": after,
+    }
+    if undoes:
+        entry["undoes"] = undoes
+    if columns:
+        # Only these columns were captured, the rows themselves still exist
+        entry["columns"] = list(columns)
+    return entry
+
+
+def conflicting_rows(entry: Dict[str, Any], current: List[Dict[str, Any]]) -> List[str]:
+    """
+    Keys of rows that changed again since the entry was written.
+    """
+    expected = {row["key"]: row for row in entry["after"]}
+    current_by_key = {row["key"]: row for row in current}
+    conflicts = []
+    for key in {row["key"] for row in entry["before"]} | set(expected):
+        if expected.get(key) != current_by_key.get(key):
+            conflicts.append(key)
+    return sorted(conflicts)
+
+
+def undo_writes(entry: Dict[str, Any]) -> List[Write]:
+    """
+    Statements that put the rows of ``entry`` back to their "before" state.
+    """
+    if entry.get("columns"):
+        columns = [column for column in entry["columns"] if column != "key"]
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        return [
+            (
+                f"UPDATE models SET {assignments} WHERE key = ?",
+                [
+                    tuple(row[column] for column in columns) + (row["key"],)
+                    for row in entry["before"]
+                ],
+            )
+        ]
+
+    writes: List[Write] = []
+    by_columns: Dict[tuple, List[tuple]] = {}
+    for row in entry["before"]:
+        by_columns.setdefault(tuple(row), []).append(tuple(row.values()))
+
+    for columns, values in by_columns.items():
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns)
+        writes.append(
+            (
+                f"INSERT INTO models ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT(key) DO UPDATE SET {updates}",
+                values,
+            )
+        )
+
+    restored = {row["key"] for row in entry["before"]}
+    created = [(row["key"],) for row in entry["after"] if row["key"] not in restored]
+    writes.append(("DELETE FROM models WHERE key = ?", created))
+    return writes
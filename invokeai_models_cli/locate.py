@@ -0,0 +1,198 @@
+import sqlite3
+from typing import List, Dict, Any
+
+import inquirer
+
+from .helpers import feedback_message, create_table
+from .hashing import algorithm_from_hash, hash_models
+from .fingerprint import index_by
+from .scanner import real_path
+from .functions import (
+    console,
+    load_local_and_database_models,
+    load_database_models,
+    filter_and_compare_models,
+    manage_cache,
+    database_paths,
+    update_fingerprint_index,
+    save_fingerprint_index,
+    journaled_writes,
+    report_write,
+)
+from .timings import span
+
+__all__ = ["locate_missing_models"]
+
+
+def find_relocation_candidates(
+    missing_models: List[Dict[str, Any]],
+    db_models: List[Dict[str, Any]],
+    index: Dict[str, Any],
+) -> List[Dict[str, Any]]:
+    """
+    Match every missing database model to local files that could be it.
+
+    Tried in order: the fingerprint remembered while the file was still
+    present, a full hash already computed for a local file, then the file name.
+    Files another database model already points at are never candidates.
+    """
+    by_fingerprint = index_by(index, "fingerprint")
+    by_hash = index_by(index, "hash")
+    by_name = index_by(index, "name")
+    known = index.get("known", {})
+    referenced = database_paths(db_models)
+
+    matches = []
+    for model in missing_models:
+        fingerprint = known.get(model["key"])
+        if fingerprint and fingerprint in by_fingerprint:
+            method, candidates = "fingerprint", by_fingerprint[fingerprint]
+        elif model.get("hash") in by_hash:
+            method, candidates = "hash", by_hash[model["hash"]]
+        elif model["name"] in by_name:
+            method, candidates = "name", by_name[model["name"]]
+        else:
+            method, candidates = "none", []
+
+        matches.append(
+            {
+                "model": model,
+                "method": method,
+                "candidates": [
+                    path for path in candidates if real_path(path) not in referenced
+                ],
+            }
+        )
+    return matches
+
+
+def confirm_candidates(
+    matches: List[Dict[str, Any]], index: Dict[str, Any], verify: bool = True
+) -> None:
+    """
+    Full-hash the candidates and keep the one that matches the stored hash.
+
+    Computed hashes are cached in the fingerprint index, so a file is only ever
+    hashed once while it stays unchanged. Without ``verify`` a single
+    fingerprint or hash match is accepted as is.
+    """
+    files = index.get("files", {})
+    to_hash: Dict[str, set] = {}
+
+    for match in matches:
+        match["confirmed"] = None
+        match["status"] = "not found" if not match["candidates"] else "unverified"
+        algorithm = algorithm_from_hash(match["model"].get("hash"))
+        if not verify or algorithm is None:
+            continue
+        for path in match["candidates"]:
+            cached = files.get(path, {}).get("hash")
+            if cached is None or algorithm_from_hash(cached) != algorithm:
+                to_hash.setdefault(algorithm, set()).add(path)
+
+    for algorithm, paths in to_hash.items():
+        with console.status(
+            f"[green]Confirming {len(paths)} candidate(s) with {algorithm}...[/green]"
+        ):
+            for path, value in hash_models(sorted(paths), algorithm).items():
+                files[path]["hash"] = value
+
+    for match in matches:
+        candidates = match["candidates"]
+        if not candidates:
+            continue
+        if not verify:
+            if len(candidates) == 1 and match["method"] != "name":
+                match["confirmed"] = candidates[0]
+                match["status"] = f"{match['method']} match"
+            continue
+        stored = match["model"].get("hash")
+        for path in candidates:
+            if files.get(path, {}).get("hash") == stored:
+                match["confirmed"] = path
+                match["status"] = "confirmed"
+                break
+        else:
+            if algorithm_from_hash(stored) is not None:
+                match["status"] = "hash mismatch"
+
+
+def display_relocation_matches(matches: List[Dict[str, Any]]) -> None:
+    locate_table = create_table(
+        "Missing Models and Relocation Candidates",
+        [
+            ("Name", "yellow"),
+            ("Old Path", "dim"),
+            ("Found By", "cyan"),
+            ("New Path", "green"),
+            ("Status", "magenta"),
+        ],
+    )
+    for match in matches:
+        locate_table.add_row(
+            match["model"]["name"],
+            match["model"].get("path") or "N/A",
+            match["method"],
+            match["confirmed"] or "\n".join(match["candidates"]) or "N/A",
+            match["status"],
+        )
+    with span("render"):
+        console.print(locate_table)
+
+
+def locate_missing_models(dry_run: bool = False, verify: bool = True) -> None:
+    local_models, db_models = load_local_and_database_models()
+    missing_models = filter_and_compare_models(local_models, db_models)
+
+    if not missing_models:
+        feedback_message("All database models are in sync with local files.", "success")
+        return
+
+    index = update_fingerprint_index(local_models, db_models)
+    matches = find_relocation_candidates(missing_models, db_models, index)
+    confirm_candidates(matches, index, verify=verify)
+    save_fingerprint_index(index)
+    display_relocation_matches(matches)
+
+    relocations = [match for match in matches if match["confirmed"]]
+    if not relocations:
+        feedback_message("No missing model could be relocated.", "info")
+        return
+
+    if dry_run:
+        console.print(
+            f"[bold green]Dry run: {len(relocations)} path(s) would be updated. "
+            "No changes were made to the database.[/bold green]"
+        )
+        return
+
+    confirm = inquirer.confirm(
+        f"Update the path of {len(relocations)} relocated model(s) in the database?"
+    )
+    if not confirm:
+        feedback_message("Relocation cancelled.", "info")
+        return
+
+    try:
+        stats, entry_id = journaled_writes(
+            "locate-missing",
+            [
+                (
+                    "UPDATE models SET path = ? WHERE key = ?",
+                    [
+                        (match["confirmed"], match["model"]["key"])
+                        for match in relocations
+                    ],
+                )
+            ],
+            [match["model"]["key"] for match in relocations],
+        )
+    except sqlite3.Error as e:
+        feedback_message(
+            f"Error updating model paths: {str(e)}. Changes rolled back.", "error"
+        )
+        return
+    feedback_message(f"Updated {len(relocations)} model path(s).", "success")
+    report_write(stats, entry_id)
+
+    manage_cache("database_models", load_database_models())
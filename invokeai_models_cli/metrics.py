@@ -0,0 +1,132 @@
+import os
+import sys
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+from . import functions
+from .helpers import feedback_message, read_json
+from .functions import filter_and_compare_models, get_database_models, local_index
+from .prometheus import Gauge, render_metrics, write_textfile
+from .stats import aggregate_models
+from .timings import span
+
+__all__ = ["collect_metrics", "export_metrics"]
+
+PREFIX = "invokeai_models_"
+
+
+def snapshot_gauges() -> List[Gauge]:
+    snapshots = read_json(functions.SNAPSHOTS_JSON, [])
+    size = 0
+    for snapshot in snapshots:
+        try:
+            size += os.stat(
+                os.path.join(functions.SNAPSHOTS_DIR, snapshot["name"])
+            ).st_size
+        except (OSError, KeyError):
+            continue
+    return [
+        Gauge(PREFIX + "snapshots", "Database snapshots kept").set(len(snapshots)),
+        Gauge(PREFIX + "snapshot_bytes", "Size of the database snapshots").set(size),
+    ]
+
+
+def run_gauges() -> List[Gauge]:
+    duration = Gauge(
+        PREFIX + "last_run_duration_seconds", "How long the last scan or sync took"
+    )
+    finished = Gauge(
+        PREFIX + "last_run_timestamp_seconds", "When the last scan or sync finished"
+    )
+    for name, run in sorted(read_json(functions.last_runs_path(), {}).items()):
+        duration.set(round(run["seconds"], 6), run=name)
+        finished.set(
+            round(datetime.fromisoformat(run["finished"]).timestamp(), 3), run=name
+        )
+    return [duration, finished]
+
+
+def collect_metrics(
+    local_models: Optional[List[Dict[str, Any]]],
+    db_models: Optional[List[Dict[str, Any]]],
+) -> List[Gauge]:
+    """
+    The library health gauges, from already loaded local and database models
+    (None when that side isn't cached yet, its gauges are left out).
+    """
+    gauges = []
+    if db_models is not None:
+        database = Gauge(PREFIX + "database_models", "Models in the database")
+        counts: Dict[tuple, int] = {}
+        for model in db_models:
+            group = (model.get("type") or "unknown", model.get("base") or "unknown")
+            counts[group] = counts.get(group, 0) + 1
+        for (model_type, base), models in sorted(counts.items()):
+            database.set(models, type=model_type, base=base)
+        gauges.append(database)
+
+    if local_models is not None:
+        stats = aggregate_models(local_models, db_models or [])
+        local = Gauge(PREFIX + "local_models", "Model files in the models folder")
+        size = Gauge(PREFIX + "library_bytes", "Size of the model files")
+        for model_type, (models, total) in sorted(stats["type"].items()):
+            local.set(models, type=model_type)
+            size.set(total, type=model_type)
+        gauges.extend([local, size])
+
+        if db_models is not None:
+            # What compare-models reports: rows InvokeAI manages itself live
+            # outside the scanned folder and aren't missing
+            missing = filter_and_compare_models(local_models, db_models)
+            gauges.append(
+                Gauge(
+                    PREFIX + "missing_on_disk",
+                    "Database models whose file is missing",
+                ).set(len(missing))
+            )
+            gauges.append(
+                Gauge(
+                    PREFIX + "unregistered_models",
+                    "Model files with no database row",
+                ).set(stats["unreferenced"][0])
+            )
+            gauges.append(
+                Gauge(
+                    PREFIX + "unregistered_bytes",
+                    "Size of the model files with no database row",
+                ).set(stats["unreferenced"][1])
+            )
+
+    gauges.extend(snapshot_gauges())
+    gauges.extend(run_gauges())
+    return gauges
+
+
+def export_metrics(textfile: Optional[str] = None) -> bool:
+    started = time.perf_counter()
+    # Only what is cached: the local index as last saved and the database
+    # cache (read again only once it expired), never a scan
+    with span("cache read"):
+        index = local_index()
+        local_models = index.models() if index.shards else None
+    db_models = get_database_models()
+
+    gauges = collect_metrics(local_models, db_models)
+    gauges.append(
+        Gauge(
+            PREFIX + "metrics_duration_seconds", "How long collecting the metrics took"
+        ).set(round(time.perf_counter() - started, 6))
+    )
+    text = render_metrics(gauges)
+
+    if not textfile:
+        # Plain stdout, Rich would wrap long samples to the terminal width
+        sys.stdout.write(text)
+        return True
+    try:
+        write_textfile(textfile, text)
+    except OSError as e:
+        feedback_message(f"Error writing {textfile}: {str(e)}", "error")
+        return False
+    return True
@@ -0,0 +1,225 @@
+"""
+Async orchestration for loading everything a comparison needs at once.
+
+The directory walk (through the model type classifier, so directory-format
+models are pruned), the per-model work (stat, optional header read) and the
+database query run as concurrent stages connected by bounded queues. Every
+blocking call is pushed to a thread pool, so the total time approaches the
+slowest stage instead of the sum of all of them.
+"""
+
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Tuple, Callable, Optional
+
+from .timings import span, count
+from .scanner import (
+    ModelEntry,
+    DirectoryGuard,
+    scan_directory,
+    stat_model,
+    merge_aliases,
+    read_safetensors_header,
+)
+from .classifier import rule_by_name
+from .shards import ShardIndex, directory_fingerprint
+
+__all__ = ["gather_models", "load_models_concurrently"]
+
+# Directories listed at the same time, helps most on network shares
+SCAN_CONCURRENCY = 4
+# Models handed to a worker in one executor call
+BATCH_SIZE = 256
+# Batches waiting between the scan and the file stage
+QUEUE_SIZE = 64
+
+_DONE = object()
+
+
+def _process_batch(
+    batch: List[ModelEntry], models_dir: str, read_headers: bool
+) -> List[Dict[str, Any]]:
+    records = []
+    for path, rule, is_dir in batch:
+        record = stat_model(path, models_dir, rule, is_dir)
+        if record is None:
+            continue
+        if read_headers and not is_dir and path.endswith(".safetensors"):
+            header = read_safetensors_header(path) or {}
+            record["header_metadata"] = header.get("__metadata__", {})
+        records.append(record)
+    return records
+
+
+class _ShardScan:
+    """
+    What the scan stage needs to reuse and refresh a ShardIndex: the cached
+    records of unchanged directories, and for every directory listed again its
+    fingerprint, rule and subdirectories plus which directory each model came
+    from, so the records can be filed under it once they are stat'ed.
+    """
+
+    def __init__(self, index: ShardIndex):
+        self.index = index
+        self.reused: List[Dict[str, Any]] = []
+        self.listed: Dict[str, tuple] = {}
+        self.owners: Dict[str, str] = {}
+        self.visited: set = set()
+
+    def store(self, records: List[Dict[str, Any]]) -> None:
+        by_directory: Dict[str, List[Dict[str, Any]]] = {
+            path: [] for path in self.listed
+        }
+        for record in records:
+            by_directory[self.owners[record["file_path"]]].append(record)
+        for path, (fingerprint, rule, subdirs) in self.listed.items():
+            self.index.store(path, fingerprint, rule, subdirs, by_directory[path])
+        self.index.prune(self.visited)
+
+
+async def _scan_stage(
+    models_dir: str,
+    batches: asyncio.Queue,
+    executor: ThreadPoolExecutor,
+    workers: int,
+    shard_scan: Optional[_ShardScan] = None,
+) -> None:
+    loop = asyncio.get_running_loop()
+    guard = DirectoryGuard(models_dir)
+    directories: asyncio.Queue = asyncio.Queue()
+    directories.put_nowait((models_dir, None))
+
+    async def lister() -> None:
+        while True:
+            path, rule = await directories.get()
+            try:
+                stats = await loop.run_in_executor(executor, guard.enter, path)
+                if stats is None:
+                    continue
+                if shard_scan is not None:
+                    rule_name = rule.name if rule else None
+                    shard_scan.visited.add(path)
+                    # Taken before listing, a change while listing shows next time
+                    fingerprint = directory_fingerprint(path, stats)
+                    entry = shard_scan.index.fresh(path, fingerprint, rule_name)
+                    if entry is not None:
+                        count("directories reused")
+                        for child, child_rule in entry["subdirs"]:
+                            directories.put_nowait((child, rule_by_name(child_rule)))
+                        shard_scan.reused.extend(entry["models"])
+                        continue
+
+                subdirs, models, files_seen = await loop.run_in_executor(
+                    executor, scan_directory, path, rule
+                )
+                count("files visited", files_seen)
+                if shard_scan is not None:
+                    count("directories listed")
+                    shard_scan.listed[path] = (
+                        fingerprint,
+                        rule_name,
+                        [
+                            (child, child_rule and child_rule.name)
+                            for child, child_rule in subdirs
+                        ],
+                    )
+                    for model_path, _rule, _is_dir in models:
+                        shard_scan.owners[model_path] = path
+                for child in subdirs:
+                    directories.put_nowait(child)
+                for start in range(0, len(models), BATCH_SIZE):
+                    await batches.put(models[start : start + BATCH_SIZE])
+            finally:
+                directories.task_done()
+
+    listers = [asyncio.create_task(lister()) for _ in range(SCAN_CONCURRENCY)]
+    joined = asyncio.ensure_future(directories.join())
+    try:
+        await asyncio.wait([joined, *listers], return_when=asyncio.FIRST_COMPLETED)
+        # A lister only returns by failing, and then the walk is incomplete:
+        # raise instead of letting a partial scan be stored and pruned
+        for task in listers:
+            if task.done() and not task.cancelled() and task.exception():
+                raise task.exception()
+    finally:
+        joined.cancel()
+        for task in listers:
+            task.cancel()
+        await asyncio.gather(joined, *listers, return_exceptions=True)
+        for _ in range(workers):
+            await batches.put(_DONE)
+
+
+async def _file_stage(
+    models_dir: str,
+    batches: asyncio.Queue,
+    results: List[Dict[str, Any]],
+    executor: ThreadPoolExecutor,
+    read_headers: bool,
+) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await batches.get()
+        if item is _DONE:
+            return
+        results.extend(
+            await loop.run_in_executor(
+                executor, _process_batch, item, models_dir, read_headers
+            )
+        )
+
+
+async def gather_models(
+    models_dir: str,
+    load_db: Callable[[], List[Dict[str, Any]]],
+    read_headers: bool = False,
+    max_workers: Optional[int] = None,
+    index: Optional[ShardIndex] = None,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Scan ``models_dir`` and run ``load_db`` concurrently.
+
+    Returns (local_models, db_models), the local models in the same shape as
+    collect_model_info and sorted by relative path. With a shard ``index``
+    unchanged directories are taken from it instead of being listed, and the
+    index is updated in place (saving it is up to the caller). Cached records
+    carry no header metadata, so ``read_headers`` scans without it.
+    """
+    loop = asyncio.get_running_loop()
+    max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+    file_workers = max(1, max_workers - SCAN_CONCURRENCY - 1)
+    shard_scan = _ShardScan(index) if index is not None and not read_headers else None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        db_future = loop.run_in_executor(executor, load_db)
+
+        batches: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        local_models: List[Dict[str, Any]] = []
+        await asyncio.gather(
+            _scan_stage(models_dir, batches, executor, file_workers, shard_scan),
+            *[
+                _file_stage(models_dir, batches, local_models, executor, read_headers)
+                for _ in range(file_workers)
+            ],
+        )
+        db_models = await db_future
+
+    if shard_scan is not None:
+        shard_scan.store(local_models)
+        local_models.extend(shard_scan.reused)
+    return merge_aliases(local_models), db_models
+
+
+def load_models_concurrently(
+    models_dir: str,
+    load_db: Callable[[], List[Dict[str, Any]]],
+    read_headers: bool = False,
+    index: Optional[ShardIndex] = None,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Blocking entry point for the CLI commands.
+    """
+    return asyncio.run(
+        gather_models(models_dir, load_db, read_headers=read_headers, index=index)
+    )
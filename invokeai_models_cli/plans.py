@@ -0,0 +1,210 @@
+"""
+Serializable sync plans: compute once, review, apply later.
+
+``sync-models --plan`` writes the operations a sync would perform together
+with everything needed to prove they still hold: a fingerprint of the whole
+models table, a digest of every row the plan touches and the identity (size,
+mtime, inode) of every file a row is repointed to. ``sync-models --apply``
+checks those with a few stats and one indexed read inside the write
+transaction, without rescanning the models folder.
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+import inquirer
+
+from . import functions
+from .helpers import feedback_message, read_json, write_json
+from .functions import (
+    console,
+    load_local_and_database_models,
+    filter_and_compare_models,
+    plan_sync,
+    apply_sync_plan,
+    resolve_model_path,
+    manage_cache,
+    load_database_models,
+)
+from .writes import connect, select_rows
+
+__all__ = ["write_sync_plan", "apply_sync_plan_file"]
+
+PLAN_VERSION = 1
+
+
+class StalePlanError(Exception):
+    pass
+
+
+def row_digest(row: Dict[str, Any]) -> str:
+    encoded = json.dumps(row, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def database_fingerprint(database_path: str) -> str:
+    """
+    Digest of every row's key and digest, in key order.
+    """
+    connection = connect(database_path)
+    try:
+        cursor = connection.execute("SELECT * FROM models ORDER BY key")
+        columns = [column[0] for column in cursor.description]
+        digest = hashlib.sha1()
+        for row in cursor:
+            digest.update(row_digest(dict(zip(columns, row))).encode("ascii"))
+    finally:
+        connection.close()
+    return digest.hexdigest()
+
+
+def file_identity(path: str) -> Optional[Dict[str, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "inode": stat.st_ino}
+
+
+def build_plan(
+    operations: List[Dict[str, Any]], database_path: str, models_dir: str
+) -> Dict[str, Any]:
+    connection = connect(database_path)
+    try:
+        rows = select_rows(connection, [op["key"] for op in operations])
+    finally:
+        connection.close()
+    digests = {row["key"]: row_digest(row) for row in rows}
+
+    for operation in operations:
+        operation["row"] = digests.get(operation["key"])
+        if operation["action"] == "update":
+            operation["file"] = file_identity(operation["path"])
+
+    return {
+        "version": PLAN_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "database": database_path,
+        "models_dir": models_dir,
+        "database_fingerprint": database_fingerprint(database_path),
+        "operations": operations,
+    }
+
+
+def stale_files(plan: Dict[str, Any]) -> List[str]:
+    """
+    Reasons the files a plan relies on no longer look the way they did.
+    """
+    problems = []
+    for operation in plan["operations"]:
+        if operation["action"] == "update":
+            if file_identity(operation["path"]) != operation.get("file"):
+                problems.append(f"{operation['name']}: {operation['path']} changed")
+        elif operation.get("old_path") and os.path.exists(
+            resolve_model_path(operation["old_path"])
+        ):
+            problems.append(f"{operation['name']}: {operation['old_path']} is back")
+    return problems
+
+
+def row_guard(plan: Dict[str, Any]):
+    """
+    Transaction guard that refuses to apply a plan over rows that changed.
+    """
+    expected = {op["key"]: op.get("row") for op in plan["operations"]}
+
+    def guard(rows: List[Dict[str, Any]]) -> None:
+        current = {row["key"]: row_digest(row) for row in rows}
+        changed = [
+            key for key, digest in expected.items() if current.get(key) != digest
+        ]
+        if changed:
+            raise StalePlanError(
+                f"{len(changed)} row(s) changed since the plan was made: "
+                + ", ".join(changed[:10])
+            )
+
+    return guard
+
+
+def write_sync_plan(plan_path: str) -> None:
+    local_models, db_models = load_local_and_database_models()
+    missing_models = filter_and_compare_models(local_models, db_models)
+    if not missing_models:
+        feedback_message("All database models are in sync with local files.", "success")
+        return
+
+    plan = build_plan(
+        plan_sync(missing_models, local_models),
+        functions.DATABASE_PATH,
+        functions.MODELS_DIR,
+    )
+    write_json(plan_path, plan)
+
+    updates = sum(1 for op in plan["operations"] if op["action"] == "update")
+    feedback_message(
+        f"Wrote a plan with {updates} path update(s) and "
+        f"{len(plan['operations']) - updates} deletion(s) to {plan_path}. "
+        f"Review it, then run: invokeai-models sync-models --apply {plan_path}",
+        "success",
+    )
+
+
+def apply_sync_plan_file(plan_path: str, force: bool = False) -> None:
+    plan = read_json(plan_path)
+    if not plan or plan.get("version") != PLAN_VERSION:
+        feedback_message(
+            f"{plan_path} is not a sync plan this version understands.", "error"
+        )
+        return
+
+    # Never retarget a plan: made for another install, it would be applied to
+    # whichever database is configured here
+    database_path = plan["database"]
+    if not os.path.exists(database_path):
+        feedback_message(
+            f"The plan was made for {database_path}, which doesn't exist. "
+            "Make a new plan for this install.",
+            "error",
+        )
+        return
+
+    if database_fingerprint(database_path) != plan["database_fingerprint"]:
+        feedback_message(
+            "The database changed since the plan was made. Only rows the plan "
+            "touches are checked before applying.",
+            "warning",
+        )
+
+    problems = stale_files(plan)
+    if problems and not force:
+        for problem in problems[:20]:
+            console.print(f"[red]Stale:[/red] {problem}")
+        feedback_message(
+            f"{len(problems)} file(s) changed since the plan was made. "
+            "Make a new plan, or use --force to apply anyway.",
+            "error",
+        )
+        return
+
+    operations = plan["operations"]
+    confirm = inquirer.confirm(
+        f"Apply {len(operations)} change(s) from {plan_path} to {database_path}?"
+    )
+    if not confirm:
+        feedback_message("Sync cancelled.", "info")
+        return
+
+    try:
+        stats = apply_sync_plan(
+            operations, database_path, guard=None if force else row_guard(plan)
+        )
+    except StalePlanError as e:
+        feedback_message(f"{str(e)}. Nothing was changed.", "error")
+        return
+
+    if stats is not None and database_path == functions.DATABASE_PATH:
+        manage_cache("database_models", load_database_models())
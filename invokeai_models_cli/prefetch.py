@@ -0,0 +1,51 @@
+"""
+Speculative loading while the user reads a prompt.
+
+Interactive commands know what they will need once a menu is answered (a
+fresh scan, a fresh database read), so they start it on a background thread
+before asking and collect it afterwards. The slow part then overlaps with the
+user's think time instead of following it. Threads are daemons, so answering
+"Cancel" never waits for a load nobody will use.
+"""
+
+import threading
+from typing import Any, Callable, Optional
+
+from .timings import span, count
+
+__all__ = ["Prefetch"]
+
+
+class Prefetch:
+    """
+    Run ``load(*args)`` on a background thread right away; result() waits
+    for it and returns its value or raises its exception.
+    """
+
+    def __init__(self, load: Callable[..., Any], *args: Any):
+        self._value: Any = None
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(
+            target=self._run, args=(load, args), daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, load: Callable[..., Any], args: tuple) -> None:
+        try:
+            with span("prefetch"):
+                self._value = load(*args)
+        except BaseException as e:
+            self._error = e
+
+    def done(self) -> bool:
+        return not self._thread.is_alive()
+
+    def result(self) -> Any:
+        if self.done():
+            count("prefetch hits")
+        else:
+            with span("prefetch wait"):
+                self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._value
@@ -0,0 +1,67 @@
+"""
+Gauges in the Prometheus text exposition format, for node_exporter's
+textfile collector.
+
+The collector reads every ``*.prom`` file of its folder on each scrape, so a
+file must never be seen half-written: write_textfile goes through
+helpers.write_atomic, a synced temporary file renamed over the target.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .helpers import write_atomic
+
+__all__ = ["Gauge", "render_metrics", "write_textfile"]
+
+_INVALID_NAME = re.compile(r"[^a-zA-Z0-9_:]")
+
+Sample = Tuple[Dict[str, str], float]
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str):
+        self.name = _INVALID_NAME.sub("_", name)
+        self.help_text = help_text
+        self.samples: List[Sample] = []
+
+    def set(self, value: float, **labels: Optional[str]) -> "Gauge":
+        self.samples.append(
+            ({name: str(label) for name, label in labels.items()}, value)
+        )
+        return self
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render_metrics(gauges: Iterable[Gauge]) -> str:
+    lines = []
+    for gauge in gauges:
+        if not gauge.samples:
+            continue
+        lines.append(f"# HELP {gauge.name} {_escape(gauge.help_text)}")
+        lines.append(f"# TYPE {gauge.name} gauge")
+        for labels, value in gauge.samples:
+            text = ",".join(
+                f'{name}="{_escape(label)}"' for name, label in sorted(labels.items())
+            )
+            lines.append(
+                f"{gauge.name}{{{text}}} {_number(value)}"
+                if text
+                else f"{gauge.name} {_number(value)}"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path: str, text: str) -> None:
+    # The temporary file ends in .tmp, which the collector doesn't read, and
+    # node_exporter usually runs as another user
+    write_atomic(path, text, mode=0o644)
@@ -0,0 +1,94 @@
+import os
+import hashlib
+import sqlite3
+from datetime import datetime
+from typing import List, Optional
+
+from . import functions
+from .helpers import feedback_message, create_table
+from .functions import console
+from .search import open_index, refresh_index, search_models
+from .timings import span
+
+__all__ = ["query_models", "query_index_path"]
+
+
+def query_index_path(database_path: str) -> str:
+    # One sidecar per database, installs don't share an index
+    digest = hashlib.sha1(database_path.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(functions.SNAPSHOTS_DIR, f"query-{digest}.db")
+
+
+def query_models(
+    text: Optional[str] = None,
+    bases: Optional[List[str]] = None,
+    types: Optional[List[str]] = None,
+    formats: Optional[List[str]] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    sort: Optional[str] = None,
+    descending: bool = False,
+    limit: int = 50,
+    refresh: bool = False,
+) -> None:
+    database_path = functions.DATABASE_PATH
+    try:
+        index = open_index(query_index_path(database_path))
+    except sqlite3.Error as e:
+        feedback_message(f"Error opening the search index: {str(e)}", "error")
+        return
+    try:
+        changes = refresh_index(index, database_path, force=refresh)
+        if changes and any(changes.values()):
+            console.print(
+                "[dim]Search index updated: "
+                + ", ".join(f"{value} {name}" for name, value in changes.items())
+                + "[/dim]"
+            )
+        models = search_models(
+            index,
+            text,
+            bases=bases or (),
+            types=types or (),
+            formats=formats or (),
+            since=since,
+            until=until,
+            sort=sort,
+            descending=descending,
+            limit=limit,
+        )
+    except sqlite3.Error as e:
+        feedback_message(f"Error searching {database_path}: {str(e)}", "error")
+        return
+    finally:
+        index.close()
+
+    if not models:
+        feedback_message("No models match the query.", "info")
+        return
+
+    models_table = create_table(
+        "Matching Models",
+        [
+            ("Name", "yellow"),
+            ("Base", "cyan"),
+            ("Type", "magenta"),
+            ("Format", "white"),
+            ("Added", "yellow dim"),
+            ("Path", "green"),
+        ],
+    )
+    for model in models:
+        models_table.add_row(
+            model["name"],
+            model["base"] or "",
+            model["type"] or "",
+            model["format"] or "",
+            (model["created_at"] or "")[:16],
+            model["path"] or "",
+        )
+    with span("render"):
+        console.print(models_table)
+        console.print(
+            f"{len(models)} model(s)" + (" (limit)" if len(models) == limit else "")
+        )
@@ -0,0 +1,229 @@
+"""
+Compact local model records.
+
+A library of a few hundred thousand files used to be as many dicts, each with
+the absolute path, a relative path repeating most of it and two ISO dates
+formatted up front. A LocalModel keeps only what can't be derived: the folder
+(interned, so every file of a folder shares one string), the file name, the
+rule name, the size, device and inode, and the raw nanosecond timestamps.
+Everything else (paths, name, type, format, dates) is computed when read.
+
+Records read like the dicts they replace (``model["file_path"]``,
+``model.get("real_path")``, ``"aliases" in model``), so callers and tests that
+build plain dicts keep working, and they compare equal to a dict with the same
+keys. The shard index stores them as rows, see to_row and from_row.
+"""
+
+import os
+import sys
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+__all__ = ["LocalModel", "format_timestamp"]
+
+_NS = 1_000_000_000
+
+
+def format_timestamp(ns: int) -> str:
+    # Same float as os.stat_result.st_mtime, so the text matches what
+    # fromtimestamp(st_mtime) gave before and cached comparisons still hold
+    seconds, nanoseconds = divmod(ns, _NS)
+    return datetime.fromtimestamp(seconds + nanoseconds * 1e-9).isoformat()
+
+
+class LocalModel(Mapping):
+    __slots__ = (
+        "root",
+        "directory",
+        "filename",
+        "model_type",
+        "is_dir",
+        "size",
+        "ctime_ns",
+        "mtime_ns",
+        "device",
+        "inode",
+        "real_path",
+        "aliases",
+        "extra",
+    )
+
+    def __init__(
+        self,
+        root: str,
+        directory: str,
+        filename: str,
+        model_type: str,
+        is_dir: bool,
+        size: int,
+        ctime_ns: int,
+        mtime_ns: int,
+        device: int,
+        inode: int,
+        real_path: Optional[str] = None,
+        aliases: Optional[Sequence[str]] = None,
+    ):
+        self.root = root
+        self.directory = sys.intern(directory)
+        self.filename = filename
+        self.model_type = sys.intern(model_type)
+        self.is_dir = is_dir
+        self.size = size
+        self.ctime_ns = ctime_ns
+        self.mtime_ns = mtime_ns
+        self.device = device
+        self.inode = inode
+        self.real_path = real_path
+        self.aliases = tuple(aliases) if aliases else None
+        self.extra: Optional[Dict[str, Any]] = None
+
+    @property
+    def file_path(self) -> str:
+        return os.path.join(self.directory, self.filename)
+
+    @property
+    def relative_path(self) -> str:
+        file_path = self.file_path
+        prefix = os.path.join(self.root, "")
+        if file_path.startswith(prefix):
+            return file_path[len(prefix) :]
+        return os.path.relpath(file_path, self.root)
+
+    @property
+    def name(self) -> str:
+        return self.filename if self.is_dir else os.path.splitext(self.filename)[0]
+
+    @property
+    def type(self) -> str:
+        parts = self.relative_path.split(os.path.sep)
+        type_str = " ".join(part.replace("_", " ") for part in parts[1:-1]).lower()
+        return type_str if type_str else parts[0].rstrip("s")
+
+    @property
+    def format(self) -> str:
+        if self.is_dir:
+            return "diffusers"
+        return os.path.splitext(self.filename)[1][1:].lower()
+
+    @property
+    def created(self) -> str:
+        return format_timestamp(self.ctime_ns)
+
+    @property
+    def updated(self) -> str:
+        return format_timestamp(self.mtime_ns)
+
+    # Keys of the dict form, in the order model_record used to build it
+    KEYS = (
+        "filename",
+        "name",
+        "file_path",
+        "relative_path",
+        "type",
+        "model_type",
+        "format",
+        "size",
+        "created",
+        "updated",
+        "device",
+        "inode",
+    )
+    _OPTIONAL = ("real_path", "aliases")
+    _DERIVED = frozenset(KEYS)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._DERIVED:
+            return getattr(self, key)
+        if key in self._OPTIONAL:
+            value = getattr(self, key)
+            if value is not None:
+                return list(value) if key == "aliases" else value
+        elif self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        # Only extras (header metadata) are set after a scan
+        if key in self._DERIVED or key in self._OPTIONAL:
+            raise TypeError(f"{key} is derived from the file, not assignable")
+        if self.extra is None:
+            self.extra = {}
+        self.extra[key] = value
+
+    def __contains__(self, key: object) -> bool:
+        if key in self._DERIVED:
+            return True
+        if key in self._OPTIONAL:
+            return getattr(self, key) is not None
+        return self.extra is not None and key in self.extra
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.KEYS
+        for key in self._OPTIONAL:
+            if getattr(self, key) is not None:
+                yield key
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"LocalModel({self.file_path!r})"
+
+    def with_aliases(self, aliases: Sequence[str]) -> "LocalModel":
+        copy = LocalModel(
+            self.root,
+            self.directory,
+            self.filename,
+            self.model_type,
+            self.is_dir,
+            self.size,
+            self.ctime_ns,
+            self.mtime_ns,
+            self.device,
+            self.inode,
+            self.real_path,
+            aliases,
+        )
+        copy.extra = self.extra
+        return copy
+
+    def to_row(self) -> List[Any]:
+        """
+        The record as a JSON row, without the folder it was found in.
+        """
+        return [
+            self.filename,
+            self.model_type,
+            int(self.is_dir),
+            self.size,
+            self.ctime_ns,
+            self.mtime_ns,
+            self.device,
+            self.inode,
+            self.real_path,
+        ]
+
+    @classmethod
+    def from_row(cls, root: str, owner: str, row: Sequence[Any]) -> "LocalModel":
+        """
+        Rebuild a record from its row and the folder ``owner`` that was listed
+        to find it, the model's own folder for directory models.
+        """
+        filename, model_type, is_dir, size, ctime, mtime, device, inode, real = row
+        directory = os.path.dirname(owner) if is_dir else owner
+        return cls(
+            root,
+            directory,
+            filename,
+            model_type,
+            bool(is_dir),
+            size,
+            ctime,
+            mtime,
+            device,
+            inode,
+            real,
+        )
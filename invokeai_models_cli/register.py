@@ -0,0 +1,327 @@
+import os
+import json
+import uuid
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+import inquirer
+
+from . import functions
+from .helpers import feedback_message, create_table, format_size
+from .hashing import DEFAULT_ALGORITHM, algorithm_from_hash, hash_models
+from .scanner import read_safetensors_header, real_path
+from .functions import (
+    console,
+    canonical_model_path,
+    load_local_and_database_models,
+    load_database_models,
+    find_unregistered_models,
+    update_fingerprint_index,
+    save_fingerprint_index,
+    journaled_writes,
+    report_write,
+    manage_cache,
+)
+from .writes import Write, connect, json_column
+from .timings import span
+
+__all__ = ["unregistered_models"]
+
+# Checked in order, so refiners and SDXL win over the shorter SD 1/2 hints
+BASE_HINTS = [
+    ("refiner", "sdxl-refiner"),
+    ("sdxl", "sdxl"),
+    ("stable-diffusion-xl", "sdxl"),
+    ("pony", "sdxl"),
+    ("flux", "flux"),
+    ("sd3", "sd-3"),
+    ("stable-diffusion-3", "sd-3"),
+    ("sd-3", "sd-3"),
+    ("sd_v2", "sd-2"),
+    ("sd2", "sd-2"),
+    ("sd-2", "sd-2"),
+    ("stable-diffusion-v2", "sd-2"),
+    ("sd_v1", "sd-1"),
+    ("sd15", "sd-1"),
+    ("sd1", "sd-1"),
+    ("sd-1", "sd-1"),
+    ("stable-diffusion-v1", "sd-1"),
+]
+# Header fields kohya and the modelspec convention use for the base model
+BASE_METADATA_FIELDS = ("modelspec.architecture", "ss_base_model_version")
+FORMATS = {"lora": "lora", "embedding": "embedding_file"}
+COLUMNS = (
+    "key",
+    "hash",
+    "base",
+    "type",
+    "path",
+    "format",
+    "name",
+    "description",
+    "source",
+    "source_type",
+)
+# Paths per "path IN (...)" query, under SQLite's older 999 variable limit
+QUERY_CHUNK_SIZE = 500
+
+
+class RegistrationChanged(Exception):
+    pass
+
+
+def _base_hint(value: str) -> Optional[str]:
+    value = value.lower()
+    return next((base for hint, base in BASE_HINTS if hint in value), None)
+
+
+def infer_base(model: Dict[str, Any], metadata: Dict[str, Any]) -> str:
+    """
+    Base model from the safetensors header, then from the folder names.
+    """
+    for field in BASE_METADATA_FIELDS:
+        base = _base_hint(str(metadata.get(field) or ""))
+        if base:
+            return base
+    for part in model["relative_path"].split(os.path.sep)[:-1]:
+        base = _base_hint(part)
+        if base:
+            return base
+    return "any"
+
+
+def model_format(model: Dict[str, Any]) -> str:
+    if model.get("format") == "diffusers":
+        return "diffusers"
+    if model.get("format") == "gguf":
+        return "gguf_quantized"
+    return FORMATS.get(model.get("model_type"), "checkpoint")
+
+
+def header_metadata(local_models: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    ``__metadata__`` of every safetensors model, headers read in parallel.
+    """
+    paths = [
+        model["file_path"]
+        for model in local_models
+        if model["file_path"].endswith(".safetensors")
+    ]
+    with ThreadPoolExecutor() as executor:
+        headers = executor.map(read_safetensors_header, paths)
+        return {
+            path: (header or {}).get("__metadata__") or {}
+            for path, header in zip(paths, headers)
+        }
+
+
+def model_hashes(
+    local_models: List[Dict[str, Any]], index: Dict[str, Any]
+) -> Dict[str, str]:
+    """
+    InvokeAI hashes for the models, reusing the ones cached in the fingerprint
+    index and hashing the rest in one pass (cached for next time).
+    """
+    files = index.get("files", {})
+    hashes = {}
+    to_hash = []
+    for model in local_models:
+        cached = files.get(model["file_path"], {}).get("hash")
+        if cached and algorithm_from_hash(cached) == DEFAULT_ALGORITHM:
+            hashes[model["file_path"]] = cached
+        else:
+            to_hash.append(model["file_path"])
+
+    if to_hash:
+        with console.status(f"[green]Hashing {len(to_hash)} model(s)...[/green]"):
+            for path, value in hash_models(to_hash, DEFAULT_ALGORITHM).items():
+                hashes[path] = value
+                if path in files:
+                    files[path]["hash"] = value
+    return hashes
+
+
+def registration_row(
+    model: Dict[str, Any], model_hash: str, metadata: Dict[str, Any]
+) -> Dict[str, Any]:
+    row = {
+        "key": str(uuid.uuid4()),
+        "hash": model_hash,
+        "base": infer_base(model, metadata),
+        "type": model["model_type"],
+        "path": model["file_path"],
+        "format": model_format(model),
+        "name": model["name"],
+        "description": metadata.get("modelspec.description") or None,
+        "source": model["file_path"],
+        "source_type": "path",
+    }
+    row["config"] = json.dumps(row)
+    return row
+
+
+def registration_writes(
+    rows: List[Dict[str, Any]], settings_column: Optional[str] = "config"
+) -> List[Write]:
+    """
+    The insert for ``rows``, with their JSON settings in ``settings_column``
+    (see writes.json_column), left out when the table has no such column.
+    """
+    columns = COLUMNS + (settings_column,) if settings_column else COLUMNS
+    return [
+        (
+            f"INSERT INTO models ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            [
+                tuple(row[column] for column in COLUMNS)
+                + ((row["config"],) if settings_column else ())
+                for row in rows
+            ],
+        )
+    ]
+
+
+def registered_since(rows: List[Dict[str, Any]], invoke_ai_dir: str = None):
+    """
+    Capture for the insert transaction: refuses if any of the paths got
+    registered after the scan (by InvokeAI, say), otherwise returns the new
+    keys so the inserted rows are journaled.
+
+    Only rows stored under a spelling of the paths (as given, resolved, or
+    relative to the models folder) are read, and they are compared by
+    canonical path. The spellings are worked out before the transaction.
+    """
+    paths = {canonical_model_path(row["path"], invoke_ai_dir) for row in rows}
+    models_root = os.path.join(invoke_ai_dir or functions.INVOKE_AI_DIR, "models")
+    spellings = {row["path"] for row in rows} | paths
+    for root in {models_root, real_path(models_root)}:
+        for path in list(spellings):
+            relative = os.path.relpath(path, root)
+            if not relative.startswith(os.pardir):
+                spellings.add(relative)
+    spellings = sorted(spellings)
+
+    def capture(connection) -> List[str]:
+        taken = []
+        for start in range(0, len(spellings), QUERY_CHUNK_SIZE):
+            chunk = spellings[start : start + QUERY_CHUNK_SIZE]
+            taken.extend(
+                path
+                for (path,) in connection.execute(
+                    f"SELECT path FROM models WHERE path IN "
+                    f"({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+                if canonical_model_path(path, invoke_ai_dir) in paths
+            )
+        if taken:
+            raise RegistrationChanged(
+                f"{len(taken)} model(s) were registered meanwhile: "
+                + ", ".join(taken[:10])
+            )
+        return [row["key"] for row in rows]
+
+    return capture
+
+
+def display_unregistered_models(rows: List[Dict[str, Any]], sizes: Dict[str, int]):
+    unregistered_table = create_table(
+        "Local Models Missing From the Database",
+        [
+            ("Name", "yellow"),
+            ("Type", "cyan"),
+            ("Base", "magenta"),
+            ("Size", "white"),
+            ("Path", "dim"),
+        ],
+    )
+    for row in rows:
+        unregistered_table.add_row(
+            row["name"],
+            row["type"],
+            row["base"],
+            format_size(sizes[row["path"]]),
+            row["path"],
+        )
+    with span("render"):
+        console.print(unregistered_table)
+
+
+def unregistered_models(
+    register: bool = False,
+    dry_run: bool = False,
+    model_types: Optional[List[str]] = None,
+) -> None:
+    local_models, db_models = load_local_and_database_models()
+    unregistered = [
+        model
+        for model in find_unregistered_models(local_models, db_models)
+        if not model_types or model.get("model_type") in model_types
+    ]
+    if not unregistered:
+        feedback_message("Every local model is registered in the database.", "success")
+        return
+
+    metadata = header_metadata(unregistered)
+    sizes = {model["file_path"]: model.get("size") or 0 for model in unregistered}
+    if not register:
+        rows = [
+            registration_row(model, "", metadata.get(model["file_path"], {}))
+            for model in unregistered
+        ]
+        display_unregistered_models(rows, sizes)
+        feedback_message(
+            f"{len(rows)} local model(s), {format_size(sum(sizes.values()))}, "
+            "are not in the database. Use --register to add them.",
+            "warning",
+        )
+        return
+
+    paths = set(sizes)
+    index = update_fingerprint_index(
+        local_models, db_models, select=lambda model: model["file_path"] in paths
+    )
+    hashes = model_hashes(unregistered, index)
+    save_fingerprint_index(index)
+
+    rows = [
+        registration_row(
+            model, hashes[model["file_path"]], metadata.get(model["file_path"], {})
+        )
+        for model in unregistered
+    ]
+    display_unregistered_models(rows, sizes)
+
+    if dry_run:
+        console.print(
+            f"[bold green]Dry run: {len(rows)} model(s) would be registered. "
+            "No changes were made to the database.[/bold green]"
+        )
+        return
+
+    confirm = inquirer.confirm(f"Register {len(rows)} model(s) in the database?")
+    if not confirm:
+        feedback_message("Registration cancelled.", "info")
+        return
+
+    try:
+        connection = connect(functions.DATABASE_PATH)
+        try:
+            settings_column = json_column(connection)
+        finally:
+            connection.close()
+        stats, entry_id = journaled_writes(
+            "register-models",
+            registration_writes(rows, settings_column),
+            registered_since(rows),
+        )
+    except (sqlite3.Error, RegistrationChanged) as e:
+        feedback_message(
+            f"Error registering models: {str(e)}. Changes rolled back.", "error"
+        )
+        return
+
+    feedback_message(f"Registered {stats.rows} model(s).", "success")
+    report_write(stats, entry_id)
+    manage_cache("database_models", load_database_models())
@@ -0,0 +1,155 @@
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Tuple
+
+import inquirer
+
+from . import functions
+from .helpers import feedback_message, create_table
+from .functions import (
+    console,
+    resolve_model_path,
+    journaled_writes,
+    report_write,
+    manage_cache,
+    load_database_models,
+)
+from .writes import connect
+from .timings import span
+
+__all__ = ["relocate_models"]
+
+# Paths stat'ed per executor call
+STAT_BATCH_SIZE = 512
+
+
+class RelocationChanged(Exception):
+    pass
+
+
+def _prefix(path: str) -> str:
+    return path.rstrip("/\\") + os.path.sep
+
+
+def matching_rows(connection, old_prefix: str) -> List[Tuple[str, str]]:
+    """
+    (key, path) of every model stored under ``old_prefix``.
+    """
+    return connection.execute(
+        "SELECT key, path FROM models WHERE substr(path, 1, ?) = ?",
+        (len(old_prefix), old_prefix),
+    ).fetchall()
+
+
+def relocated_path(path: str, old_prefix: str, new_prefix: str) -> str:
+    return new_prefix + path[len(old_prefix) :]
+
+
+def _missing(paths: List[str]) -> List[str]:
+    return [path for path in paths if not os.path.exists(path)]
+
+
+def missing_targets(paths: List[str], max_workers: int = None) -> List[str]:
+    """
+    The paths that don't exist, stat'ed in batches on a thread pool.
+    """
+    batches = [
+        paths[start : start + STAT_BATCH_SIZE]
+        for start in range(0, len(paths), STAT_BATCH_SIZE)
+    ]
+    with span("stat"), ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return [path for batch in executor.map(_missing, batches) for path in batch]
+
+
+def relocate_models(
+    old_prefix: str, new_prefix: str, dry_run: bool = False, force: bool = False
+) -> None:
+    old_prefix, new_prefix = _prefix(old_prefix), _prefix(new_prefix)
+    database_path = functions.DATABASE_PATH
+
+    connection = connect(database_path)
+    try:
+        rows = matching_rows(connection, old_prefix)
+    finally:
+        connection.close()
+
+    if not rows:
+        feedback_message(f"No model paths start with {old_prefix}", "info")
+        return
+
+    changes: List[Dict[str, Any]] = [
+        {"key": key, "old": path, "new": relocated_path(path, old_prefix, new_prefix)}
+        for key, path in rows
+    ]
+    missing = set(missing_targets([resolve_model_path(c["new"]) for c in changes]))
+
+    relocate_table = create_table(
+        f"Relocating {len(changes)} model path(s)",
+        [("Old Path", "dim"), ("New Path", "green"), ("Target", "magenta")],
+    )
+    for change in changes[:20]:
+        found = resolve_model_path(change["new"]) not in missing
+        relocate_table.add_row(
+            change["old"], change["new"], "found" if found else "[red]missing[/red]"
+        )
+    if len(changes) > 20:
+        relocate_table.add_row(f"... {len(changes) - 20} more", "", "")
+    with span("render"):
+        console.print(relocate_table)
+
+    if missing and not force:
+        feedback_message(
+            f"{len(missing)} of {len(changes)} target(s) don't exist under "
+            f"{new_prefix}. Nothing was changed, use --force to relocate anyway.",
+            "error",
+        )
+        return
+
+    if dry_run:
+        console.print(
+            f"[bold green]Dry run: {len(changes)} path(s) would be rewritten. "
+            "No changes were made to the database.[/bold green]"
+        )
+        return
+
+    confirm = inquirer.confirm(
+        f"Rewrite {len(changes)} path(s) from {old_prefix} to {new_prefix}?"
+    )
+    if not confirm:
+        feedback_message("Relocation cancelled.", "info")
+        return
+
+    planned = {change["key"] for change in changes}
+
+    def capture(connection) -> List[str]:
+        return [key for key, _path in matching_rows(connection, old_prefix)]
+
+    def guard(before: List[Dict[str, Any]]) -> None:
+        if {row["key"] for row in before} != planned:
+            raise RelocationChanged("the matching models changed while checking")
+
+    try:
+        stats, entry_id = journaled_writes(
+            "relocate",
+            [
+                (
+                    "UPDATE models SET path = ? || substr(path, ?) "
+                    "WHERE substr(path, 1, ?) = ?",
+                    [(new_prefix, len(old_prefix) + 1, len(old_prefix), old_prefix)],
+                )
+            ],
+            capture,
+            database_path,
+            guard=guard,
+            columns=["key", "path"],
+        )
+    except (sqlite3.Error, RelocationChanged) as e:
+        feedback_message(
+            f"Error relocating models: {str(e)}. Changes rolled back.", "error"
+        )
+        return
+
+    feedback_message(f"Relocated {stats.rows} model path(s).", "success")
+    report_write(stats, entry_id)
+    manage_cache("database_models", load_database_models())
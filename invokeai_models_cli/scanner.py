@@ -0,0 +1,334 @@
+"""
+Building blocks shared by every way of scanning the models directory
+(collect_model_info, the async pipeline): listing a directory through the
+model type classifier and turning what it finds into local model records.
+
+Files are identified by (st_dev, st_ino), not by path. Symlinked folders are
+followed, but a folder is only listed once however many links lead to it,
+and files reached under several names (symlinks, hard links) end up as one
+record with the other names as aliases. Real paths are resolved through a
+cache shared by every directory, so aliases don't cost repeated stats.
+"""
+
+import os
+import json
+import stat
+import struct
+import threading
+from typing import Dict, Any, Optional, List, Tuple
+
+from . import throttle
+from .timings import span, count
+from .records import LocalModel
+from .classifier import (
+    ModelTypeRule,
+    rule_for_directory,
+    is_excluded,
+    classify_file,
+    classify_directory,
+)
+
+__all__ = [
+    "scan_directory",
+    "walk_models",
+    "stat_model",
+    "model_record",
+    "merge_aliases",
+    "model_real_paths",
+    "real_path",
+    "forget_real_paths",
+    "DirectoryGuard",
+    "directory_size",
+    "read_safetensors_header",
+]
+
+# Anything larger is not a real safetensors header, don't try to parse it
+MAX_HEADER_BYTES = 100 * 1024 * 1024
+# Links followed in a row before a path is considered a loop, as the kernel does
+MAX_LINK_DEPTH = 40
+
+# (path, rule inherited from the parent folders)
+PendingDirectory = Tuple[str, Optional[ModelTypeRule]]
+# (path, rule, directory-format model)
+ModelEntry = Tuple[str, ModelTypeRule, bool]
+
+
+def scan_directory(
+    path: str, rule: Optional[ModelTypeRule] = None
+) -> Tuple[List[PendingDirectory], List[ModelEntry], int]:
+    """
+    List one directory.
+
+    Returns the subdirectories still worth walking, the models found and the
+    number of files seen. A folder recognised as a directory-format model comes
+    back as a single model entry and none of its subdirectories are returned,
+    which prunes the walk below it. Symlinked directories are returned like
+    the others, the walk's DirectoryGuard decides whether to list them.
+    """
+    with span("scan"), throttle.operation(path):
+        try:
+            with os.scandir(path) as iterator:
+                entries = list(iterator)
+        except OSError:
+            return [], [], 0
+
+    names = [entry.name for entry in entries]
+    unit_rule = classify_directory(os.path.basename(path), names, rule)
+    if unit_rule is not None:
+        return [], [(path, unit_rule, True)], 0
+
+    subdirs: List[PendingDirectory] = []
+    models: List[ModelEntry] = []
+    files_seen = 0
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            continue
+
+        if is_dir:
+            if not is_excluded(entry.name):
+                subdirs.append((entry.path, rule_for_directory(entry.name, rule)))
+            continue
+
+        files_seen += 1
+        file_rule = classify_file(entry.name, rule)
+        if file_rule is not None:
+            models.append((entry.path, file_rule, False))
+
+    return subdirs, models, files_seen
+
+
+# Resolved path of everything looked up so far, directories included
+_REAL_PATHS: Dict[str, str] = {}
+
+
+def real_path(path: str) -> str:
+    """
+    os.path.realpath through a cache of every directory resolved so far, so a
+    file below known directories costs at most one readlink for its own name.
+    """
+    return _resolve(os.path.abspath(path), 0)
+
+
+def _resolve(path: str, depth: int) -> str:
+    resolved = _REAL_PATHS.get(path)
+    if resolved is not None:
+        return resolved
+    parent, name = os.path.split(path)
+    if not name:
+        return path
+    resolved = os.path.join(_resolve(parent, depth), name)
+    if depth < MAX_LINK_DEPTH:
+        try:
+            target = os.readlink(resolved)
+        except OSError:
+            pass  # not a link
+        else:
+            target = os.path.join(os.path.dirname(resolved), target)
+            resolved = _resolve(os.path.normpath(target), depth + 1)
+    _REAL_PATHS[path] = resolved
+    return resolved
+
+
+def forget_real_paths() -> None:
+    _REAL_PATHS.clear()
+
+
+def _is_within(path: str, folder: str) -> bool:
+    return path == folder or path.startswith(os.path.join(folder, ""))
+
+
+class DirectoryGuard:
+    """
+    Decides which directories a walk lists, so each is listed once.
+
+    A symlink to another folder of the models directory is skipped, the
+    folder is listed under its own name. A symlink out of it (a symlink farm
+    of other disks) is followed. A folder already listed, which is what a
+    symlink loop leads back to, is skipped. Shared by the listing threads.
+    """
+
+    def __init__(self, models_dir: str):
+        self.models_dir = models_dir
+        self.root = real_path(models_dir)
+        self.seen: set = set()
+        self._lock = threading.Lock()
+
+    def _aliased(self, path: str) -> bool:
+        resolved = real_path(path)
+        relative = os.path.relpath(path, self.models_dir)
+        if resolved == os.path.normpath(os.path.join(self.root, relative)):
+            return False
+        if not _is_within(resolved, self.root):
+            return False
+        # Only skip it if the folder it points at is walked on its own
+        inside = os.path.relpath(resolved, self.root).split(os.path.sep)
+        return not any(is_excluded(part) for part in inside)
+
+    def enter(self, path: str) -> Optional[os.stat_result]:
+        """
+        The directory's stat result if it should be listed, else None.
+        """
+        if self._aliased(path):
+            count("directory aliases skipped")
+            return None
+        try:
+            with throttle.operation(path):
+                stats = os.stat(path)
+        except OSError:
+            return None
+        identity = (stats.st_dev, stats.st_ino)
+        with self._lock:
+            if identity in self.seen:
+                count("directory loops skipped")
+                return None
+            self.seen.add(identity)
+        return stats
+
+
+def walk_models(models_dir: str) -> Tuple[List[ModelEntry], int]:
+    """
+    Walk the whole models directory sequentially.
+    """
+    guard = DirectoryGuard(models_dir)
+    pending: List[PendingDirectory] = [(models_dir, None)]
+    models: List[ModelEntry] = []
+    files_seen = 0
+    while pending:
+        path, rule = pending.pop()
+        if guard.enter(path) is None:
+            continue
+        subdirs, found, seen = scan_directory(path, rule)
+        pending.extend(subdirs)
+        models.extend(found)
+        files_seen += seen
+    return models, files_seen
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    pending = [path]
+    while pending:
+        folder = pending.pop()
+        try:
+            with throttle.operation(folder), os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file():
+                        total += entry.stat().st_size
+        except OSError:
+            continue
+    return total
+
+
+def stat_model(
+    path: str, models_dir: str, rule: ModelTypeRule, is_dir: bool
+) -> Optional[Dict[str, Any]]:
+    try:
+        with span("stat"), throttle.operation(path):
+            stats = os.lstat(path)
+            link = stat.S_ISLNK(stats.st_mode)
+            if link:
+                stats = os.stat(path)
+        # Outside the slot, directory_size takes one per folder it lists and
+        # the per-device semaphores aren't reentrant
+        size = directory_size(path) if is_dir else stats.st_size
+    except OSError:
+        return None
+    # The folder is resolved already, only a link in the last part costs more
+    if link:
+        resolved = real_path(path)
+    else:
+        resolved = os.path.join(
+            real_path(os.path.dirname(path)), os.path.basename(path)
+        )
+    return model_record(path, models_dir, stats, rule, is_dir, size, resolved)
+
+
+def model_record(
+    file_path: str,
+    models_dir: str,
+    stats: os.stat_result,
+    rule: ModelTypeRule,
+    is_dir: bool,
+    size: int,
+    resolved: Optional[str] = None,
+) -> LocalModel:
+    """
+    Build the local model record stored in the local index.
+
+    ``real_path`` is only set when a symlink makes it differ from ``file_path``.
+    """
+    directory, filename = os.path.split(file_path)
+    return LocalModel(
+        models_dir,
+        directory,
+        filename,
+        rule.name,
+        is_dir,
+        size,
+        stats.st_ctime_ns,
+        stats.st_mtime_ns,
+        stats.st_dev,
+        stats.st_ino,
+        resolved if resolved and resolved != file_path else None,
+    )
+
+
+def merge_aliases(records: List[LocalModel]) -> List[LocalModel]:
+    """
+    One record per file identity, sorted by relative path.
+
+    The record kept is the one reached without a symlink, then the first by
+    relative path, with the paths of the others in ``aliases``. Records are
+    copied rather than changed, they can belong to the shard index.
+    """
+    groups: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+    for record in sorted(
+        records, key=lambda record: ("real_path" in record, record["relative_path"])
+    ):
+        groups.setdefault((record["device"], record["inode"]), []).append(record)
+
+    merged = []
+    for group in groups.values():
+        if len(group) > 1:
+            count("aliases merged", len(group) - 1)
+            merged.append(
+                group[0].with_aliases([record["file_path"] for record in group[1:]])
+            )
+        else:
+            merged.append(group[0])
+    merged.sort(key=lambda record: record["relative_path"])
+    return merged
+
+
+def model_real_paths(model: Dict[str, Any]) -> List[str]:
+    """
+    Every real path a local model is known under, to compare with database
+    paths normalized the same way.
+    """
+    paths = [model.get("real_path") or model["file_path"]]
+    paths.extend(real_path(alias) for alias in model.get("aliases", ()))
+    return paths
+
+
+def read_safetensors_header(file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Read the JSON header of a .safetensors file without touching tensor data.
+
+    Returns None when the file is not a readable safetensors file.
+    """
+    try:
+        with span("header"), throttle.operation(file_path), open(file_path, "rb") as f:
+            prefix = f.read(8)
+            if len(prefix) < 8:
+                return None
+            (length,) = struct.unpack("<Q", prefix)
+            if length > MAX_HEADER_BYTES:
+                return None
+            throttle.charge(8 + length)
+            return json.loads(f.read(length))
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,363 @@
+"""
+Full-text search index over the database models, in a sidecar SQLite file.
+
+The sidecar holds a narrow copy of every model row (the columns filters and
+sorts use, each with an index) and an FTS5 table over the name, description,
+trigger words and the text fields of the JSON settings column (``config``,
+or ``metadata_json`` in older schemas) and ``source_api_response``.
+A query is one SQL statement: the MATCH, the base/type/format/date filters,
+the order and the limit all run inside SQLite, nothing is filtered in Python.
+
+The index is refreshed incrementally. Rows are compared by a signature built
+in SQL from the short columns and the length of the JSON ones, so only new or
+changed rows are read in full. When the InvokeAI database (and its WAL) has
+the same size and modification time as at the last refresh even that is
+skipped, and a search costs two stats and one indexed query.
+"""
+
+import os
+import re
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .timings import span, count
+from .writes import json_column, select_rows
+
+__all__ = [
+    "SORTS",
+    "open_index",
+    "refresh_index",
+    "search_models",
+    "searchable_text",
+    "fts_query",
+]
+
+INDEX_VERSION = "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS models (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    signature TEXT NOT NULL,
+    name TEXT,
+    base TEXT,
+    type TEXT,
+    format TEXT,
+    path TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS models_name ON models (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS models_created ON models (created_at);
+CREATE INDEX IF NOT EXISTS models_updated ON models (updated_at);
+CREATE INDEX IF NOT EXISTS models_base ON models (base, name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS models_base_created ON models (base, created_at);
+CREATE INDEX IF NOT EXISTS models_base_updated ON models (base, updated_at);
+CREATE INDEX IF NOT EXISTS models_type ON models (type, name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS models_type_created ON models (type, created_at);
+CREATE INDEX IF NOT EXISTS models_type_updated ON models (type, updated_at);
+CREATE INDEX IF NOT EXISTS models_format ON models (format, name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS models_format_created ON models (format, created_at);
+CREATE INDEX IF NOT EXISTS models_format_updated ON models (format, updated_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS models_fts USING fts5(
+    name, description, trigger_words, extra,
+    prefix = '2 3', tokenize = 'unicode61 remove_diacritics 2'
+);
+-- A hit in the name counts most, then trigger words, tags, the description
+INSERT INTO models_fts (models_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 5.0, 2.0)');
+"""
+
+
+def signature_sql(settings_column: Optional[str]) -> str:
+    """
+    SQL for a row signature, cheap to compute for every row and changing
+    whenever a row is edited in a way that matters for search (InvokeAI bumps
+    updated_at, this tool may not).
+    """
+    terms = [
+        "coalesce(updated_at, '')",
+        "coalesce(hash, '')",
+        "coalesce(name, '')",
+        "coalesce(base, '')",
+        "coalesce(type, '')",
+        "coalesce(format, '')",
+        "coalesce(path, '')",
+        "length(coalesce(description, ''))",
+    ]
+    if settings_column:
+        terms.append(f"length(coalesce({settings_column}, ''))")
+    terms.append("length(coalesce(source_api_response, ''))")
+    return " || char(31) || ".join(terms)
+
+
+SORTS = {
+    "relevance": "models_fts.rank",
+    "name": "m.name COLLATE NOCASE",
+    "base": "m.base, m.name COLLATE NOCASE",
+    "type": "m.type, m.name COLLATE NOCASE",
+    "format": "m.format, m.name COLLATE NOCASE",
+    "created": "m.created_at",
+    "updated": "m.updated_at",
+}
+
+COLUMNS = ("key", "name", "base", "type", "format", "path", "created_at", "updated_at")
+
+# Text worth searching in the JSON columns: trigger words, tags and names
+TRIGGER_FIELDS = ("trigger_phrases", "trainedWords", "trained_words")
+EXTRA_FIELDS = ("tags", "baseModel", "base_model", "creator", "username", "name")
+
+_HTML_TAG = re.compile(r"<[^>]+>")
+
+
+def _strings(value: Any) -> Iterable[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _strings(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+
+
+def _json(text: Optional[str]) -> Dict[str, Any]:
+    try:
+        value = json.loads(text) if text else {}
+    except (TypeError, json.JSONDecodeError):
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
+def searchable_text(row: Dict[str, Any]) -> Dict[str, str]:
+    """
+    The FTS columns of a database row: name, description, trigger words and
+    the names and tags found in the JSON settings (``config`` or
+    ``metadata_json``) and ``source_api_response``, which may be a CivitAI
+    model, one of its versions or a Hugging Face repo.
+    """
+    config = _json(row.get("config") or row.get("metadata_json"))
+    api = _json(row.get("source_api_response"))
+    documents = [config, api, api.get("model") or {}]
+    documents.extend(
+        version
+        for version in api.get("modelVersions") or []
+        if isinstance(version, dict)
+    )
+
+    triggers, extra = [], []
+    for document in documents:
+        for field in TRIGGER_FIELDS:
+            triggers.extend(_strings(document.get(field)))
+        for field in EXTRA_FIELDS:
+            extra.extend(_strings(document.get(field)))
+
+    descriptions = [row.get("description") or "", config.get("description") or ""]
+    descriptions.extend(
+        _HTML_TAG.sub(" ", text) for text in _strings(api.get("description"))
+    )
+    return {
+        "name": row.get("name") or "",
+        "description": " ".join(text for text in descriptions if text),
+        "trigger_words": " ".join(triggers),
+        "extra": " ".join(extra),
+    }
+
+
+def _timestamp(value: Optional[str]) -> Optional[str]:
+    # InvokeAI writes "2024-05-01 10:00:00", keep every row comparable as text
+    return value.replace("T", " ") if value else value
+
+
+def _source_state(database_path: str) -> str:
+    state = []
+    for path in (database_path, database_path + "-wal"):
+        try:
+            stat = os.stat(path)
+            state.append([stat.st_mtime_ns, stat.st_size])
+        except OSError:
+            state.append(None)
+    return json.dumps([database_path, state])
+
+
+def open_index(index_path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(index_path, isolation_level=None)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    version = None
+    try:
+        version = connection.execute(
+            "SELECT value FROM meta WHERE name = 'version'"
+        ).fetchone()
+    except sqlite3.OperationalError:
+        pass
+    if version != (INDEX_VERSION,):
+        for table in ("models_fts", "models", "meta"):
+            connection.execute(f"DROP TABLE IF EXISTS {table}")
+        connection.executescript(SCHEMA)
+        connection.execute("INSERT INTO meta VALUES ('version', ?)", (INDEX_VERSION,))
+    return connection
+
+
+def refresh_index(
+    index: sqlite3.Connection, database_path: str, force: bool = False
+) -> Optional[Dict[str, int]]:
+    """
+    Bring the index up to date with the InvokeAI database.
+
+    Returns how many rows were added, updated and removed, or None when the
+    database didn't change since the last refresh.
+    """
+    state = _source_state(database_path)
+    last = index.execute("SELECT value FROM meta WHERE name = 'source'").fetchone()
+    if not force and last == (state,):
+        count("query index fresh")
+        return None
+
+    with span("query index refresh"):
+        source = sqlite3.connect(f"{Path(database_path).as_uri()}?mode=ro", uri=True)
+        try:
+            signature = signature_sql(json_column(source))
+            current = dict(source.execute(f"SELECT key, {signature} FROM models"))
+            known = dict(index.execute("SELECT key, signature FROM models"))
+            changed = [key for key, sig in current.items() if known.get(key) != sig]
+            rows = select_rows(source, changed)
+        finally:
+            source.close()
+        removed = [key for key in known if key not in current]
+
+        index.execute("BEGIN")
+        try:
+            _remove(index, removed)
+            _remove(index, [row["key"] for row in rows if row["key"] in known])
+            for row in rows:
+                _insert(index, row, current[row["key"]])
+            index.execute("INSERT OR REPLACE INTO meta VALUES ('source', ?)", (state,))
+            index.execute("COMMIT")
+        except BaseException:
+            index.execute("ROLLBACK")
+            raise
+
+    count("query rows indexed", len(rows))
+    return {
+        "added": sum(1 for row in rows if row["key"] not in known),
+        "updated": sum(1 for row in rows if row["key"] in known),
+        "removed": len(removed),
+    }
+
+
+def _remove(index: sqlite3.Connection, keys: Sequence[str]) -> None:
+    for start in range(0, len(keys), 500):
+        chunk = list(keys[start : start + 500])
+        placeholders = ", ".join("?" * len(chunk))
+        index.execute(
+            "DELETE FROM models_fts WHERE rowid IN "
+            f"(SELECT id FROM models WHERE key IN ({placeholders}))",
+            chunk,
+        )
+        index.execute(f"DELETE FROM models WHERE key IN ({placeholders})", chunk)
+
+
+def _insert(index: sqlite3.Connection, row: Dict[str, Any], signature: str) -> None:
+    cursor = index.execute(
+        "INSERT INTO models (key, signature, name, base, type, format, path, "
+        "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            row["key"],
+            signature,
+            row.get("name"),
+            row.get("base"),
+            row.get("type"),
+            row.get("format"),
+            row.get("path"),
+            _timestamp(row.get("created_at")),
+            _timestamp(row.get("updated_at")),
+        ),
+    )
+    text = searchable_text(row)
+    index.execute(
+        "INSERT INTO models_fts (rowid, name, description, trigger_words, extra) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (
+            cursor.lastrowid,
+            text["name"],
+            text["description"],
+            text["trigger_words"],
+            text["extra"],
+        ),
+    )
+
+
+def fts_query(text: str) -> Optional[str]:
+    """
+    Every word of ``text`` as a quoted prefix term, so user input can't be
+    FTS5 syntax and "ani sty" finds "anime style".
+    """
+    # The tokenizer splits on underscores too, "anime_xl" is two terms
+    words = re.findall(r"[^\W_]+", text)
+    return " ".join(f'"{word}"*' for word in words) or None
+
+
+def search_models(
+    index: sqlite3.Connection,
+    text: Optional[str] = None,
+    bases: Sequence[str] = (),
+    types: Sequence[str] = (),
+    formats: Sequence[str] = (),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    sort: Optional[str] = None,
+    descending: bool = False,
+    limit: int = 50,
+) -> List[Dict[str, Any]]:
+    """
+    Matching models as dictionaries of COLUMNS, filtered, ordered and limited
+    by SQLite.
+    """
+    match = fts_query(text) if text else None
+    sort = sort or ("relevance" if match else "name")
+    if sort == "relevance" and not match:
+        sort = "name"
+
+    clauses: List[str] = []
+    params: List[Any] = []
+    if match and sort == "relevance":
+        source = "models_fts JOIN models m ON m.id = models_fts.rowid"
+        clauses.append("models_fts MATCH ?")
+        params.append(match)
+    else:
+        # Sorted by a column, SQLite walks that column's index and probes the
+        # matches instead of sorting every match
+        source = "models m"
+        if match:
+            clauses.append(
+                "m.id IN (SELECT rowid FROM models_fts WHERE models_fts MATCH ?)"
+            )
+            params.append(match)
+
+    for column, values in (("base", bases), ("type", types), ("format", formats)):
+        if values:
+            clauses.append(f"m.{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    if since:
+        clauses.append("m.created_at >= ?")
+        params.append(since.strftime("%Y-%m-%d %H:%M:%S"))
+    if until:
+        clauses.append("m.created_at < ?")
+        params.append(until.strftime("%Y-%m-%d %H:%M:%S"))
+
+    order = ", ".join(
+        f"{term} DESC" if descending else term for term in SORTS[sort].split(", ")
+    )
+
+    sql = (
+        f"SELECT {', '.join('m.' + column for column in COLUMNS)} FROM {source}"
+        + (f" WHERE {' AND '.join(clauses)}" if clauses else "")
+        + f" ORDER BY {order} LIMIT ?"
+    )
+    with span("query"):
+        rows = index.execute(sql, params + [limit]).fetchall()
+    return [dict(zip(COLUMNS, row)) for row in rows]
@@ -0,0 +1,199 @@
+"""
+Sharded cache of the local models scan.
+
+Instead of one blob for the whole library, the scan result is kept per
+directory: what the listing found (subdirectories to walk, model records)
+together with a freshness fingerprint of the directory itself (modification
+time and inode). Adding, removing or renaming an entry changes its parent
+directory's fingerprint, so a later scan only stats each directory, reuses
+every entry whose fingerprint still matches and lists again just the ones
+that changed.
+
+Directory entries are grouped into shard files by their first two levels
+below the models folder (``loras/sdxl``, ``checkpoints/flux``, the root on
+its own), and only shards with a changed entry are written back. Reading
+assembles the merged view from all of them. Model records are written as
+plain rows (LocalModel.to_row), the folder they sit in is the entry's key.
+
+A file rewritten in place keeps its directory's fingerprint, ``update-cache``
+drops the shards and rescans everything.
+"""
+
+import os
+import json
+import time
+import hashlib
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+from .helpers import write_json
+from .records import LocalModel
+
+__all__ = ["ShardIndex", "directory_fingerprint"]
+
+SHARD_DEPTH = 2
+SHARD_VERSION = 4
+# Modification times are coarse, a directory changed this recently could
+# change again without its mtime moving, so it is never trusted as fresh
+RACY_SECONDS = 2
+
+
+def directory_fingerprint(
+    path: str, stat: Optional[os.stat_result] = None
+) -> Optional[List[int]]:
+    if stat is None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+    if time.time_ns() - stat.st_mtime_ns < RACY_SECONDS * 1_000_000_000:
+        return None
+    return [stat.st_mtime_ns, stat.st_ino]
+
+
+class ShardIndex:
+    def __init__(self, directory: str, models_dir: str):
+        self.directory = directory
+        self.models_dir = models_dir
+        # shard key -> directory path -> entry
+        self.shards: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.dirty: set = set()
+
+    @classmethod
+    def load(cls, cache_dir: str, models_dir: str) -> "ShardIndex":
+        """
+        The index of ``models_dir``, kept in its own folder under ``cache_dir``.
+        """
+        digest = hashlib.sha1(models_dir.encode("utf-8")).hexdigest()[:12]
+        index = cls(os.path.join(cache_dir, digest), models_dir)
+        try:
+            names = os.listdir(index.directory)
+        except OSError:
+            return index
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(index.directory, name), "r") as f:
+                    shard = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            if (
+                shard.get("version") == SHARD_VERSION
+                and shard.get("models_dir") == models_dir
+            ):
+                directories = shard["directories"]
+                for path, entry in directories.items():
+                    entry["models"] = [
+                        LocalModel.from_row(models_dir, path, row)
+                        for row in entry["models"]
+                    ]
+                index.shards[shard["key"]] = directories
+        return index
+
+    def shard_key(self, path: str) -> str:
+        relative = os.path.relpath(path, self.models_dir)
+        if relative == ".":
+            return "."
+        return "/".join(relative.split(os.path.sep)[:SHARD_DEPTH])
+
+    def fresh(
+        self, path: str, fingerprint: Optional[List[int]], rule: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        The cached entry for ``path`` if the directory didn't change since and
+        was reached with the same model type rule, else None.
+        """
+        if fingerprint is None:
+            return None
+        entry = self.shards.get(self.shard_key(path), {}).get(path)
+        if entry is None or entry["fingerprint"] != fingerprint:
+            return None
+        if entry["rule"] != rule:
+            return None
+        return entry
+
+    def store(
+        self,
+        path: str,
+        fingerprint: Optional[List[int]],
+        rule: Optional[str],
+        subdirs: Iterable[Tuple[str, Optional[str]]],
+        models: List[LocalModel],
+    ) -> None:
+        if fingerprint is None:
+            return
+        key = self.shard_key(path)
+        self.shards.setdefault(key, {})[path] = {
+            "fingerprint": fingerprint,
+            "rule": rule,
+            "subdirs": [list(subdir) for subdir in subdirs],
+            "models": models,
+        }
+        self.dirty.add(key)
+
+    def prune(self, visited: set) -> None:
+        """
+        Forget directories the last scan didn't reach (deleted or moved).
+        """
+        for key, directories in self.shards.items():
+            gone = [path for path in directories if path not in visited]
+            for path in gone:
+                del directories[path]
+            if gone:
+                self.dirty.add(key)
+
+    def clear(self) -> None:
+        self.dirty.update(self.shards)
+        self.shards = {key: {} for key in self.shards}
+
+    def models(self) -> List[LocalModel]:
+        """
+        Merged view of every shard, sorted by relative path like a scan.
+        """
+        merged = [
+            model
+            for directories in self.shards.values()
+            for entry in directories.values()
+            for model in entry["models"]
+        ]
+        merged.sort(key=lambda model: model["relative_path"])
+        return merged
+
+    def _shard_file(self, key: str) -> str:
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.directory, f"{name}.json")
+
+    def save(self) -> int:
+        """
+        Write the shards that changed. Returns how many were written.
+        """
+        if not self.dirty:
+            return 0
+        os.makedirs(self.directory, exist_ok=True)
+        written = 0
+        for key in sorted(self.dirty):
+            directories = self.shards.get(key)
+            path = self._shard_file(key)
+            if not directories:
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            # Rebuilt from the disk if lost, so not synced
+            write_json(
+                path,
+                {
+                    "version": SHARD_VERSION,
+                    "models_dir": self.models_dir,
+                    "key": key,
+                    "directories": {
+                        path: dict(
+                            entry, models=[model.to_row() for model in entry["models"]]
+                        )
+                        for path, entry in directories.items()
+                    },
+                },
+                sync=False,
+            )
+            written += 1
+        self.dirty.clear()
+        return written
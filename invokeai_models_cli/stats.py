@@ -0,0 +1,165 @@
+import os
+from typing import List, Dict, Any, Optional
+
+from .helpers import feedback_message, create_table, format_size
+from .functions import (
+    console,
+    get_database_models,
+    database_model_for,
+    database_paths,
+    local_index,
+    scan_local_models,
+    update_cache,
+)
+from .scanner import model_real_paths
+from .timings import span
+
+__all__ = ["library_stats"]
+
+GROUPINGS = ("type", "base", "format", "directory")
+
+
+def _bucket(totals: Dict[str, List[int]], key: Optional[str], size: int) -> None:
+    bucket = totals.setdefault(key or "unknown", [0, 0])
+    bucket[0] += 1
+    bucket[1] += size
+
+
+def aggregate_models(
+    local_models: List[Dict[str, Any]],
+    db_models: List[Dict[str, Any]],
+    depth: int = 2,
+) -> Dict[str, Any]:
+    """
+    Sum counts and bytes of the local models in a single pass.
+
+    Local models are joined to their database rows by real path, so bytes can
+    also be split by base and database format. Directories are cut at
+    ``depth`` levels below the models folder, and growth is bucketed by month,
+    using the database install date when the model is registered and the file
+    date otherwise. Every grouping maps a key to ``[count, bytes]``.
+    """
+    db_by_path = database_paths(db_models)
+    totals: Dict[str, Dict[str, List[int]]] = {
+        grouping: {} for grouping in GROUPINGS + ("month",)
+    }
+    referenced = [0, 0]
+    unreferenced = [0, 0]
+
+    for model in local_models:
+        size = model.get("size") or 0
+        db_model = database_model_for(model, db_by_path)
+        parts = model["relative_path"].split(os.path.sep)
+        added = (db_model or {}).get("created_at") or model.get("created") or ""
+
+        _bucket(totals["type"], model.get("model_type") or model.get("type"), size)
+        _bucket(totals["base"], db_model and db_model.get("base"), size)
+        _bucket(
+            totals["format"],
+            (db_model and db_model.get("format")) or model.get("format"),
+            size,
+        )
+        _bucket(
+            totals["directory"],
+            os.path.sep.join(parts[: min(depth, len(parts) - 1)]) or ".",
+            size,
+        )
+        _bucket(totals["month"], added[:7], size)
+
+        counter = referenced if db_model else unreferenced
+        counter[0] += 1
+        counter[1] += size
+
+    return {
+        "local": [len(local_models), referenced[1] + unreferenced[1]],
+        "database": len(db_models),
+        "unmatched": len(
+            db_by_path.keys()
+            - {path for model in local_models for path in model_real_paths(model)}
+        ),
+        "referenced": referenced,
+        "unreferenced": unreferenced,
+        **totals,
+    }
+
+
+def display_stats(stats: Dict[str, Any], top: int = 10) -> None:
+    overview_table = create_table(
+        "Library Overview", [("", "cyan"), ("Models", "white"), ("Size", "green")]
+    )
+    overview_table.add_row(
+        "Local models", str(stats["local"][0]), format_size(stats["local"][1])
+    )
+    overview_table.add_row(
+        "In the database",
+        str(stats["referenced"][0]),
+        format_size(stats["referenced"][1]),
+    )
+    overview_table.add_row(
+        "Not in the database",
+        str(stats["unreferenced"][0]),
+        format_size(stats["unreferenced"][1]),
+    )
+    overview_table.add_row("Database rows", str(stats["database"]), "")
+    overview_table.add_row("Rows without a local file", str(stats["unmatched"]), "")
+
+    total = stats["local"][1] or 1
+    tables = [overview_table]
+    for grouping in GROUPINGS:
+        rows = sorted(
+            stats[grouping].items(), key=lambda item: item[1][1], reverse=True
+        )
+        table = create_table(
+            f"By {grouping.title()}",
+            [
+                (grouping.title(), "cyan"),
+                ("Models", "white"),
+                ("Size", "green"),
+                ("Share", "magenta"),
+            ],
+        )
+        for key, (models, size) in rows[:top]:
+            table.add_row(key, str(models), format_size(size), f"{size / total:.1%}")
+        if len(rows) > top:
+            table.add_row(f"... {len(rows) - top} more", "", "", "")
+        tables.append(table)
+
+    growth_table = create_table(
+        "Growth by Month",
+        [
+            ("Month", "cyan"),
+            ("Added", "white"),
+            ("Size", "green"),
+            ("Library Size", "magenta"),
+        ],
+    )
+    running = 0
+    for month, (models, size) in sorted(stats["month"].items()):
+        running += size
+        growth_table.add_row(
+            month, str(models), format_size(size), format_size(running)
+        )
+    tables.append(growth_table)
+
+    with span("render"):
+        for table in tables:
+            console.print(table)
+
+
+def library_stats(depth: int = 2, top: int = 10, refresh: bool = False) -> None:
+    if refresh:
+        update_cache(display=False)
+
+    # Straight from the local index as last saved (--refresh rescans first),
+    # the folder is only scanned when the index was never built
+    with span("cache read"):
+        index = local_index()
+        local_models = index.models() if index.shards else None
+    if local_models is None:
+        local_models, _ = scan_local_models()
+    if not local_models:
+        feedback_message("No local models found.", "info")
+        return
+
+    stats = aggregate_models(local_models, get_database_models() or [], depth)
+    display_stats(stats, top)
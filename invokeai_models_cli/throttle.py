@@ -0,0 +1,250 @@
+"""
+Shared I/O budget for scans, fingerprints and hashing.
+
+Every directory listing, stat and read in the scanner and the hashers goes
+through operation() and charge(). Until configure() is called both are
+no-ops, so an unthrottled scan pays a single global check. Once configured,
+the scheduler enforces:
+
+- a bytes per second and an operations per second budget (token buckets
+  shared by every thread, so a hashing pool can't add up to more than the
+  budget);
+- a limit on operations in flight per device, so one slow disk doesn't get
+  every worker while the others sit idle;
+- a pause while InvokeAI's database was modified in the last few seconds,
+  i.e. while InvokeAI is generating, so loading a model never waits on us.
+"""
+
+import os
+import time
+import threading
+from typing import Dict, Optional, Sequence
+
+from . import timings
+
+__all__ = [
+    "configure",
+    "disable",
+    "is_enabled",
+    "operation",
+    "charge",
+    "TokenBucket",
+    "ActivityMonitor",
+    "IOScheduler",
+]
+
+# A database written to more recently than this means InvokeAI is busy
+QUIET_SECONDS = 5.0
+# How often a paused worker looks at the database again
+POLL_SECONDS = 0.5
+
+
+class TokenBucket:
+    """
+    ``rate`` tokens per second, up to one second's worth saved up.
+
+    take() never refuses: a request larger than what is available runs the
+    bucket into debt and sleeps until it is paid back, so big reads are
+    charged exactly and later callers queue behind them.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = float(rate)
+        self.tokens = self.rate
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, amount: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if delay:
+            with timings.span("io throttle"):
+                time.sleep(delay)
+        return delay
+
+
+class ActivityMonitor:
+    """
+    Watch the modification time of InvokeAI's database (and its WAL).
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[str],
+        quiet_seconds: float = QUIET_SECONDS,
+        poll_seconds: float = POLL_SECONDS,
+    ):
+        self.paths = list(paths)
+        self.quiet_seconds = quiet_seconds
+        self.poll_seconds = poll_seconds
+        self._checked = 0.0
+        self._active = False
+        self._lock = threading.Lock()
+
+    def _last_write(self) -> float:
+        latest = 0.0
+        for path in self.paths:
+            try:
+                latest = max(latest, os.stat(path).st_mtime)
+            except OSError:
+                continue
+        return latest
+
+    def is_active(self) -> bool:
+        # Workers share one answer per poll interval instead of stat'ing each time
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked >= self.poll_seconds:
+                self._checked = now
+                self._active = time.time() - self._last_write() < self.quiet_seconds
+            return self._active
+
+    def wait_until_idle(self) -> float:
+        if not self.is_active():
+            return 0.0
+        timings.count("io pauses")
+        start = time.monotonic()
+        with timings.span("io paused for invokeai"):
+            while self.is_active():
+                time.sleep(self.poll_seconds)
+        return time.monotonic() - start
+
+
+class _NullOperation:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_OPERATION = _NullOperation()
+
+
+class _Operation:
+    __slots__ = ("scheduler", "semaphore")
+
+    def __init__(self, scheduler: "IOScheduler", semaphore):
+        self.scheduler = scheduler
+        self.semaphore = semaphore
+
+    def __enter__(self):
+        self.scheduler.wait()
+        if self.semaphore is not None:
+            self.semaphore.acquire()
+        if self.scheduler.ops is not None:
+            self.scheduler.ops.take(1)
+        return self
+
+    def __exit__(self, *exc):
+        if self.semaphore is not None:
+            self.semaphore.release()
+        return False
+
+
+class IOScheduler:
+    def __init__(
+        self,
+        bytes_per_second: Optional[float] = None,
+        ops_per_second: Optional[float] = None,
+        per_device: Optional[int] = None,
+        monitor: Optional[ActivityMonitor] = None,
+    ):
+        self.bytes = TokenBucket(bytes_per_second) if bytes_per_second else None
+        self.ops = TokenBucket(ops_per_second) if ops_per_second else None
+        self.per_device = per_device
+        self.monitor = monitor
+        self._devices: Dict[str, int] = {}
+        self._semaphores: Dict[int, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def device(self, path: str) -> int:
+        # Keyed by parent folder, the files of one folder share a device
+        folder = os.path.dirname(path) or path
+        device = self._devices.get(folder)
+        if device is None:
+            try:
+                device = os.stat(folder).st_dev
+            except OSError:
+                device = -1
+            self._devices[folder] = device
+        return device
+
+    def semaphore(self, path: str) -> Optional[threading.Semaphore]:
+        if not self.per_device:
+            return None
+        device = self.device(path)
+        with self._lock:
+            semaphore = self._semaphores.get(device)
+            if semaphore is None:
+                semaphore = threading.Semaphore(self.per_device)
+                self._semaphores[device] = semaphore
+            return semaphore
+
+    def wait(self) -> None:
+        if self.monitor is not None:
+            self.monitor.wait_until_idle()
+
+    def operation(self, path: str) -> _Operation:
+        return _Operation(self, self.semaphore(path))
+
+    def charge(self, nbytes: int) -> None:
+        self.wait()
+        if self.bytes is not None and nbytes:
+            self.bytes.take(nbytes)
+
+
+_scheduler: Optional[IOScheduler] = None
+
+
+def configure(
+    bytes_per_second: Optional[float] = None,
+    ops_per_second: Optional[float] = None,
+    per_device: Optional[int] = None,
+    busy_paths: Sequence[str] = (),
+    quiet_seconds: float = QUIET_SECONDS,
+) -> IOScheduler:
+    """
+    Turn the scheduler on for the rest of the process.
+
+    ``busy_paths`` are the files whose recent modification pauses all I/O
+    (InvokeAI's database and WAL); leave it empty to never pause.
+    """
+    global _scheduler
+    monitor = ActivityMonitor(busy_paths, quiet_seconds) if busy_paths else None
+    _scheduler = IOScheduler(bytes_per_second, ops_per_second, per_device, monitor)
+    return _scheduler
+
+
+def disable() -> None:
+    global _scheduler
+    _scheduler = None
+
+
+def is_enabled() -> bool:
+    return _scheduler is not None
+
+
+def operation(path: str):
+    """
+    One I/O operation on ``path`` (a listing, a stat, a file being read):
+    ``with operation(path): ...``. Holds a slot on the path's device for the
+    duration. Free when the scheduler is off.
+    """
+    if _scheduler is None:
+        return _NULL_OPERATION
+    return _scheduler.operation(path)
+
+
+def charge(nbytes: int) -> None:
+    """
+    Account for ``nbytes`` read, sleeping if the byte budget is used up.
+    """
+    if _scheduler is not None:
+        _scheduler.charge(nbytes)
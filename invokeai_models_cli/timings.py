@@ -0,0 +1,178 @@
+"""
+Lightweight timing spans and counters for the --timings / --profile options.
+
+Nothing is recorded until enable() is called: span() hands back a shared
+no-op context manager and count() returns immediately, so instrumented code
+pays a single attribute check when timings are off.
+"""
+
+import json
+import time
+import threading
+import cProfile
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from rich.table import Table
+
+__all__ = [
+    "enable",
+    "is_enabled",
+    "span",
+    "count",
+    "summary",
+    "timings_table",
+    "write_trace",
+    "start_profile",
+    "stop_profile",
+]
+
+# Keep the trace bounded, per-file spans on a large library add up quickly
+MAX_TRACE_EVENTS = 20_000
+
+_enabled = False
+_lock = threading.Lock()
+_origin = time.perf_counter()
+_spans: Dict[str, List[float]] = {}
+_counters: Dict[str, int] = {}
+_events: List[Dict[str, Any]] = []
+_profiler: Optional[cProfile.Profile] = None
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        record_span(self.name, self.start, end)
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enable() -> None:
+    global _enabled, _origin
+    _enabled = True
+    _origin = time.perf_counter()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def span(name: str):
+    """
+    Time a phase: ``with span("scan"): ...``. Free when timings are disabled.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def record_span(name: str, start: float, end: float) -> None:
+    duration = end - start
+    with _lock:
+        totals = _spans.setdefault(name, [0, 0.0])
+        totals[0] += 1
+        totals[1] += duration
+        if len(_events) < MAX_TRACE_EVENTS:
+            _events.append(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": round((start - _origin) * 1_000_000, 3),
+                    "dur": round(duration * 1_000_000, 3),
+                    "pid": 1,
+                    "tid": threading.get_ident(),
+                }
+            )
+
+
+def count(name: str, amount: int = 1) -> None:
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def summary() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "spans": {
+                name: {"calls": int(calls), "seconds": total}
+                for name, (calls, total) in _spans.items()
+            },
+            "counters": dict(_counters),
+            "wall_seconds": time.perf_counter() - _origin,
+        }
+
+
+def timings_table() -> Table:
+    data = summary()
+    table = Table(title="Timings", title_justify="left")
+    table.add_column("Phase", style="cyan")
+    table.add_column("Calls", style="white", justify="right")
+    table.add_column("Seconds", style="yellow", justify="right")
+    table.add_column("Share", style="magenta", justify="right")
+
+    wall = data["wall_seconds"] or 1.0
+    for name, values in sorted(
+        data["spans"].items(), key=lambda item: item[1]["seconds"], reverse=True
+    ):
+        table.add_row(
+            name,
+            str(values["calls"]),
+            f"{values['seconds']:.4f}",
+            f"{values['seconds'] / wall:.1%}",
+        )
+    table.add_row("[bold]wall[/bold]", "", f"{data['wall_seconds']:.4f}", "")
+
+    for name, value in sorted(data["counters"].items()):
+        table.add_row(f"[green]{name}[/green]", f"{value:,}", "", "")
+    return table
+
+
+def write_trace(path: Path) -> None:
+    """
+    Write the spans as a Chrome trace (chrome://tracing, Perfetto) together
+    with the counters and the per-phase summary.
+    """
+    with _lock:
+        events = list(_events)
+    trace = {"traceEvents": events, **summary()}
+    with open(path, "w") as f:
+        json.dump(trace, f, indent=2)
+
+
+def start_profile() -> None:
+    global _profiler
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+
+
+def stop_profile(path: Path) -> None:
+    global _profiler
+    if _profiler is None:
+        return
+    _profiler.disable()
+    _profiler.dump_stats(str(path))
+    _profiler = None
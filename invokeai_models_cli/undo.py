@@ -0,0 +1,179 @@
+import sqlite3
+from typing import List, Dict, Any, Optional
+
+import inquirer
+
+from . import functions
+from .helpers import feedback_message, create_table
+from .functions import (
+    console,
+    journaled_writes,
+    report_write,
+    undo_journal_path,
+    manage_cache,
+    load_database_models,
+)
+from .journal import read_entries, find_entry, conflicting_rows, undo_writes
+from .writes import connect, select_rows
+
+__all__ = ["list_operations", "undo_operation"]
+
+
+class UndoConflict(Exception):
+    pass
+
+
+def _conflict_message(entry: Dict[str, Any], conflicts: List[str]) -> str:
+    return (
+        f"{len(conflicts)} row(s) changed again after {entry['id']}: "
+        f"{', '.join(conflicts[:10])}"
+    )
+
+
+def conflict_guard(entry: Dict[str, Any]):
+    """
+    Transaction guard that checks the rows again once they are locked, a
+    change made after the first check would otherwise be overwritten.
+    """
+
+    def guard(rows: List[Dict[str, Any]]) -> None:
+        conflicts = conflicting_rows(entry, rows)
+        if conflicts:
+            raise UndoConflict(_conflict_message(entry, conflicts))
+
+    return guard
+
+
+def list_operations(limit: int = 20) -> None:
+    entries = read_entries(undo_journal_path())
+    if not entries:
+        feedback_message("No recorded operations found.", "info")
+        return
+
+    operations_table = create_table(
+        "Recorded Operations",
+        [
+            ("Id", "cyan"),
+            ("Timestamp", "yellow dim"),
+            ("Command", "white"),
+            ("Rows", "white"),
+            ("Database", "dim"),
+            ("Status", "magenta"),
+        ],
+    )
+    for entry in reversed(entries[-limit:]):
+        keys = {row["key"] for row in entry["before"] + entry["after"]}
+        operations_table.add_row(
+            entry["id"],
+            entry["timestamp"],
+            entry["command"],
+            str(len(keys)),
+            entry["database"],
+            f"undone by {entry['undone_by']}" if entry.get("undone_by") else "",
+        )
+    console.print(operations_table)
+
+
+def _select_entry(entries, limit: int = 20):
+    choices = [
+        f"{entry['id']} ({entry['command']}, {entry['timestamp']})"
+        for entry in reversed(entries[-limit:])
+        if not entry.get("undone_by")
+    ]
+    if not choices:
+        return None
+    answers = inquirer.prompt(
+        [
+            inquirer.List(
+                "operation",
+                message="Select an operation to undo",
+                choices=choices + ["Cancel"],
+                default="Cancel",
+            )
+        ]
+    )
+    if not answers or answers["operation"] == "Cancel":
+        return None
+    return find_entry(entries, answers["operation"].split(" (")[0])
+
+
+def undo_operation(
+    entry_id: Optional[str] = None, force: bool = False, dry_run: bool = False
+) -> None:
+    entries = read_entries(undo_journal_path())
+    entry = find_entry(entries, entry_id) if entry_id else _select_entry(entries)
+
+    if entry is None:
+        feedback_message(
+            f"No recorded operation '{entry_id}'." if entry_id else "Undo cancelled.",
+            "error" if entry_id else "info",
+        )
+        return
+    if entry.get("undone_by"):
+        feedback_message(
+            f"Operation {entry['id']} was already undone by {entry['undone_by']}.",
+            "error",
+        )
+        return
+
+    keys = sorted({row["key"] for row in entry["before"] + entry["after"]})
+    connection = connect(entry["database"])
+    try:
+        current = select_rows(connection, keys, entry.get("columns"))
+    finally:
+        connection.close()
+
+    conflicts = conflicting_rows(entry, current)
+    if conflicts and not force:
+        feedback_message(
+            f"{_conflict_message(entry, conflicts)}. Use --force to overwrite them.",
+            "error",
+        )
+        return
+
+    restored = {row["key"] for row in entry["before"]}
+    removed = [key for key in keys if key not in restored]
+    if dry_run:
+        console.print(f"\n[bold]Dry Run: undoing {entry['id']} would:[/bold]")
+        for row in entry["before"]:
+            console.print(
+                f"[yellow]Restore model:[/yellow] {row.get('name', row['key'])}"
+            )
+        for key in removed:
+            console.print(f"[red]Remove model:[/red] {key}")
+        console.print("[bold green]No changes were made to the database.[/bold green]")
+        return
+
+    try:
+        stats, undo_id = journaled_writes(
+            f"undo {entry['id']}",
+            undo_writes(entry),
+            keys,
+            entry["database"],
+            undoes=entry["id"],
+            guard=None if force else conflict_guard(entry),
+            columns=entry.get("columns"),
+        )
+    except UndoConflict as e:
+        feedback_message(f"{str(e)}. Nothing was changed.", "error")
+        return
+    except sqlite3.Error as e:
+        feedback_message(
+            f"Error undoing {entry['id']}: {str(e)}. Changes rolled back.", "error"
+        )
+        return
+
+    feedback_message(
+        f"Undid {entry['command']} ({entry['id']}): restored {len(restored)} row(s)"
+        + (f", removed {len(removed)}." if removed else "."),
+        "success",
+    )
+    if entry["command"] == "delete-models":
+        feedback_message(
+            "Only the database rows were restored, deleted model files are not.",
+            "warning",
+        )
+    report_write(stats, undo_id)
+
+    if entry["database"] == functions.DATABASE_PATH:
+        manage_cache("database_models", load_database_models())
@@ -0,0 +1,106 @@
+import os
+from typing import List, Dict, Any, Optional
+
+from .helpers import feedback_message, create_table
+from .hashing import algorithm_from_hash, hash_models
+from .functions import console, load_database_models, resolve_model_path
+from .timings import span
+
+__all__ = ["verify_hashes"]
+
+
+def collect_verification_targets(
+    db_models: List[Dict[str, Any]], algorithm: Optional[str] = None
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Sort database models into the ones we can hash and the ones we can't.
+
+    Returns the models keyed by status: one list per hashing algorithm, plus
+    "missing" (path not on disk) and "skipped" (hash can't be reproduced).
+    """
+    targets: Dict[str, List[Dict[str, Any]]] = {"missing": [], "skipped": []}
+    for model in db_models:
+        path = resolve_model_path(model.get("path") or "")
+        model_algorithm = algorithm or algorithm_from_hash(model.get("hash"))
+        entry = {"model": model, "path": path}
+
+        if not path or not os.path.exists(path):
+            targets["missing"].append(entry)
+        elif model_algorithm is None:
+            targets["skipped"].append(entry)
+        else:
+            targets.setdefault(model_algorithm, []).append(entry)
+    return targets
+
+
+def verify_hashes(
+    algorithm: Optional[str] = None,
+    workers: Optional[int] = None,
+    only_problems: bool = False,
+) -> None:
+    db_models = load_database_models()
+    if not db_models:
+        feedback_message("No models found in the database.", "info")
+        return
+
+    targets = collect_verification_targets(db_models, algorithm)
+    rows = []
+    totals = {"match": 0, "mismatch": 0, "missing": 0, "skipped": 0}
+
+    for model_algorithm, entries in targets.items():
+        if model_algorithm in ("missing", "skipped"):
+            continue
+        with console.status(
+            f"[green]Hashing {len(entries)} model(s) with {model_algorithm}...[/green]"
+        ):
+            hashes = hash_models(
+                [entry["path"] for entry in entries], model_algorithm, workers
+            )
+        for entry in entries:
+            computed = hashes[entry["path"]]
+            status = "match" if computed == entry["model"].get("hash") else "mismatch"
+            totals[status] += 1
+            rows.append((entry, status, computed))
+
+    for status in ("missing", "skipped"):
+        for entry in targets[status]:
+            totals[status] += 1
+            rows.append((entry, status, "N/A"))
+
+    styles = {
+        "match": "green",
+        "mismatch": "red",
+        "missing": "yellow",
+        "skipped": "dim",
+    }
+    hashes_table = create_table(
+        "Model Hash Verification",
+        [
+            ("Name", "yellow"),
+            ("Path", "green"),
+            ("Database Hash", "white"),
+            ("Computed Hash", "white"),
+            ("Status", "white"),
+        ],
+    )
+    for entry, status, computed in sorted(
+        rows, key=lambda row: row[0]["model"]["name"]
+    ):
+        if only_problems and status == "match":
+            continue
+        hashes_table.add_row(
+            entry["model"]["name"],
+            entry["path"] or "N/A",
+            entry["model"].get("hash") or "N/A",
+            computed,
+            f"[{styles[status]}]{status}[/{styles[status]}]",
+        )
+
+    with span("render"):
+        console.print(hashes_table)
+
+    summary = ", ".join(f"{value} {status}" for status, value in totals.items())
+    feedback_message(
+        f"Hash verification finished: {summary}.",
+        "warning" if totals["mismatch"] else "success",
+    )
@@ -0,0 +1,185 @@
+"""
+Short write transactions against a database InvokeAI may be using.
+
+Every change is planned first with no lock held, then apply_writes takes the
+write lock with ``BEGIN IMMEDIATE``, runs the prepared statements with
+executemany and commits straight away. Nothing else (printing, deleting files,
+prompting) happens while the lock is held. A busy database is retried with
+exponential backoff, and the result reports how long the lock was waited for
+and held so the hold time can be checked against LOCK_HOLD_TARGET.
+"""
+
+import time
+import random
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from . import timings
+
+__all__ = ["WriteStats", "connect", "select_rows", "json_column", "apply_writes"]
+
+# How long SQLite itself waits on a lock before raising "database is locked"
+BUSY_TIMEOUT_MS = 2000
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 0.05
+LOCK_HOLD_TARGET = 0.05
+
+Write = Tuple[str, Sequence[Sequence[Any]]]
+
+# Where a models table keeps the model settings as JSON, newest schema first
+JSON_COLUMNS = ("config", "metadata_json")
+
+
+@dataclass
+class WriteStats:
+    attempts: int = 0
+    rows: int = 0
+    lock_wait: float = 0.0
+    lock_hold: float = 0.0
+    before: List[Dict[str, Any]] = field(default_factory=list)
+    after: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def over_target(self) -> bool:
+        return self.lock_hold > LOCK_HOLD_TARGET
+
+    def describe(self) -> str:
+        return (
+            f"write lock held {self.lock_hold * 1000:.1f} ms "
+            f"(waited {self.lock_wait * 1000:.1f} ms, "
+            f"{self.attempts} attempt{'s' if self.attempts != 1 else ''})"
+            + (
+                f", over the {LOCK_HOLD_TARGET * 1000:.0f} ms target"
+                if self.over_target
+                else ""
+            )
+        )
+
+
+def connect(database_path: str, busy_timeout_ms: int = BUSY_TIMEOUT_MS):
+    # Autocommit mode, transactions are opened explicitly by apply_writes
+    connection = sqlite3.connect(
+        database_path, timeout=busy_timeout_ms / 1000, isolation_level=None
+    )
+    connection.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+    return connection
+
+
+def select_rows(
+    connection, keys: Sequence[str], columns: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Model rows by key (all columns unless ``columns`` names some), as column
+    name to value dictionaries.
+    """
+    selected = (
+        ", ".join(["key"] + [c for c in columns if c != "key"]) if columns else "*"
+    )
+    rows = []
+    keys = list(keys)
+    # Stay well below SQLite's bound parameter limit
+    for start in range(0, len(keys), 500):
+        chunk = keys[start : start + 500]
+        cursor = connection.execute(
+            f"SELECT {selected} FROM models "
+            f"WHERE key IN ({', '.join('?' * len(chunk))})",
+            chunk,
+        )
+        columns = [column[0] for column in cursor.description]
+        rows.extend(dict(zip(columns, row)) for row in cursor.fetchall())
+    return rows
+
+
+def json_column(connection) -> Optional[str]:
+    """
+    The JSON settings column of the models table (``config`` or, in older
+    schemas, ``metadata_json``), None if it has neither.
+    """
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(models)")}
+    return next((column for column in JSON_COLUMNS if column in columns), None)
+
+
+def _is_busy(error: sqlite3.Error) -> bool:
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+def _record(name: str, start: float, end: float) -> None:
+    if timings.is_enabled():
+        timings.record_span(name, start, end)
+
+
+def apply_writes(
+    database_path: str,
+    writes: List[Write],
+    max_attempts: int = MAX_ATTEMPTS,
+    busy_timeout_ms: int = BUSY_TIMEOUT_MS,
+    capture: Union[Sequence[str], Callable[[Any], Sequence[str]]] = (),
+    guard: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    capture_columns: Optional[Sequence[str]] = None,
+) -> WriteStats:
+    """
+    Run ``writes`` (pairs of SQL and parameter rows) in one short transaction.
+
+    Either every statement is committed or none is. Busy errors roll back and
+    retry up to ``max_attempts`` times; anything else is raised after the
+    rollback. The model rows whose keys are in ``capture`` are read inside the
+    same transaction before and after the writes (``stats.before`` and
+    ``stats.after``), which is what the undo journal records; a callable
+    ``capture`` is given the connection and returns the keys, so set-based
+    statements can capture exactly the rows they match, and
+    ``capture_columns`` limits the capture to the columns being written.
+    ``guard`` is called with the captured rows before anything is written;
+    whatever it raises rolls the transaction back and is passed on.
+    """
+    stats = WriteStats()
+    writes = [(sql, params) for sql, params in writes if params]
+    if not writes:
+        return stats
+
+    connection = connect(database_path, busy_timeout_ms)
+    try:
+        for attempt in range(1, max_attempts + 1):
+            stats.attempts = attempt
+            waiting = time.perf_counter()
+            locked = None
+            try:
+                connection.execute("BEGIN IMMEDIATE")
+                locked = time.perf_counter()
+                stats.lock_wait += locked - waiting
+                _record("lock wait", waiting, locked)
+
+                keys = capture(connection) if callable(capture) else capture
+                before = select_rows(connection, keys, capture_columns) if keys else []
+                if guard is not None:
+                    guard(before)
+                rows = 0
+                for sql, params in writes:
+                    rows += connection.executemany(sql, params).rowcount
+                after = select_rows(connection, keys, capture_columns) if keys else []
+                connection.execute("COMMIT")
+                stats.before, stats.after = before, after
+                stats.rows = rows
+                return stats
+            except sqlite3.Error as e:
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+                if locked is None:
+                    stats.lock_wait += time.perf_counter() - waiting
+                if not _is_busy(e) or attempt == max_attempts:
+                    raise
+                timings.count("write retries")
+                time.sleep(BACKOFF_SECONDS * 2 ** (attempt - 1) * (1 + random.random()))
+            except Exception:
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+                raise
+            finally:
+                if locked is not None:
+                    released = time.perf_counter()
+                    stats.lock_hold += released - locked
+                    _record("lock hold", locked, released)
+    finally:
+        connection.close()
+    return stats
@@ -0,0 +1,111 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from invokeai_models_cli.changelog import diff_scans, append_changes, read_changes
+from invokeai_models_cli.helpers import parse_since
+
+
+def model(path, inode, size=100, updated="2024-01-01T00:00:00"):
+    return {
+        "file_path": f"/models/{path}",
+        "relative_path": path,
+        "model_type": "lora",
+        "size": size,
+        "updated": updated,
+        "device": 1,
+        "inode": inode,
+    }
+
+
+def summary(events):
+    return [(event["event"], event["relative_path"]) for event in events]
+
+
+def test_diff_keys_on_file_identity():
+    previous = [
+        model("loras/kept.safetensors", 1),
+        model("loras/renamed.safetensors", 2),
+        model("loras/grown.safetensors", 3),
+        model("loras/gone.safetensors", 4),
+        model("loras/replaced.safetensors", 5),
+    ]
+    current = [
+        model("loras/kept.safetensors", 1),
+        model("loras/sdxl/renamed-v2.safetensors", 2),
+        model("loras/grown.safetensors", 3, size=200, updated="2024-02-01T00:00:00"),
+        model("loras/replaced.safetensors", 6),
+        model("loras/new.safetensors", 7),
+    ]
+
+    events = diff_scans(previous, current)
+
+    assert summary(events) == [
+        ("removed", "loras/gone.safetensors"),
+        ("modified", "loras/grown.safetensors"),
+        ("added", "loras/new.safetensors"),
+        ("modified", "loras/replaced.safetensors"),
+        ("moved", "loras/sdxl/renamed-v2.safetensors"),
+    ]
+    moved = events[-1]
+    assert moved["old_path"] == "/models/loras/renamed.safetensors"
+    assert events[1]["old_size"] == 100
+
+
+def test_reused_inode_is_not_a_move():
+    previous = [model("loras/deleted.safetensors", 1)]
+    current = [model("loras/new.safetensors", 1, size=5, updated="2024-03-01")]
+
+    assert summary(diff_scans(previous, current)) == [
+        ("removed", "loras/deleted.safetensors"),
+        ("added", "loras/new.safetensors"),
+    ]
+
+
+def test_unchanged_scan_has_no_events():
+    scan = [model("loras/a.safetensors", 1), model("loras/b.safetensors", 2)]
+    assert diff_scans(scan, [dict(item) for item in scan]) == []
+
+
+def test_read_changes_since(tmp_path):
+    journal = str(tmp_path / "changes.jsonl")
+    append_changes(
+        journal,
+        diff_scans([], [model("loras/old.safetensors", 1)]),
+        time=datetime(2024, 1, 1),
+    )
+    append_changes(
+        journal,
+        diff_scans([model("loras/old.safetensors", 1)], []),
+        time=datetime(2024, 3, 1),
+    )
+    with open(journal, "a") as f:
+        f.write('{"time": "2024-03-')  # torn last line
+
+    assert len(read_changes(journal)) == 2
+    assert summary(read_changes(journal, datetime(2024, 2, 1))) == [
+        ("removed", "loras/old.safetensors")
+    ]
+    assert read_changes(str(tmp_path / "missing.jsonl")) == []
+
+
+def test_parse_since():
+    now = datetime(2024, 5, 10, 12, 0)
+    assert parse_since("2h", now) == datetime(2024, 5, 10, 10, 0)
+    assert parse_since("3d", now) == datetime(2024, 5, 7, 12, 0)
+    assert parse_since("2024-05-01") == datetime(2024, 5, 1)
+    with pytest.raises(ValueError):
+        parse_since("yesterday")
+
+
+def test_since_with_an_offset_is_local_time(tmp_path):
+    since = parse_since("2024-05-01T08:00Z")
+    assert since.tzinfo is None
+    assert since == datetime(2024, 5, 1, 8, tzinfo=timezone.utc).astimezone().replace(
+        tzinfo=None
+    )
+    assert parse_since("2024-05-01T10:00+02:00") == since
+
+    journal = str(tmp_path / "changes.jsonl")
+    append_changes(journal, [{"event": "added", "relative_path": "a"}])
+    assert len(read_changes(journal, since)) == 1
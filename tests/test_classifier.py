@@ -0,0 +1,60 @@
+import os
+from invokeai_models_cli import classifier
+from invokeai_models_cli.classifier import ModelTypeRule, register_model_type
+from invokeai_models_cli.scanner import walk_models
+
+
+def make_tree(models_dir):
+    for relative in [
+        "checkpoints/sd15/dreamshaper.ckpt",
+        "checkpoints/sdxl/juggernaut.safetensors",
+        "loras/style/paint.safetensors",
+        "loras/.cache/hidden.safetensors",
+        "loras/download.safetensors.part",
+        "embeddings/easynegative.pt",
+        "sdxl/main/sdxl-base/model_index.json",
+        "sdxl/main/sdxl-base/unet/diffusion_pytorch_model.safetensors",
+        "sdxl/main/sdxl-base/vae/diffusion_pytorch_model.safetensors",
+        "any/vae/sdxl-vae/config.json",
+        "any/vae/sdxl-vae/diffusion_pytorch_model.safetensors",
+        "controlnet/canny.pth",
+        "t5_encoder/t5xxl_q8.gguf",
+        "images/preview.safetensors",
+    ]:
+        path = models_dir / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"\0" * 8)
+
+
+def found(models_dir):
+    models, _ = walk_models(str(models_dir))
+    return {
+        (os.path.relpath(path, models_dir), rule.name, is_dir)
+        for path, rule, is_dir in models
+    }
+
+
+def test_walk_classifies_and_prunes(tmp_path):
+    make_tree(tmp_path)
+
+    assert found(tmp_path) == {
+        ("checkpoints/sd15/dreamshaper.ckpt", "main", False),
+        ("checkpoints/sdxl/juggernaut.safetensors", "main", False),
+        ("loras/style/paint.safetensors", "lora", False),
+        ("embeddings/easynegative.pt", "embedding", False),
+        ("sdxl/main/sdxl-base", "main", True),
+        ("any/vae/sdxl-vae", "vae", True),
+        ("controlnet/canny.pth", "controlnet", False),
+        ("t5_encoder/t5xxl_q8.gguf", "t5_encoder", False),
+    }
+
+
+def test_registered_rule_is_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(classifier, "_REGISTRY", dict(classifier._REGISTRY))
+    monkeypatch.setattr(
+        classifier, "_DIRECTORY_INDEX", dict(classifier._DIRECTORY_INDEX)
+    )
+    make_tree(tmp_path)
+    register_model_type(ModelTypeRule("preview", ("images",), (".safetensors",)))
+
+    assert ("images/preview.safetensors", "preview", False) in found(tmp_path)
@@ -0,0 +1,84 @@
+import sqlite3
+
+from invokeai_models_cli import covers, functions
+from invokeai_models_cli.covers import find_cover_orphans, present_covers
+
+
+def make_install(tmp_path):
+    images = tmp_path / "model_images"
+    images.mkdir()
+    for name in ["a.webp", "b.webp", "gone-model.webp", "custom.png", "notes.txt"]:
+        (images / name).write_bytes(b"image")
+
+    database = tmp_path / "invokeai.db"
+    connection = sqlite3.connect(database)
+    connection.execute(
+        "CREATE TABLE models (key TEXT PRIMARY KEY, name TEXT, cover_image TEXT)"
+    )
+    connection.executemany(
+        "INSERT INTO models VALUES (?, ?, ?)",
+        [
+            # served by the API from "<key>.webp"
+            ("a", "alpha", "http://localhost:9090/api/v2/models/i/a/image"),
+            # found by key, the row doesn't say
+            ("b", "beta", None),
+            ("c", "gamma", "custom.png"),
+            ("d", "delta", "model_images/d.webp"),
+            ("e", "epsilon", "/api/v2/models/i/e/image"),
+        ],
+    )
+    connection.commit()
+    connection.close()
+    return images, database
+
+
+def test_orphans_in_both_directions(tmp_path):
+    images, database = make_install(tmp_path)
+    present = present_covers(str(images))
+    assert len(present) == 4
+
+    orphans, stale = find_cover_orphans(
+        covers.cover_rows(str(database)), present, str(images), str(tmp_path)
+    )
+
+    assert orphans == [str(images / "gone-model.webp")]
+    assert [(ref["key"], ref["path"]) for ref in stale] == [
+        ("d", str(images / "d.webp")),
+        ("e", str(images / "e.webp")),
+    ]
+
+
+def test_clean_removes_orphans_and_clears_references(tmp_path, monkeypatch):
+    images, database = make_install(tmp_path)
+    monkeypatch.setattr(functions, "INVOKE_AI_DIR", str(tmp_path))
+    monkeypatch.setattr(functions, "DATABASE_PATH", str(database))
+    monkeypatch.setattr(functions, "SNAPSHOTS_DIR", str(tmp_path))
+    monkeypatch.setattr(covers.inquirer, "confirm", lambda *args, **kwargs: True)
+
+    covers.cover_images(clean=True)
+
+    assert sorted(path.name for path in images.iterdir()) == [
+        "a.webp",
+        "b.webp",
+        "custom.png",
+        "notes.txt",
+    ]
+    connection = sqlite3.connect(database)
+    assert connection.execute(
+        "SELECT key, cover_image FROM models WHERE key IN ('d', 'e')"
+    ).fetchall() == [("d", None), ("e", None)]
+    connection.close()
+    assert (tmp_path / "undo-journal.jsonl").exists()
+
+
+def test_remove_files_reports_failures(tmp_path):
+    paths = [tmp_path / f"{i}.webp" for i in range(600)]
+    for path in paths:
+        path.write_bytes(b"")
+    paths.append(tmp_path / "folder.webp")
+    paths[-1].mkdir()
+
+    failures = covers.remove_files([str(path) for path in paths])
+
+    assert [path for path, _error in failures] == [str(tmp_path / "folder.webp")]
+    assert list(tmp_path.iterdir()) == [tmp_path / "folder.webp"]
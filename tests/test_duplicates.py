@@ -0,0 +1,99 @@
+import os
+
+from invokeai_models_cli import duplicates
+from invokeai_models_cli.fingerprint import refresh_index
+from invokeai_models_cli.duplicates import (
+    group_by_size,
+    find_duplicate_groups,
+    hardlink_duplicates,
+)
+
+
+def local_model(path):
+    stat = path.stat()
+    return {
+        "name": path.stem,
+        "file_path": str(path),
+        "size": stat.st_size,
+        "updated": str(stat.st_mtime_ns),
+    }
+
+
+def test_duplicates_are_narrowed_by_size_fingerprint_and_hash(tmp_path):
+    first = tmp_path / "a.safetensors"
+    first.write_bytes(b"weights" * 1000)
+    copy = tmp_path / "b.safetensors"
+    copy.write_bytes(b"weights" * 1000)
+    same_size = tmp_path / "c.safetensors"
+    same_size.write_bytes(b"another" * 1000)
+    unique = tmp_path / "d.safetensors"
+    unique.write_bytes(b"unique")
+    models = [local_model(p) for p in (first, copy, same_size, unique)]
+
+    assert set(group_by_size(models)[7000]) == {str(first), str(copy), str(same_size)}
+
+    index = refresh_index({}, models, select=lambda m: m["size"] == 7000)
+    assert str(unique) not in index["files"]
+
+    groups, stages = find_duplicate_groups(models, index, referenced={str(copy)})
+    assert stages == {
+        "files": 4,
+        "same size": 3,
+        "same fingerprint": 2,
+        "duplicates": 2,
+    }
+    assert groups[0]["paths"] == [str(copy), str(first)]
+    assert groups[0]["referenced"] == [str(copy)]
+    assert groups[0]["reclaimable"] == 7000
+
+
+def test_hardlink_keeps_referenced_copy_and_frees_space(tmp_path):
+    first = tmp_path / "a.safetensors"
+    first.write_bytes(b"weights" * 1000)
+    copy = tmp_path / "b.safetensors"
+    copy.write_bytes(b"weights" * 1000)
+    models = [local_model(first), local_model(copy)]
+    index = refresh_index({}, models)
+    groups, _ = find_duplicate_groups(models, index)
+
+    linked, freed, failures = hardlink_duplicates(groups)
+    assert (linked, freed, failures) == (1, 7000, [])
+    assert os.path.samefile(first, copy)
+    assert sorted(os.listdir(tmp_path)) == ["a.safetensors", "b.safetensors"]
+
+    groups, _ = find_duplicate_groups(models, index)
+    assert groups[0]["reclaimable"] == 0
+
+
+def test_copy_with_other_hard_links_frees_nothing(tmp_path):
+    first = tmp_path / "a.safetensors"
+    first.write_bytes(b"weights" * 1000)
+    copy = tmp_path / "b.safetensors"
+    copy.write_bytes(b"weights" * 1000)
+    os.link(copy, tmp_path / "backup.safetensors")
+    models = [local_model(first), local_model(copy)]
+    groups, _ = find_duplicate_groups(models, refresh_index({}, models))
+
+    assert hardlink_duplicates(groups) == (1, 0, [])
+    assert os.path.samefile(first, copy)
+
+
+def test_unreadable_candidate_is_left_out(tmp_path, monkeypatch):
+    paths = []
+    for name in ("a", "b", "c"):
+        paths.append(tmp_path / f"{name}.safetensors")
+        paths[-1].write_bytes(b"weights" * 1000)
+    models = [local_model(path) for path in paths]
+    index = refresh_index({}, models)
+    model_hash = duplicates.model_hash
+
+    def failing(path, *args, **kwargs):
+        if path == str(paths[2]):
+            raise PermissionError(13, "Permission denied", path)
+        return model_hash(path, *args, **kwargs)
+
+    monkeypatch.setattr(duplicates, "model_hash", failing)
+    groups, _ = find_duplicate_groups(models, index)
+
+    assert [group["paths"] for group in groups] == [[str(paths[0]), str(paths[1])]]
+    assert "hash" not in index["files"][str(paths[2])]
@@ -0,0 +1,51 @@
+import hashlib
+from blake3 import blake3
+from invokeai_models_cli.hashing import algorithm_from_hash, hash_models, model_hash
+
+
+def make_diffusers(tmp_path):
+    model_dir = tmp_path / "sdxl-base"
+    files = {
+        "unet/diffusion_pytorch_model.safetensors": b"unet" * 1000,
+        "vae/diffusion_pytorch_model.safetensors": b"vae" * 1000,
+        "text_encoder/model.safetensors": b"text" * 1000,
+        "model_index.json": b"{}",
+        "scheduler/scheduler_config.json": b"{}",
+    }
+    for relative, content in files.items():
+        path = model_dir / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    return model_dir
+
+
+def test_single_file_hash_matches_invokeai_format(tmp_path):
+    model_file = tmp_path / "lora.safetensors"
+    model_file.write_bytes(b"weights" * 100)
+
+    assert model_hash(model_file) == "blake3:" + blake3(b"weights" * 100).hexdigest()
+    assert (
+        model_hash(model_file, "sha256")
+        == "sha256:" + hashlib.sha256(b"weights" * 100).hexdigest()
+    )
+
+
+def test_directory_hash_merges_sorted_components(tmp_path):
+    model_dir = make_diffusers(tmp_path)
+    components = sorted(
+        path for path in model_dir.rglob("*") if path.suffix == ".safetensors"
+    )
+    composite = blake3()
+    for component in components:
+        composite.update(blake3(component.read_bytes()).hexdigest().encode("utf-8"))
+
+    expected = "blake3:" + composite.hexdigest()
+    assert model_hash(model_dir) == expected
+    assert hash_models([model_dir], max_workers=1)[str(model_dir)] == expected
+
+
+def test_algorithm_from_hash():
+    assert algorithm_from_hash("blake3:abc") == "blake3_single"
+    assert algorithm_from_hash("sha256:abc") == "sha256"
+    assert algorithm_from_hash("random:abc") is None
+    assert algorithm_from_hash("abc") is None
@@ -0,0 +1,101 @@
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from invokeai_models_cli import functions, helpers
+from invokeai_models_cli.changelog import read_changes
+from invokeai_models_cli.helpers import write_atomic, write_json, read_json
+
+
+def test_write_json_replaces_the_file(tmp_path):
+    target = tmp_path / "cache.json"
+    write_json(target, {"data": [1]})
+    write_json(target, {"data": [2]}, sync=False)
+
+    assert read_json(target) == {"data": [2]}
+    assert os.listdir(tmp_path) == ["cache.json"]
+
+
+def test_failed_write_keeps_the_old_file(tmp_path, monkeypatch):
+    target = tmp_path / "cache.json"
+    write_json(target, {"data": "old"})
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(helpers.os, "replace", fail)
+    with pytest.raises(OSError):
+        write_atomic(target, "{}")
+
+    assert read_json(target) == {"data": "old"}
+    assert os.listdir(tmp_path) == ["cache.json"]
+
+
+def _add_snapshots(snapshots_json, worker):
+    functions.SNAPSHOTS_JSON = snapshots_json
+    for i in range(10):
+        functions.update_snapshots(
+            lambda snapshots: snapshots + [{"name": f"{worker}-{i}"}]
+        )
+
+
+def _read_snapshots(snapshots_json, done, torn):
+    while not done.is_set():
+        with open(snapshots_json) as f:
+            try:
+                json.load(f)
+            except json.JSONDecodeError:
+                torn.value += 1
+
+
+@pytest.mark.skipif(helpers.fcntl is None, reason="no fcntl locks")
+def test_concurrent_writers_keep_every_entry(tmp_path):
+    snapshots_json = str(tmp_path / "snapshots.json")
+    write_json(snapshots_json, [])
+    context = multiprocessing.get_context("fork")
+    done, torn = context.Event(), context.Value("i", 0)
+
+    reader = context.Process(target=_read_snapshots, args=(snapshots_json, done, torn))
+    reader.start()
+    writers = [
+        context.Process(target=_add_snapshots, args=(snapshots_json, worker))
+        for worker in range(4)
+    ]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    done.set()
+    reader.join()
+
+    assert len(read_json(snapshots_json)) == 40
+    assert torn.value == 0
+
+
+@pytest.mark.skipif(helpers.fcntl is None, reason="no fcntl locks")
+def test_concurrent_scans_journal_each_change_once(tmp_path, monkeypatch):
+    models_dir = tmp_path / "models"
+    (models_dir / "loras").mkdir(parents=True)
+    (models_dir / "loras" / "one.safetensors").write_bytes(b"\0" * 16)
+    # Only settled directories are kept in the index
+    for path in (models_dir / "loras", models_dir):
+        os.utime(path, (1_600_000_000, 1_600_000_000))
+    monkeypatch.setattr(functions, "SNAPSHOTS_DIR", str(tmp_path))
+    monkeypatch.setattr(functions, "MODELS_DIR", str(models_dir))
+    functions.scan_local_models()
+
+    (models_dir / "loras" / "two.safetensors").write_bytes(b"\0" * 16)
+    os.utime(models_dir / "loras", (1_600_000_060, 1_600_000_060))
+    context = multiprocessing.get_context("fork")
+    scans = [context.Process(target=functions.scan_local_models) for _ in range(4)]
+    for scan in scans:
+        scan.start()
+    for scan in scans:
+        scan.join()
+
+    events = read_changes(functions.change_journal_path())
+    assert [(event["event"], event["relative_path"]) for event in events] == [
+        ("added", os.path.join("loras", "two.safetensors"))
+    ]
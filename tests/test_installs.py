@@ -0,0 +1,47 @@
+from invokeai_models_cli import installs
+
+
+def test_references_resolve_paths_per_install():
+    local_models = [
+        {"file_path": "/store/loras/a.safetensors"},
+        {"file_path": "/store/loras/b.safetensors"},
+        {"file_path": "/store/loras/c.safetensors"},
+    ]
+    registered = {
+        "studio": {"invoke_ai_dir": "/store/..", "database_path": "studio.db"},
+        "laptop": {"invoke_ai_dir": "/other", "database_path": "laptop.db"},
+    }
+    db_models = {
+        "studio": [
+            {"path": "/store/loras/a.safetensors"},
+            {"path": "/store/loras/a.safetensors"},
+        ],
+        "laptop": [
+            {"path": "/store/loras/a.safetensors"},
+            {"path": "/store/loras/b.safetensors"},
+            {"path": "loras/c.safetensors"},
+        ],
+    }
+
+    references = installs.install_references(local_models, registered, db_models)
+
+    assert references == {
+        "/store/loras/a.safetensors": ["studio", "laptop"],
+        "/store/loras/b.safetensors": ["laptop"],
+        "/store/loras/c.safetensors": [],
+    }
+
+
+def test_unreadable_database_is_left_out(monkeypatch):
+    def load(database_path):
+        if database_path == "broken.db":
+            raise OSError("unable to open database file")
+        return [{"name": database_path}]
+
+    monkeypatch.setattr(installs, "load_database_models", load)
+    registered = {
+        "ok": {"invoke_ai_dir": "/a", "database_path": "ok.db"},
+        "broken": {"invoke_ai_dir": "/b", "database_path": "broken.db"},
+    }
+
+    assert installs.load_install_databases(registered) == {"ok": [{"name": "ok.db"}]}
@@ -0,0 +1,103 @@
+import os
+
+from invokeai_models_cli import functions
+from invokeai_models_cli.helpers import read_json, write_json
+from invokeai_models_cli.hashing import hash_models
+from invokeai_models_cli.pipeline import load_models_concurrently
+from invokeai_models_cli.jobs import (
+    build_job,
+    job_progress,
+    pending_files,
+    record_results,
+    revalidate,
+    run_job,
+)
+
+
+def make_models(tmp_path):
+    small = tmp_path / "small.safetensors"
+    small.write_bytes(os.urandom(10))
+    large = tmp_path / "large.safetensors"
+    large.write_bytes(os.urandom(50_000))
+    diffusers = tmp_path / "diffusers"
+    (diffusers / "unet").mkdir(parents=True)
+    (diffusers / "unet" / "model.safetensors").write_bytes(os.urandom(2_000))
+    (diffusers / "vae.bin").write_bytes(os.urandom(1_000))
+    return [{"file_path": str(path)} for path in (large, small, diffusers)]
+
+
+def test_job_hashes_match_hash_models_smallest_first(tmp_path):
+    models = make_models(tmp_path)
+    job = build_job(models, "blake3_single")
+    assert os.path.basename(pending_files(job)[0]) == "small.safetensors"
+    assert job_progress(job)["files"] == 4
+
+    checkpoints = []
+    assert run_job(job, workers=2, checkpoint=checkpoints.append)
+
+    expected = hash_models([model["file_path"] for model in models])
+    assert job["results"] == expected
+    assert checkpoints and job_progress(job)["bytes_remaining"] == 0
+
+
+def test_resumed_job_only_rehashes_changed_files(tmp_path):
+    models = make_models(tmp_path)
+    job = build_job(models, "sha256")
+    run_job(job, workers=2)
+
+    changed = models[1]["file_path"]
+    with open(changed, "ab") as f:
+        f.write(b"more")
+    os.utime(changed, ns=(1, 1))
+
+    assert revalidate(job) == 1
+    assert pending_files(job) == [changed]
+    assert changed not in job["results"]
+
+    run_job(job, workers=2)
+    assert job["results"][changed] == hash_models([changed], "sha256")[changed]
+
+
+def test_stored_hashes_survive_an_older_index_being_saved(tmp_path, monkeypatch):
+    monkeypatch.setattr(functions, "SNAPSHOTS_DIR", str(tmp_path))
+    entry = {"size": 10, "updated": "2024-01-01", "fingerprint": "10:ab"}
+    write_json(
+        functions.fingerprints_path(),
+        {"sample_size": 1, "files": {"/models/a": dict(entry)}, "known": {}},
+    )
+    # Read by a long command (duplicates, locate) before the hash job ends
+    older = read_json(functions.fingerprints_path())
+    older["known"]["key"] = "10:ab"
+
+    job = {"results": {"/models/a": "blake3:1"}, "models": {"/models/a": entry}}
+    assert record_results(job) == 1
+    functions.save_fingerprint_index(older)
+
+    index = read_json(functions.fingerprints_path())
+    assert index["files"]["/models/a"]["hash"] == "blake3:1"
+    assert index["known"] == {"key": "10:ab"}
+
+
+def test_hash_of_a_file_changed_before_resuming_is_stored(tmp_path, monkeypatch):
+    monkeypatch.setattr(functions, "SNAPSHOTS_DIR", str(tmp_path))
+    models_dir = tmp_path / "models"
+    (models_dir / "loras").mkdir(parents=True)
+    path = models_dir / "loras" / "a.safetensors"
+    path.write_bytes(os.urandom(100))
+    local_models, _ = load_models_concurrently(str(models_dir), list)
+    job = build_job(local_models, "sha256")
+    run_job(job, workers=1)
+
+    path.write_bytes(os.urandom(200))
+    os.utime(path, ns=(2_000_000_000_000_000_000, 2_000_000_000_000_000_000))
+    assert revalidate(job) == 1
+    run_job(job, workers=1)
+
+    # The index as the next scan sees the changed file
+    (current,) = load_models_concurrently(str(models_dir), list)[0]
+    entry = {"size": current["size"], "updated": current["updated"]}
+    write_json(functions.fingerprints_path(), {"files": {str(path): entry}})
+    assert record_results(job) == 1
+    assert read_json(functions.fingerprints_path())["files"][str(path)]["hash"] == (
+        hash_models([str(path)], "sha256")[str(path)]
+    )
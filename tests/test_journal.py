@@ -0,0 +1,121 @@
+import sqlite3
+
+from invokeai_models_cli import functions, undo
+from invokeai_models_cli.journal import (
+    append_entry,
+    read_entries,
+    find_entry,
+    new_entry,
+    conflicting_rows,
+    undo_writes,
+)
+from invokeai_models_cli.writes import apply_writes, connect, select_rows
+
+
+def make_database(path):
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE models (key TEXT PRIMARY KEY, name TEXT, path TEXT)"
+    )
+    connection.executemany(
+        "INSERT INTO models VALUES (?, ?, ?)",
+        [("a", "alpha", "/old/a"), ("b", "beta", "/old/b"), ("c", "gamma", "/c")],
+    )
+    connection.commit()
+    connection.close()
+
+
+def all_rows(path):
+    connection = connect(str(path))
+    try:
+        return select_rows(connection, ["a", "b", "c"])
+    finally:
+        connection.close()
+
+
+def test_sync_is_undone_from_the_journal(tmp_path):
+    database = tmp_path / "invokeai.db"
+    journal = tmp_path / "undo-journal.jsonl"
+    make_database(database)
+    original = all_rows(database)
+
+    stats = apply_writes(
+        str(database),
+        [
+            ("UPDATE models SET path = ? WHERE key = ?", [("/new/a", "a")]),
+            ("DELETE FROM models WHERE key = ?", [("b",)]),
+        ],
+        capture=["a", "b"],
+    )
+    assert [row["key"] for row in stats.before] == ["a", "b"]
+    assert stats.after == [{"key": "a", "name": "alpha", "path": "/new/a"}]
+
+    append_entry(
+        str(journal),
+        new_entry("sync-models", str(database), stats.before, stats.after, "op1"),
+    )
+    entry = find_entry(read_entries(str(journal)))
+    assert entry["id"] == "op1"
+    assert conflicting_rows(entry, all_rows(database)[:1]) == []
+
+    undo = apply_writes(str(database), undo_writes(entry), capture=["a", "b"])
+    append_entry(
+        str(journal),
+        new_entry("undo op1", str(database), undo.before, undo.after, "op2", "op1"),
+    )
+
+    assert all_rows(database) == original
+    entries = read_entries(str(journal))
+    assert entries[0]["undone_by"] == "op2"
+    assert find_entry(entries)["id"] == "op2"
+
+
+def test_rows_changed_after_the_operation_conflict():
+    entry = {
+        "before": [{"key": "a", "path": "/old/a"}],
+        "after": [{"key": "a", "path": "/new/a"}],
+    }
+    assert conflicting_rows(entry, [{"key": "a", "path": "/elsewhere/a"}]) == ["a"]
+    assert conflicting_rows(entry, []) == ["a"]
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    journal = tmp_path / "undo-journal.jsonl"
+    append_entry(str(journal), {"id": "op1", "before": [], "after": []})
+    with open(journal, "a") as f:
+        f.write('{"id": "op2", "bef')
+
+    assert [entry["id"] for entry in read_entries(str(journal))] == ["op1"]
+
+
+def test_undo_refuses_a_row_changed_after_the_check(tmp_path, monkeypatch):
+    database = tmp_path / "invokeai.db"
+    journal = tmp_path / "undo-journal.jsonl"
+    make_database(database)
+    monkeypatch.setattr(functions, "SNAPSHOTS_DIR", str(tmp_path))
+    stats = apply_writes(
+        str(database),
+        [("UPDATE models SET path = ? WHERE key = ?", [("/new/a", "a")])],
+        capture=["a"],
+    )
+    append_entry(
+        str(journal),
+        new_entry("sync-models", str(database), stats.before, stats.after, "op1"),
+    )
+
+    checked = undo.select_rows
+
+    def check_then_change(connection, keys, columns=None):
+        rows = checked(connection, keys, columns)
+        # InvokeAI moves the model between the check and the transaction
+        other = sqlite3.connect(database)
+        other.execute("UPDATE models SET path = '/moved/a' WHERE key = 'a'")
+        other.commit()
+        other.close()
+        return rows
+
+    monkeypatch.setattr(undo, "select_rows", check_then_change)
+    undo.undo_operation("op1")
+
+    assert all_rows(database)[0]["path"] == "/moved/a"
+    assert not read_entries(str(journal))[0].get("undone_by")
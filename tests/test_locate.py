@@ -0,0 +1,62 @@
+from invokeai_models_cli.fingerprint import refresh_index, learn_database_models
+from invokeai_models_cli.hashing import model_hash
+from invokeai_models_cli.locate import find_relocation_candidates, confirm_candidates
+
+
+def local_model(path):
+    stat = path.stat()
+    return {
+        "name": path.stem,
+        "file_path": str(path),
+        "size": stat.st_size,
+        "updated": str(stat.st_mtime_ns),
+    }
+
+
+def test_renamed_model_is_found_by_fingerprint(tmp_path):
+    original = tmp_path / "loras" / "detail_tweaker.safetensors"
+    original.parent.mkdir()
+    original.write_bytes(b"lora weights" * 1000)
+    other = tmp_path / "loras" / "other.safetensors"
+    other.write_bytes(b"something else" * 1000)
+
+    db_model = {
+        "key": "abc",
+        "name": "detail_tweaker",
+        "path": str(original),
+        "hash": model_hash(original),
+    }
+    index = refresh_index({}, [local_model(original), local_model(other)])
+    assert learn_database_models(index, [db_model]) == 1
+
+    renamed = tmp_path / "loras" / "add_detail_v2.safetensors"
+    original.rename(renamed)
+    index = refresh_index(index, [local_model(renamed), local_model(other)])
+
+    matches = find_relocation_candidates([db_model], [db_model], index)
+    assert matches[0]["method"] == "fingerprint"
+    assert matches[0]["candidates"] == [str(renamed)]
+
+    confirm_candidates(matches, index)
+    assert matches[0]["status"] == "confirmed"
+    assert matches[0]["confirmed"] == str(renamed)
+    assert index["files"][str(renamed)]["hash"] == db_model["hash"]
+
+
+def test_unknown_model_falls_back_to_name_and_fails_verification(tmp_path):
+    candidate = tmp_path / "model.safetensors"
+    candidate.write_bytes(b"different" * 100)
+    db_model = {
+        "key": "k",
+        "name": "model",
+        "path": "/gone/model.safetensors",
+        "hash": "blake3:" + "0" * 64,
+    }
+    index = refresh_index({}, [local_model(candidate)])
+
+    matches = find_relocation_candidates([db_model], [db_model], index)
+    assert matches[0]["method"] == "name"
+
+    confirm_candidates(matches, index)
+    assert matches[0]["confirmed"] is None
+    assert matches[0]["status"] == "hash mismatch"
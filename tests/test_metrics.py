@@ -0,0 +1,96 @@
+import json
+import os
+
+from invokeai_models_cli import functions
+from invokeai_models_cli.metrics import collect_metrics
+from invokeai_models_cli.prometheus import Gauge, render_metrics, write_textfile
+
+
+def test_render_metrics():
+    text = render_metrics(
+        [
+            Gauge("invokeai_models_local_models", "Model files")
+            .set(3, type="lora")
+            .set(1, type='odd "type"\n'),
+            Gauge("invokeai_models-duration", "Seconds").set(0.25),
+            Gauge("invokeai_models_empty", "Left out without samples"),
+        ]
+    )
+    assert text == (
+        "# HELP invokeai_models_local_models Model files\n"
+        "# TYPE invokeai_models_local_models gauge\n"
+        'invokeai_models_local_models{type="lora"} 3\n'
+        'invokeai_models_local_models{type="odd \\"type\\"\\n"} 1\n'
+        "# HELP invokeai_models_duration Seconds\n"
+        "# TYPE invokeai_models_duration gauge\n"
+        "invokeai_models_duration 0.25\n"
+    )
+
+
+def test_write_textfile_replaces_the_file(tmp_path):
+    target = tmp_path / "invokeai.prom"
+    target.write_text("old\n")
+
+    write_textfile(str(target), "new\n")
+
+    assert target.read_text() == "new\n"
+    assert os.listdir(tmp_path) == ["invokeai.prom"]
+    assert oct(target.stat().st_mode & 0o777) == "0o644"
+
+
+def test_collect_metrics_from_cached_data(tmp_path, monkeypatch):
+    monkeypatch.setattr(functions, "SNAPSHOTS_DIR", str(tmp_path))
+    monkeypatch.setattr(functions, "SNAPSHOTS_JSON", str(tmp_path / "snapshots.json"))
+    monkeypatch.setattr(functions, "INVOKE_AI_DIR", str(tmp_path))
+    (tmp_path / "a.db").write_bytes(b"\0" * 100)
+    (tmp_path / "snapshots.json").write_text(json.dumps([{"name": "a.db"}]))
+    functions.record_run("scan", 1.5)
+
+    local_models = [
+        {
+            "file_path": str(tmp_path / "loras" / name),
+            "name": name.split(".")[0],
+            "relative_path": f"loras/{name}",
+            "model_type": "lora",
+            "size": size,
+        }
+        for name, size in [("a.safetensors", 10), ("b.safetensors", 20)]
+    ]
+    added = {"source_type": "path", "format": "lora"}
+    db_models = [
+        {
+            "name": "a",
+            "path": str(tmp_path / "loras" / "a.safetensors"),
+            "type": "lora",
+            "metadata": added,
+        },
+        {
+            "name": "gone",
+            "path": str(tmp_path / "loras" / "gone.safetensors"),
+            "type": "lora",
+            "metadata": added,
+        },
+        # installed by InvokeAI into its own models folder, not scanned
+        {
+            "name": "managed",
+            "path": str(tmp_path / "invoke" / "models" / "managed.safetensors"),
+            "type": "lora",
+            "metadata": {"source_type": "hf_repo_id", "format": "lora"},
+        },
+    ]
+
+    text = render_metrics(collect_metrics(local_models, db_models))
+
+    for line in [
+        'invokeai_models_database_models{base="unknown",type="lora"} 3',
+        'invokeai_models_local_models{type="lora"} 2',
+        'invokeai_models_library_bytes{type="lora"} 30',
+        "invokeai_models_missing_on_disk 1",
+        "invokeai_models_unregistered_models 1",
+        "invokeai_models_unregistered_bytes 20",
+        "invokeai_models_snapshots 1",
+        "invokeai_models_snapshot_bytes 100",
+        'invokeai_models_last_run_duration_seconds{run="scan"} 1.5',
+    ]:
+        assert line in text.splitlines()
+    assert "missing_on_disk" not in render_metrics(collect_metrics(None, None))
@@ -0,0 +1,37 @@
+from invokeai_models_cli import functions
+from invokeai_models_cli.pipeline import load_models_concurrently
+
+
+def make_models(models_dir):
+    for relative in [
+        "checkpoints/sdxl/base.safetensors",
+        "checkpoints/readme.txt",
+        "loras/style/one.safetensors",
+        "loras/style/nested/two.safetensors",
+        "loras/three.safetensors",
+        "other/ignored.safetensors",
+    ]:
+        path = models_dir / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"\0" * 16)
+
+
+def test_pipeline_matches_collect_model_info(tmp_path, monkeypatch):
+    make_models(tmp_path)
+    monkeypatch.setattr(functions, "manage_cache", lambda cache_type, data=None: data)
+
+    expected = sorted(
+        functions.collect_model_info(str(tmp_path)),
+        key=lambda model: model["relative_path"],
+    )
+    db_rows = [{"name": "base"}]
+    local_models, db_models = load_models_concurrently(str(tmp_path), lambda: db_rows)
+
+    assert local_models == expected
+    assert [model["name"] for model in local_models] == [
+        "base",
+        "two",
+        "one",
+        "three",
+    ]
+    assert db_models == db_rows
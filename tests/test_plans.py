@@ -0,0 +1,89 @@
+import sqlite3
+
+import pytest
+
+from invokeai_models_cli import functions, plans
+from invokeai_models_cli.helpers import write_json
+from invokeai_models_cli.plans import (
+    StalePlanError,
+    apply_sync_plan_file,
+    build_plan,
+    row_guard,
+    stale_files,
+)
+from invokeai_models_cli.writes import apply_writes
+
+
+def make_database(path):
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE models (key TEXT PRIMARY KEY, path TEXT)")
+    connection.executemany(
+        "INSERT INTO models VALUES (?, ?)", [("a", "/gone/a"), ("b", "/gone/b")]
+    )
+    connection.commit()
+    connection.close()
+
+
+def make_plan(tmp_path):
+    database = tmp_path / "invokeai.db"
+    make_database(database)
+    moved = tmp_path / "a.safetensors"
+    moved.write_bytes(b"weights")
+    operations = [
+        {"action": "update", "key": "a", "name": "a", "path": str(moved)},
+        {"action": "delete", "key": "b", "name": "b", "old_path": "/gone/b"},
+    ]
+    return build_plan(operations, str(database), str(tmp_path)), database, moved
+
+
+def test_fresh_plan_passes_its_checks(tmp_path):
+    plan, database, _ = make_plan(tmp_path)
+
+    assert stale_files(plan) == []
+    apply_writes(
+        str(database),
+        [("DELETE FROM models WHERE key = ?", [("b",)])],
+        capture=["a", "b"],
+        guard=row_guard(plan),
+    )
+
+
+def test_changed_file_makes_the_plan_stale(tmp_path):
+    plan, _, moved = make_plan(tmp_path)
+    moved.write_bytes(b"other weights")
+
+    assert stale_files(plan) == [f"a: {moved} changed"]
+
+
+def test_changed_row_vetoes_the_whole_transaction(tmp_path):
+    plan, database, _ = make_plan(tmp_path)
+    connection = sqlite3.connect(database)
+    connection.execute("UPDATE models SET path = '/elsewhere/a' WHERE key = 'a'")
+    connection.commit()
+    connection.close()
+
+    with pytest.raises(StalePlanError):
+        apply_writes(
+            str(database),
+            [("DELETE FROM models WHERE key = ?", [("b",)])],
+            capture=["a", "b"],
+            guard=row_guard(plan),
+        )
+
+    connection = sqlite3.connect(database)
+    assert connection.execute("SELECT COUNT(*) FROM models").fetchone() == (2,)
+    connection.close()
+
+
+def test_plan_for_a_missing_database_is_refused(tmp_path, monkeypatch):
+    plan, database, _ = make_plan(tmp_path)
+    plan_path = tmp_path / "plan.json"
+    write_json(plan_path, dict(plan, database=str(tmp_path / "other.db")))
+    monkeypatch.setattr(functions, "DATABASE_PATH", str(database))
+    monkeypatch.setattr(plans.inquirer, "confirm", lambda *args, **kwargs: True)
+
+    apply_sync_plan_file(str(plan_path))
+
+    connection = sqlite3.connect(database)
+    assert connection.execute("SELECT COUNT(*) FROM models").fetchone() == (2,)
+    connection.close()
@@ -0,0 +1,28 @@
+import time
+
+import pytest
+
+from invokeai_models_cli.prefetch import Prefetch
+
+
+def slow_load(value):
+    time.sleep(0.2)
+    return value
+
+
+def test_load_overlaps_with_the_prompt():
+    start = time.perf_counter()
+    prefetch = Prefetch(slow_load, [1, 2])
+    time.sleep(0.2)  # the user reading the menu
+
+    assert prefetch.result() == [1, 2]
+    assert time.perf_counter() - start < 0.35
+
+
+def test_errors_surface_when_the_result_is_used():
+    def broken():
+        raise OSError("database is locked")
+
+    prefetch = Prefetch(broken)
+    with pytest.raises(OSError):
+        prefetch.result()
@@ -0,0 +1,150 @@
+import json
+import sqlite3
+from datetime import datetime
+
+from invokeai_models_cli.search import (
+    open_index,
+    refresh_index,
+    search_models,
+    searchable_text,
+    fts_query,
+)
+
+
+def make_database(path):
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE models (key TEXT PRIMARY KEY, hash TEXT, base TEXT, "
+        "type TEXT, path TEXT, format TEXT, name TEXT, description TEXT, "
+        "source_api_response TEXT, config TEXT, created_at TEXT, updated_at TEXT)"
+    )
+    connection.executemany(
+        "INSERT INTO models VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            model("a", "Pixel Art XL", "sdxl", "lora", "2024-01-05", ["pixelart"]),
+            model("b", "Ink Sketch", "sd-1", "lora", "2024-02-10", ["inkdrawing"]),
+            model("c", "Juggernaut", "sdxl", "main", "2024-03-15", []),
+            model("d", "Pixel Portraits", "sd-1", "lora", "2024-04-20", []),
+        ],
+    )
+    connection.commit()
+    connection.close()
+
+
+def model(key, name, base, model_type, created, triggers):
+    api = {
+        "description": "<p>Trained on <b>retro</b> game sprites</p>",
+        "tags": ["style", name.split()[0].lower()],
+    }
+    return (
+        key,
+        f"blake3:{key}",
+        base,
+        model_type,
+        f"{model_type}/{key}.safetensors",
+        "lora" if model_type == "lora" else "checkpoint",
+        name,
+        None,
+        json.dumps(api) if key in "ad" else None,
+        json.dumps({"trigger_phrases": triggers}),
+        f"{created} 10:00:00",
+        f"{created} 10:00:00",
+    )
+
+
+def names(models):
+    return [model["name"] for model in models]
+
+
+def test_search_pushes_filters_sort_and_limit(tmp_path):
+    database = str(tmp_path / "invokeai.db")
+    make_database(database)
+    index = open_index(str(tmp_path / "query.db"))
+    assert refresh_index(index, database) == {"added": 4, "updated": 0, "removed": 0}
+
+    assert names(search_models(index, "pixelart")) == ["Pixel Art XL"]
+    assert sorted(names(search_models(index, "retro sprite"))) == [
+        "Pixel Art XL",
+        "Pixel Portraits",
+    ]
+    assert names(search_models(index, "pix", bases=["sd-1"])) == ["Pixel Portraits"]
+    assert names(search_models(index, types=["lora"], sort="created")) == [
+        "Pixel Art XL",
+        "Ink Sketch",
+        "Pixel Portraits",
+    ]
+    assert names(search_models(index, sort="created", descending=True, limit=2)) == [
+        "Pixel Portraits",
+        "Juggernaut",
+    ]
+    assert names(
+        search_models(index, since=datetime(2024, 2, 1), until=datetime(2024, 4, 1))
+    ) == ["Ink Sketch", "Juggernaut"]
+    assert search_models(index, '" OR name:*') == []
+
+
+def test_refresh_is_incremental(tmp_path):
+    database = str(tmp_path / "invokeai.db")
+    make_database(database)
+    index = open_index(str(tmp_path / "query.db"))
+    refresh_index(index, database)
+    assert refresh_index(index, database) is None
+
+    connection = sqlite3.connect(database)
+    connection.execute("UPDATE models SET name = 'Ink Wash' WHERE key = 'b'")
+    connection.execute("DELETE FROM models WHERE key = 'c'")
+    connection.execute(
+        "INSERT INTO models (key, name, type, created_at) "
+        "VALUES ('e', 'Neon Nights', 'lora', '2024-05-01 10:00:00')"
+    )
+    connection.commit()
+    connection.close()
+
+    changes = refresh_index(index, database, force=True)
+    assert changes == {"added": 1, "updated": 1, "removed": 1}
+    assert names(search_models(index, "ink")) == ["Ink Wash"]
+    assert names(search_models(index, "juggernaut")) == []
+    assert names(search_models(index, "neon")) == ["Neon Nights"]
+
+
+def test_searchable_text_reads_json_columns():
+    text = searchable_text(
+        {
+            "name": "Model",
+            "config": json.dumps({"trigger_phrases": ["zzstyle"]}),
+            "source_api_response": json.dumps(
+                {
+                    "description": "<p>Soft <i>light</i></p>",
+                    "modelVersions": [{"trainedWords": ["zzword"]}],
+                }
+            ),
+        }
+    )
+    assert text["trigger_words"] == "zzstyle zzword"
+    assert "<" not in text["description"] and "light" in text["description"]
+    assert fts_query("anime_xl, v2") == '"anime"* "xl"* "v2"*'
+    assert fts_query("  ") is None
+
+
+def test_metadata_json_schema_is_indexed(tmp_path):
+    database = str(tmp_path / "invokeai.db")
+    connection = sqlite3.connect(database)
+    connection.execute(
+        "CREATE TABLE models (key TEXT PRIMARY KEY, hash TEXT NOT NULL, "
+        "name TEXT NOT NULL, base TEXT, type TEXT NOT NULL, path TEXT NOT NULL, "
+        "description TEXT, format TEXT NOT NULL, source TEXT, source_type TEXT, "
+        "source_api_response TEXT, cover_image TEXT, metadata_json TEXT, "
+        "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, "
+        "updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+    connection.execute(
+        "INSERT INTO models (key, hash, name, type, path, format, metadata_json) "
+        "VALUES ('a', 'h', 'Model', 'lora', 'a.safetensors', 'lora', ?)",
+        (json.dumps({"trigger_phrases": ["zzmeta"]}),),
+    )
+    connection.commit()
+    connection.close()
+
+    index = open_index(str(tmp_path / "query.db"))
+    assert refresh_index(index, database) == {"added": 1, "updated": 0, "removed": 0}
+    assert names(search_models(index, "zzmeta")) == ["Model"]
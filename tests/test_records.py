@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from invokeai_models_cli.records import LocalModel, format_timestamp
+
+ROOT = os.path.join(os.sep, "models")
+NS = 1_700_000_000_123_456_789
+
+
+def record(directory, filename, is_dir=False, real_path=None, aliases=None):
+    return LocalModel(
+        ROOT,
+        os.path.join(ROOT, directory),
+        filename,
+        "lora",
+        is_dir,
+        100,
+        NS,
+        NS + 1_000_000_000,
+        1,
+        42,
+        real_path,
+        aliases,
+    )
+
+
+def test_row_round_trip():
+    model = record("loras/sdxl", "style.safetensors", real_path="/disk2/style")
+    owner = os.path.join(ROOT, "loras", "sdxl")
+
+    assert LocalModel.from_row(ROOT, owner, model.to_row()) == model
+
+
+def test_directory_model_row_round_trip():
+    model = record("main", "sdxl-base", is_dir=True)
+    # The shard of a directory model is the model's own folder
+    owner = os.path.join(ROOT, "main", "sdxl-base")
+
+    copy = LocalModel.from_row(ROOT, owner, model.to_row())
+    assert copy == model
+    assert copy["file_path"] == owner
+    assert copy["format"] == "diffusers" and copy["name"] == "sdxl-base"
+
+
+def test_equal_to_the_plain_dict():
+    model = record("loras/sdxl", "style.safetensors")
+
+    assert model == {
+        "filename": "style.safetensors",
+        "name": "style",
+        "file_path": os.path.join(ROOT, "loras", "sdxl", "style.safetensors"),
+        "relative_path": os.path.join("loras", "sdxl", "style.safetensors"),
+        "type": "sdxl",
+        "model_type": "lora",
+        "format": "safetensors",
+        "size": 100,
+        "created": format_timestamp(NS),
+        "updated": format_timestamp(NS + 1_000_000_000),
+        "device": 1,
+        "inode": 42,
+    }
+    assert dict(model) != dict(model, real_path="/elsewhere")
+
+
+def test_optional_keys_and_extras():
+    model = record("loras", "a.safetensors")
+    assert "real_path" not in model and "aliases" not in model
+    assert model.get("real_path") is None
+    assert list(model) == list(LocalModel.KEYS)
+
+    linked = record("loras", "a.safetensors", real_path="/disk2/a", aliases=["/b"])
+    assert "real_path" in linked and linked["aliases"] == ["/b"]
+    assert list(linked)[-2:] == ["real_path", "aliases"]
+
+    linked["trigger_words"] = ["zz"]
+    assert "trigger_words" in linked and list(linked)[-1] == "trigger_words"
+    assert len(linked) == len(LocalModel.KEYS) + 3
+    assert linked.with_aliases(["/c"])["trigger_words"] == ["zz"]
+
+
+def test_derived_keys_are_not_assignable():
+    model = record("loras", "a.safetensors")
+    for key in ("file_path", "size", "real_path", "aliases"):
+        with pytest.raises(TypeError):
+            model[key] = "x"
+    with pytest.raises(KeyError):
+        model["missing"]
@@ -0,0 +1,153 @@
+import sqlite3
+
+import pytest
+
+from invokeai_models_cli.functions import (
+    find_unregistered_models,
+    load_database_models,
+)
+from invokeai_models_cli.register import (
+    COLUMNS,
+    RegistrationChanged,
+    infer_base,
+    registered_since,
+    registration_row,
+    registration_writes,
+)
+from invokeai_models_cli.writes import apply_writes, connect, json_column
+
+
+def local_model(path, relative_path, model_type="lora"):
+    return {
+        "file_path": path,
+        "relative_path": relative_path,
+        "name": relative_path.rsplit("/", 1)[-1].split(".")[0],
+        "model_type": model_type,
+        "format": "safetensors",
+    }
+
+
+def make_database(path):
+    connection = sqlite3.connect(path)
+    connection.execute(
+        f"CREATE TABLE models ({', '.join(COLUMNS)}, config, "
+        "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (key))"
+    )
+    connection.commit()
+    return connection
+
+
+def test_local_models_without_a_row_are_unregistered():
+    local = [
+        local_model("/models/loras/a.safetensors", "loras/a.safetensors"),
+        local_model("/models/loras/b.safetensors", "loras/b.safetensors"),
+    ]
+    db = [{"key": "1", "path": "/models/loras/a.safetensors"}, {"key": "2"}]
+
+    assert find_unregistered_models(local, db) == [local[1]]
+
+
+def test_base_comes_from_the_header_then_the_folders():
+    model = local_model("/m/loras/sd15/x.safetensors", "loras/sd15/x.safetensors")
+
+    assert infer_base(model, {"ss_base_model_version": "sdxl_base_v1-0"}) == "sdxl"
+    assert infer_base(model, {}) == "sd-1"
+    assert infer_base(local_model("/m/x.bin", "loras/x.bin"), {}) == "any"
+
+
+def test_rows_are_inserted_in_one_transaction(tmp_path):
+    database = tmp_path / "invokeai.db"
+    connection = make_database(database)
+    rows = [
+        registration_row(
+            local_model(f"/m/loras/l{i}.safetensors", f"loras/l{i}.safetensors"),
+            f"blake3:{i}",
+            {"modelspec.architecture": "flux-1-dev/lora"},
+        )
+        for i in range(2_000)
+    ]
+
+    stats = apply_writes(
+        str(database), registration_writes(rows), capture=registered_since(rows)
+    )
+
+    assert stats.rows == 2_000
+    assert stats.before == [] and len(stats.after) == 2_000
+    assert connection.execute(
+        "SELECT base, type, format, source_type FROM models WHERE name = 'l7'"
+    ).fetchone() == ("flux", "lora", "lora", "path")
+
+
+def test_registration_refuses_paths_registered_meanwhile(tmp_path):
+    database = tmp_path / "invokeai.db"
+    connection = make_database(database)
+    rows = [
+        registration_row(
+            local_model("/m/loras/a.safetensors", "loras/a.safetensors"), "h", {}
+        )
+    ]
+    connection.execute(
+        "INSERT INTO models (key, path) VALUES ('other', '/m/loras/a.safetensors')"
+    )
+    connection.commit()
+
+    with pytest.raises(RegistrationChanged):
+        apply_writes(
+            str(database), registration_writes(rows), capture=registered_since(rows)
+        )
+    assert connection.execute("SELECT COUNT(*) FROM models").fetchone() == (1,)
+
+
+def test_registration_refuses_a_relative_path_to_the_same_file(tmp_path):
+    database = tmp_path / "invokeai.db"
+    connection = make_database(database)
+    models_dir = tmp_path / "models"
+    (models_dir / "loras").mkdir(parents=True)
+    path = models_dir / "loras" / "a.safetensors"
+    path.write_bytes(b"\0")
+    rows = [registration_row(local_model(str(path), "loras/a.safetensors"), "h", {})]
+    connection.execute(
+        "INSERT INTO models (key, path) VALUES ('other', 'loras/a.safetensors')"
+    )
+    connection.commit()
+
+    with pytest.raises(RegistrationChanged):
+        apply_writes(
+            str(database),
+            registration_writes(rows),
+            capture=registered_since(rows, str(tmp_path)),
+        )
+
+
+def test_rows_are_registered_in_a_metadata_json_schema(tmp_path):
+    database = str(tmp_path / "invokeai.db")
+    connection = sqlite3.connect(database)
+    # The schema of tests/test_main.py, read positionally by tuple_to_dict
+    connection.execute(
+        "CREATE TABLE models (key TEXT PRIMARY KEY, hash TEXT NOT NULL, "
+        "name TEXT NOT NULL, base TEXT, type TEXT NOT NULL, path TEXT NOT NULL, "
+        "description TEXT, format TEXT NOT NULL, source TEXT, source_type TEXT, "
+        "source_api_response TEXT, cover_image TEXT, metadata_json TEXT, "
+        "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, "
+        "updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+    connection.commit()
+    connection.close()
+    rows = [
+        registration_row(
+            local_model("/m/loras/a.safetensors", "loras/a.safetensors"), "h", {}
+        )
+    ]
+
+    connection = connect(database)
+    assert json_column(connection) == "metadata_json"
+    connection.close()
+    apply_writes(
+        database,
+        registration_writes(rows, "metadata_json"),
+        capture=registered_since(rows),
+    )
+
+    (model,) = load_database_models(database)
+    assert model["metadata"]["source_type"] == "path"
+    assert model["metadata"]["path"] == "/m/loras/a.safetensors"
@@ -0,0 +1,59 @@
+import sqlite3
+import time
+
+from invokeai_models_cli.relocate import (
+    matching_rows,
+    missing_targets,
+    relocated_path,
+)
+from invokeai_models_cli.writes import apply_writes
+
+
+def test_moved_folder_is_rewritten_in_one_statement(tmp_path):
+    database = tmp_path / "invokeai.db"
+    connection = sqlite3.connect(database)
+    connection.execute("CREATE TABLE models (key TEXT PRIMARY KEY, path TEXT)")
+    connection.executemany(
+        "INSERT INTO models VALUES (?, ?)",
+        [(str(i), f"/disk1/loras/lora_{i}.safetensors") for i in range(10_000)]
+        + [("other", "/disk1/loras-old/x.safetensors")],
+    )
+    connection.commit()
+
+    old, new = "/disk1/loras/", "/disk2/loras/"
+    keys = [key for key, _path in matching_rows(connection, old)]
+    assert len(keys) == 10_000
+
+    start = time.perf_counter()
+    stats = apply_writes(
+        str(database),
+        [
+            (
+                "UPDATE models SET path = ? || substr(path, ?) "
+                "WHERE substr(path, 1, ?) = ?",
+                [(new, len(old) + 1, len(old), old)],
+            )
+        ],
+        capture=lambda conn: [key for key, _path in matching_rows(conn, old)],
+    )
+    elapsed = time.perf_counter() - start
+
+    assert stats.rows == 10_000
+    assert len(stats.before) == len(stats.after) == 10_000
+    assert elapsed < 5
+    assert connection.execute("SELECT path FROM models WHERE key = '7'").fetchone() == (
+        "/disk2/loras/lora_7.safetensors",
+    )
+    assert connection.execute(
+        "SELECT path FROM models WHERE key = 'other'"
+    ).fetchone() == ("/disk1/loras-old/x.safetensors",)
+    connection.close()
+
+
+def test_missing_targets_are_reported(tmp_path):
+    present = tmp_path / "a.safetensors"
+    present.write_bytes(b"")
+    absent = str(tmp_path / "b.safetensors")
+
+    assert missing_targets([str(present), absent]) == [absent]
+    assert relocated_path("/old/x/a.bin", "/old/", "/new/") == "/new/x/a.bin"
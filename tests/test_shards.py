@@ -0,0 +1,127 @@
+import os
+
+import pytest
+
+from invokeai_models_cli import pipeline
+from invokeai_models_cli.pipeline import load_models_concurrently
+from invokeai_models_cli.shards import ShardIndex
+
+OLD = 1_600_000_000
+
+
+def make_models(models_dir):
+    for relative in [
+        "checkpoints/sdxl/base.safetensors",
+        "loras/sdxl/one.safetensors",
+        "loras/sdxl/nested/two.safetensors",
+        "loras/flux/three.safetensors",
+    ]:
+        path = models_dir / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"\0" * 16)
+    age_directories(models_dir)
+
+
+def age_directories(models_dir):
+    # Fresh mtimes are never trusted, pretend the tree settled long ago
+    for root, dirs, _ in os.walk(models_dir):
+        for name in dirs:
+            os.utime(os.path.join(root, name), (OLD, OLD))
+    os.utime(models_dir, (OLD, OLD))
+
+
+def scan(models_dir, cache_dir, monkeypatch):
+    listed = []
+    scan_directory = pipeline.scan_directory
+
+    def recording(path, rule=None):
+        listed.append(os.path.relpath(path, models_dir))
+        return scan_directory(path, rule)
+
+    monkeypatch.setattr(pipeline, "scan_directory", recording)
+    index = ShardIndex.load(str(cache_dir), str(models_dir))
+    local_models, _ = load_models_concurrently(str(models_dir), list, index=index)
+    written = index.save()
+    return local_models, sorted(listed), written
+
+
+def test_unchanged_tree_is_not_listed_again(tmp_path, monkeypatch):
+    models_dir, cache_dir = tmp_path / "models", tmp_path / "cache"
+    make_models(models_dir)
+
+    first, listed, written = scan(models_dir, cache_dir, monkeypatch)
+    assert len(listed) == 7
+    assert written == 6
+
+    second, listed, written = scan(models_dir, cache_dir, monkeypatch)
+    assert second == first
+    assert listed == []
+    assert written == 0
+
+
+def test_new_file_relists_only_its_directory(tmp_path, monkeypatch):
+    models_dir, cache_dir = tmp_path / "models", tmp_path / "cache"
+    make_models(models_dir)
+    scan(models_dir, cache_dir, monkeypatch)
+
+    (models_dir / "loras/flux/four.safetensors").write_bytes(b"\0" * 8)
+    os.utime(models_dir / "loras/flux", (OLD + 60, OLD + 60))
+
+    local_models, listed, written = scan(models_dir, cache_dir, monkeypatch)
+    assert listed == ["loras/flux"]
+    assert written == 1
+    expected, _ = load_models_concurrently(str(models_dir), list)
+    assert local_models == expected
+    assert "four" in [model["name"] for model in local_models]
+
+
+def test_removed_directory_is_forgotten(tmp_path, monkeypatch):
+    models_dir, cache_dir = tmp_path / "models", tmp_path / "cache"
+    make_models(models_dir)
+    scan(models_dir, cache_dir, monkeypatch)
+
+    nested = models_dir / "loras/sdxl/nested"
+    (nested / "two.safetensors").unlink()
+    nested.rmdir()
+    os.utime(models_dir / "loras/sdxl", (OLD + 60, OLD + 60))
+
+    local_models, listed, _ = scan(models_dir, cache_dir, monkeypatch)
+    assert listed == ["loras/sdxl"]
+    assert "two" not in [model["name"] for model in local_models]
+    index = ShardIndex.load(str(cache_dir), str(models_dir))
+    assert index.models() == local_models
+
+
+def test_recently_changed_directory_is_always_listed(tmp_path, monkeypatch):
+    models_dir, cache_dir = tmp_path / "models", tmp_path / "cache"
+    make_models(models_dir)
+    os.utime(models_dir / "loras/flux")  # just now
+    scan(models_dir, cache_dir, monkeypatch)
+
+    _, listed, _ = scan(models_dir, cache_dir, monkeypatch)
+    assert listed == ["loras/flux"]
+
+
+def test_failed_listing_stores_nothing(tmp_path, monkeypatch):
+    models_dir, cache_dir = tmp_path / "models", tmp_path / "cache"
+    make_models(models_dir)
+    first, _, _ = scan(models_dir, cache_dir, monkeypatch)
+
+    # More failing folders than listers, none is left to drain the queue
+    for i in range(pipeline.SCAN_CONCURRENCY + 2):
+        (models_dir / f"loras/broken-{i}").mkdir()
+    os.utime(models_dir / "loras", (OLD + 60, OLD + 60))
+    scan_directory = pipeline.scan_directory
+
+    def failing(path, rule=None):
+        if os.path.basename(path).startswith("broken-"):
+            raise RuntimeError(path)
+        return scan_directory(path, rule)
+
+    monkeypatch.setattr(pipeline, "scan_directory", failing)
+    index = ShardIndex.load(str(cache_dir), str(models_dir))
+    with pytest.raises(RuntimeError):
+        load_models_concurrently(str(models_dir), list, index=index)
+
+    assert index.models() == first
+    assert index.save() == 0
@@ -0,0 +1,81 @@
+import os
+
+from invokeai_models_cli import functions, stats
+from invokeai_models_cli.stats import aggregate_models
+
+
+def local_model(relative_path, size, created):
+    return {
+        "file_path": "/models/" + relative_path,
+        "relative_path": relative_path,
+        "model_type": relative_path.split("/")[0].rstrip("s"),
+        "format": "safetensors",
+        "size": size,
+        "created": created,
+    }
+
+
+def test_sizes_are_grouped_and_joined_to_the_database(monkeypatch):
+    monkeypatch.setattr(
+        "invokeai_models_cli.functions.resolve_model_path",
+        lambda path, invoke_ai_dir=None: path,
+    )
+    local_models = [
+        local_model("loras/sdxl/styles/a.safetensors", 100, "2024-01-05T10:00:00"),
+        local_model("loras/sdxl/b.safetensors", 50, "2024-02-05T10:00:00"),
+        local_model("checkpoints/c.safetensors", 1000, "2024-02-06T10:00:00"),
+        local_model("loose.safetensors", 1, "2024-02-06T10:00:00"),
+    ]
+    db_models = [
+        {
+            "path": "/models/checkpoints/c.safetensors",
+            "base": "sdxl",
+            "format": "checkpoint",
+            "created_at": "2023-12-24 08:00:00",
+        },
+        {"path": "/elsewhere/gone.safetensors", "base": "sd-1", "format": "lora"},
+    ]
+
+    stats = aggregate_models(local_models, db_models, depth=2)
+
+    assert stats["local"] == [4, 1151]
+    assert stats["referenced"] == [1, 1000]
+    assert stats["unreferenced"] == [3, 151]
+    assert stats["unmatched"] == 1
+    assert stats["type"]["lora"] == [2, 150]
+    assert stats["base"] == {"unknown": [3, 151], "sdxl": [1, 1000]}
+    assert stats["format"] == {"safetensors": [3, 151], "checkpoint": [1, 1000]}
+    assert stats["directory"] == {
+        "loras/sdxl": [2, 150],
+        "checkpoints": [1, 1000],
+        ".": [1, 1],
+    }
+    assert stats["month"] == {
+        "2024-01": [1, 100],
+        "2024-02": [2, 51],
+        "2023-12": [1, 1000],
+    }
+
+
+def test_stats_come_from_the_saved_index(tmp_path, monkeypatch):
+    models_dir = tmp_path / "models"
+    (models_dir / "loras").mkdir(parents=True)
+    (models_dir / "loras" / "a.safetensors").write_bytes(b"\0" * 16)
+    for path in (models_dir / "loras", models_dir):
+        os.utime(path, (1_600_000_000, 1_600_000_000))
+    monkeypatch.setattr(functions, "SNAPSHOTS_DIR", str(tmp_path))
+    monkeypatch.setattr(functions, "MODELS_DIR", str(models_dir))
+    functions.scan_local_models()
+
+    def no_scan(*args, **kwargs):
+        raise AssertionError("the index is saved, nothing to scan")
+
+    shown = []
+    monkeypatch.setattr(stats, "scan_local_models", no_scan)
+    monkeypatch.setattr(stats, "get_database_models", lambda: [])
+    monkeypatch.setattr(
+        stats, "display_stats", lambda totals, top: shown.append(totals)
+    )
+    stats.library_stats()
+
+    assert shown[0]["local"] == [1, 16]
@@ -0,0 +1,113 @@
+import os
+
+from invokeai_models_cli import functions
+from invokeai_models_cli.pipeline import load_models_concurrently
+from invokeai_models_cli.scanner import real_path, forget_real_paths
+
+
+def make_farm(tmp_path):
+    """
+    A models folder with a symlinked external disk that links back to itself,
+    a folder linked to another folder of the library, a symlinked file and a
+    hard link.
+    """
+    models_dir = tmp_path / "models"
+    external = tmp_path / "disk2" / "loras"
+    for path in [
+        models_dir / "checkpoints" / "base.safetensors",
+        models_dir / "loras" / "real.safetensors",
+        external / "far.safetensors",
+    ]:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"\0" * 16)
+
+    os.symlink(external, models_dir / "loras" / "disk2")
+    os.symlink(external, external / "loop")
+    os.symlink(models_dir / "checkpoints", models_dir / "loras" / "checkpoints")
+    os.symlink(
+        models_dir / "loras" / "real.safetensors",
+        models_dir / "loras" / "link.safetensors",
+    )
+    os.link(
+        models_dir / "loras" / "real.safetensors",
+        models_dir / "loras" / "same.safetensors",
+    )
+    return models_dir, external
+
+
+def test_every_file_is_listed_once(tmp_path):
+    models_dir, external = make_farm(tmp_path)
+
+    local_models, _ = load_models_concurrently(str(models_dir), list)
+
+    assert [model["relative_path"] for model in local_models] == [
+        "checkpoints/base.safetensors",
+        "loras/disk2/far.safetensors",
+        "loras/real.safetensors",
+    ]
+    far, real = local_models[1], local_models[2]
+    assert far["real_path"] == str(external / "far.safetensors")
+    assert sorted(real["aliases"]) == [
+        str(models_dir / "loras" / "link.safetensors"),
+        str(models_dir / "loras" / "same.safetensors"),
+    ]
+    assert local_models == functions.collect_model_info(str(models_dir))
+
+
+def test_database_paths_are_normalized(tmp_path, monkeypatch):
+    models_dir, external = make_farm(tmp_path)
+    monkeypatch.setattr(functions, "INVOKE_AI_DIR", str(tmp_path / "invoke"))
+    os.makedirs(tmp_path / "invoke")
+    os.symlink(models_dir, tmp_path / "invoke" / "models")
+    local_models, _ = load_models_concurrently(str(models_dir), list)
+
+    db_models = [
+        # relative to the InvokeAI models folder, itself a link
+        {"path": "checkpoints/base.safetensors"},
+        # the real location of a file reached through a linked folder
+        {"path": str(external / "far.safetensors")},
+        # a hard link the scan merged into another record
+        {"path": str(models_dir / "loras" / "same.safetensors")},
+    ]
+
+    assert functions.find_unregistered_models(local_models, db_models) == []
+    assert len(functions.find_unregistered_models(local_models, db_models[:2])) == 1
+
+
+def test_real_path_matches_os_realpath(tmp_path):
+    models_dir, external = make_farm(tmp_path)
+    forget_real_paths()
+    for path in [
+        models_dir / "loras" / "disk2" / "loop" / "loop" / "far.safetensors",
+        models_dir / "loras" / "link.safetensors",
+        models_dir / "loras" / "checkpoints" / "base.safetensors",
+        models_dir / "loras" / "missing.safetensors",
+    ]:
+        assert real_path(str(path)) == os.path.realpath(path)
+
+
+def test_missing_models_are_matched_by_path(tmp_path, monkeypatch):
+    models_dir, external = make_farm(tmp_path)
+    monkeypatch.setattr(functions, "INVOKE_AI_DIR", str(tmp_path / "invoke"))
+    os.makedirs(tmp_path / "invoke")
+    os.symlink(models_dir, tmp_path / "invoke" / "models")
+    local_models, _ = load_models_concurrently(str(models_dir), list)
+
+    def row(name, path):
+        metadata = {"source_type": "path", "format": "lora"}
+        return {"name": name, "path": path, "metadata": metadata}
+
+    db_models = [
+        row("far", str(models_dir / "loras" / "disk2" / "far.safetensors")),
+        row("real", "loras/link.safetensors"),
+        # same name as a local file, but that file was moved away
+        row("base", str(tmp_path / "old" / "base.safetensors")),
+        row("real", None),
+        row("gone", None),
+    ]
+
+    missing = functions.filter_and_compare_models(local_models, db_models)
+    assert [(model["name"], model["path"]) for model in missing] == [
+        ("base", str(tmp_path / "old" / "base.safetensors")),
+        ("gone", None),
+    ]
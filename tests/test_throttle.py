@@ -0,0 +1,98 @@
+import os
+import time
+import threading
+
+import pytest
+
+from invokeai_models_cli import throttle
+from invokeai_models_cli.classifier import rule_by_name
+from invokeai_models_cli.hashing import hash_file
+from invokeai_models_cli.scanner import stat_model
+from invokeai_models_cli.helpers import parse_size
+
+
+@pytest.fixture(autouse=True)
+def scheduler_off():
+    yield
+    throttle.disable()
+
+
+def test_byte_budget_is_shared_by_all_threads():
+    bucket = throttle.TokenBucket(4_000_000)
+    start = time.monotonic()
+    workers = [
+        threading.Thread(target=lambda: [bucket.take(1_000_000) for _ in range(3)])
+        for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    # 12 MB at 4 MB/s with one second saved up
+    assert time.monotonic() - start >= 1.9
+
+
+def test_operations_per_device_are_limited(tmp_path):
+    scheduler = throttle.IOScheduler(per_device=1)
+    path = str(tmp_path / "model.safetensors")
+    running = []
+    peak = []
+
+    def read():
+        with scheduler.operation(path):
+            running.append(1)
+            peak.append(len(running))
+            time.sleep(0.02)
+            running.pop()
+
+    workers = [threading.Thread(target=read) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert max(peak) == 1
+
+
+def test_recent_database_writes_mean_invokeai_is_busy(tmp_path):
+    database = tmp_path / "invokeai.db"
+    database.write_bytes(b"")
+    monitor = throttle.ActivityMonitor([str(database)], quiet_seconds=5)
+    assert monitor.is_active()
+
+    old = time.time() - 60
+    os.utime(database, (old, old))
+    monitor = throttle.ActivityMonitor([str(database)], quiet_seconds=5)
+    assert not monitor.is_active()
+    assert monitor.wait_until_idle() == 0
+
+
+def test_throttled_hash_matches_the_mmap_hash(tmp_path):
+    path = tmp_path / "model.safetensors"
+    path.write_bytes(os.urandom(3 * 1024 * 1024 + 17))
+    expected = hash_file(path)
+
+    throttle.configure(bytes_per_second=parse_size("1G"), per_device=2)
+    assert throttle.is_enabled()
+    assert hash_file(path) == expected
+
+
+def test_directory_model_with_one_slot_per_device(tmp_path):
+    model = tmp_path / "main" / "sdxl-base"
+    (model / "unet").mkdir(parents=True)
+    (model / "model_index.json").write_bytes(b"{}")
+    (model / "unet" / "weights.safetensors").write_bytes(b"\0" * 100)
+    throttle.configure(per_device=1)
+    result = []
+
+    worker = threading.Thread(
+        target=lambda: result.append(
+            stat_model(str(model), str(tmp_path), rule_by_name("main"), True)
+        ),
+        daemon=True,
+    )
+    worker.start()
+    worker.join(timeout=5)
+
+    assert not worker.is_alive()
+    assert result[0]["size"] == 102
@@ -0,0 +1,30 @@
+import json
+from invokeai_models_cli import timings
+
+
+def test_span_is_noop_when_disabled(monkeypatch):
+    monkeypatch.setattr(timings, "_enabled", False)
+    with timings.span("scan"):
+        pass
+    timings.count("files visited", 10)
+    assert "scan" not in timings.summary()["spans"]
+    assert "files visited" not in timings.summary()["counters"]
+
+
+def test_spans_and_counters_are_recorded(tmp_path, monkeypatch):
+    monkeypatch.setattr(timings, "_enabled", False)
+    timings.enable()
+    with timings.span("db load"):
+        pass
+    with timings.span("db load"):
+        pass
+    timings.count("rows read", 5)
+
+    data = timings.summary()
+    assert data["spans"]["db load"]["calls"] >= 2
+    assert data["counters"]["rows read"] >= 5
+
+    trace_file = tmp_path / "trace.json"
+    timings.write_trace(trace_file)
+    trace = json.loads(trace_file.read_text())
+    assert any(event["name"] == "db load" for event in trace["traceEvents"])
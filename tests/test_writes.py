@@ -0,0 +1,117 @@
+import sqlite3
+import threading
+
+import pytest
+
+from invokeai_models_cli import writes
+from invokeai_models_cli.functions import plan_sync
+
+
+def make_database(path):
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE models (key TEXT PRIMARY KEY, path TEXT)")
+    connection.executemany(
+        "INSERT INTO models VALUES (?, ?)", [("a", "/old/a"), ("b", "/old/b")]
+    )
+    connection.commit()
+    connection.close()
+
+
+def rows(path):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute(
+            "SELECT key, path FROM models ORDER BY key"
+        ).fetchall()
+    finally:
+        connection.close()
+
+
+def test_writes_commit_together(tmp_path):
+    database = tmp_path / "invokeai.db"
+    make_database(database)
+
+    stats = writes.apply_writes(
+        str(database),
+        [
+            ("UPDATE models SET path = ? WHERE key = ?", [("/new/a", "a")]),
+            ("DELETE FROM models WHERE key = ?", [("b",)]),
+        ],
+    )
+
+    assert rows(database) == [("a", "/new/a")]
+    assert (stats.attempts, stats.rows) == (1, 2)
+    assert stats.lock_hold < 1
+
+
+def test_failed_statement_rolls_back_everything(tmp_path):
+    database = tmp_path / "invokeai.db"
+    make_database(database)
+
+    with pytest.raises(sqlite3.Error):
+        writes.apply_writes(
+            str(database),
+            [
+                ("UPDATE models SET path = ? WHERE key = ?", [("/new/a", "a")]),
+                ("DELETE FROM no_such_table WHERE key = ?", [("b",)]),
+            ],
+        )
+    assert rows(database) == [("a", "/old/a"), ("b", "/old/b")]
+
+
+def test_busy_database_is_retried(tmp_path, monkeypatch):
+    database = tmp_path / "invokeai.db"
+    make_database(database)
+    monkeypatch.setattr(writes, "BACKOFF_SECONDS", 0.01)
+
+    holder = sqlite3.connect(database, isolation_level=None, check_same_thread=False)
+    holder.execute("BEGIN IMMEDIATE")
+    releaser = threading.Timer(0.1, lambda: holder.execute("COMMIT"))
+    releaser.start()
+    try:
+        stats = writes.apply_writes(
+            str(database),
+            [("DELETE FROM models WHERE key = ?", [("a",)])],
+            busy_timeout_ms=20,
+        )
+    finally:
+        releaser.join()
+        holder.close()
+
+    assert stats.attempts > 1
+    assert rows(database) == [("b", "/old/b")]
+
+
+def test_sync_plan_repoints_or_deletes():
+    missing = [
+        {"key": "1", "name": "moved", "metadata": {"path": "/gone/moved.safetensors"}},
+        {"key": "2", "name": "deleted", "metadata": {}},
+    ]
+    local_models = [{"name": "moved", "file_path": "/models/moved.safetensors"}]
+
+    assert plan_sync(missing, local_models) == [
+        {
+            "action": "update",
+            "key": "1",
+            "name": "moved",
+            "old_path": "/gone/moved.safetensors",
+            "path": "/models/moved.safetensors",
+        },
+        {
+            "action": "delete",
+            "key": "2",
+            "name": "deleted",
+            "old_path": None,
+            "path": None,
+        },
+    ]
+
+
+def test_hold_over_the_target_is_flagged():
+    stats = writes.WriteStats(attempts=1, lock_hold=writes.LOCK_HOLD_TARGET / 2)
+    assert not stats.over_target
+    assert "target" not in stats.describe()
+
+    stats.lock_hold = writes.LOCK_HOLD_TARGET * 2
+    assert stats.over_target
+    assert stats.describe().endswith("over the 50 ms target")